@@ -0,0 +1,226 @@
+"""Async versions of the read-heavy and gate endpoints, served by asgi.py
+
+Queries, validation and response shapes come from the sync controllers, only the
+database access (aiomysql pool) and the request/response plumbing differ.
+observed() stands in for the Flask hooks: admission control (with budgets of
+its own next to the Flask app's), request metrics, the slow query log and
+X-Read-Your-Writes work as for the sync views. Request profiling (X-Profile,
+PROFILE_SAMPLE_RATE) does not, the sampler follows one thread and here every
+request runs on the event loop's.
+"""
+import contextlib
+import contextvars
+import json
+import time
+from datetime import date, datetime
+from functools import wraps
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from app.backends import async_db
+from app.controllers.aarti_controller import AARTI_SLOTS_QUERY, aarti_slots_cache_key
+from app.controllers.attendant_controller import ASSIGNED_PASSES_QUERY
+from app.controllers.pass_controller import ALL_PASSES_FOR_DATE_QUERY, TODAY_PASSES_QUERIES, passes_today_cache_key
+from app.controllers.scanner_controller import SCAN_QR_QUERY, scan_result
+from app.config import Config
+from app.database import READ_YOUR_WRITES_HEADER, register_query_observer
+from app.middleware.admission_control import (
+    AsyncTrafficClass, admission_admitted, admission_in_flight, admission_rejected, build_classes, classify
+)
+from app.middleware.auth_middleware import decode_token
+from app.middleware.metrics_middleware import request_db_queries, request_db_time, request_latency
+from app.utils import aarti_cache, response_cache
+from app.utils.helpers import dumps_json
+from app.utils.query_log import current_endpoint
+
+# [statements, DB seconds] of the request being served, for its request metrics
+_request_queries = contextvars.ContextVar('request_queries', default=None)
+# Admission control budgets, None when ADMISSION_CONTROL_ENABLED is off
+_traffic_classes = None
+
+def json_response(body, status=200):
+    return Response(dumps_json(body), status_code=status, media_type='application/json')
+
+def payload_response(request, payload):
+    """Response for a shared cached payload, compressed for the client like cached_json_response"""
+    body, encoding = response_cache.encode_payload(payload, request.headers.get('accept-encoding'))
+    headers = {'Vary': 'Accept-Encoding'}
+    if encoding is not None:
+        headers['Content-Encoding'] = encoding
+    return Response(body, media_type='application/json', headers=headers)
+
+async def cached_payload(key, tables, build):
+    """Async counterpart of response_cache.get_payload, build is a coroutine function"""
+    payload, versions = response_cache.lookup(key, tables)
+    if payload is None:
+        # Rebuild from the primary, see response_cache.get_payload
+        async_db.use_primary()
+        payload = response_cache.store(key, versions, dumps_json(await build()).encode('utf-8') + b'\n')
+    return payload
+
+def _count_query(connection, query, args, elapsed, rowcount):
+    queries = _request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+        queries[1] += elapsed
+
+register_query_observer(_count_query)
+
+async def _admit(handler, request, traffic_class):
+    if traffic_class is None:
+        return await handler(request)
+    
+    reason = await traffic_class.acquire()
+    if reason is not None:
+        admission_rejected.inc((traffic_class.name, reason))
+        response = json_response({'error': 'Server is busy, please retry shortly'}, 503)
+        response.headers['Retry-After'] = str(Config.ADMISSION_RETRY_AFTER_SECONDS)
+        return response
+    
+    admission_admitted.inc((traffic_class.name,))
+    admission_in_flight.inc((traffic_class.name,))
+    try:
+        return await handler(request)
+    finally:
+        admission_in_flight.dec((traffic_class.name,))
+        traffic_class.release()
+
+def observed(blueprint, endpoint):
+    """The Flask request hooks for an async endpoint, blueprint and endpoint name the sync view it mirrors"""
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapped(request):
+            start = time.perf_counter()
+            queries = [0, 0.0]
+            _request_queries.set(queries)
+            current_endpoint.set(endpoint)
+            if request.headers.get(READ_YOUR_WRITES_HEADER, '').lower() in ('1', 'true'):
+                async_db.use_primary()
+            
+            traffic_class = _traffic_classes[classify(endpoint, blueprint)] if _traffic_classes else None
+            response = await _admit(handler, request, traffic_class)
+            
+            labels = (blueprint, endpoint, request.method, str(response.status_code))
+            request_latency.observe(labels, time.perf_counter() - start)
+            request_db_queries.observe(labels, queries[0])
+            request_db_time.observe(labels, queries[1])
+            return response
+        return wrapped
+    return decorator
+
+def authenticated(roles=None):
+    """token_required + role_required for async endpoints, the handler gets (request, current_user)"""
+    def decorator(handler):
+        @wraps(handler)
+        async def endpoint(request):
+            current_user, error = decode_token(request.headers.get('authorization'))
+            if error:
+                return json_response({'error': error}, 401)
+            if roles and current_user['role'] not in roles:
+                return json_response({'error': 'Insufficient permissions'}, 403)
+            return await handler(request, current_user)
+        return endpoint
+    return decorator
+
+@observed('scanner', 'scanner.scan_qr')
+@authenticated(['SCANNER', 'ADMIN'])
+async def scan_qr(request, current_user):
+    try:
+        data = await request.json()
+    except json.JSONDecodeError:
+        data = {}
+    qr_code_string = data.get('qr_code_string') if isinstance(data, dict) else None
+    
+    if not qr_code_string:
+        return json_response({'error': 'qr_code_string is required'}, 400)
+    
+    # Primary, like the sync POST, so a pass created a moment ago scans fine
+    pass_data = await async_db.fetchone(SCAN_QR_QUERY, (qr_code_string,), readonly=False)
+    
+    body, status = scan_result(pass_data)
+    return json_response(body, status)
+
+@observed('attendant', 'attendant.get_assigned_passes')
+@authenticated(['ATTENDANT'])
+async def get_assigned_passes(request, current_user):
+    passes = await async_db.fetchall(ASSIGNED_PASSES_QUERY, (current_user['user_id'], date.today()))
+    return json_response({'passes': passes})
+
+@observed('pass', 'pass.get_today_passes')
+@authenticated()
+async def get_today_passes(request, current_user):
+    today = datetime.now().date()
+    
+    if current_user['role'] not in TODAY_PASSES_QUERIES:
+        key, tables = passes_today_cache_key(today)
+        
+        async def build():
+            return {'passes': await async_db.fetchall(ALL_PASSES_FOR_DATE_QUERY, (today,))}
+        
+        return payload_response(request, await cached_payload(key, tables, build))
+    
+    passes = await async_db.fetchall(TODAY_PASSES_QUERIES[current_user['role']], (current_user['user_id'], today))
+    return json_response({'passes': passes})
+
+@observed('aarti', 'aarti.get_aarti_slots')
+@authenticated()
+async def get_aarti_slots(request, current_user):
+    date_param = request.query_params.get('date') or datetime.now().date().isoformat()
+    
+    try:
+        date_param = date.fromisoformat(date_param).isoformat()
+    except ValueError:
+        return json_response({'error': 'date must be YYYY-MM-DD'}, 400)
+    
+    version, found = aarti_cache.lookup(date_param)
+    if version is None:
+        rows = await async_db.fetchall(AARTI_SLOTS_QUERY, (date_param,), readonly=False)
+        version, aarti_slots = aarti_cache.store(date_param, found, rows)
+    else:
+        aarti_slots = found
+    
+    try:
+        client_version = int(request.query_params.get('version', ''))
+    except ValueError:
+        client_version = None
+    if client_version == version:
+        return json_response({'unchanged': True, 'version': version})
+    
+    key, tables = aarti_slots_cache_key(date_param, version)
+    
+    async def build():
+        return {'aarti_slots': aarti_slots, 'version': version}
+    
+    return payload_response(request, await cached_payload(key, tables, build))
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    await async_db.close_pools()
+
+def create_asgi_app(flask_app):
+    """Starlette app serving the async endpoints, everything else goes to the Flask app on a thread pool"""
+    global _traffic_classes
+    if Config.ADMISSION_CONTROL_ENABLED:
+        _traffic_classes = build_classes(AsyncTrafficClass)
+    
+    try:
+        from a2wsgi import WSGIMiddleware
+    except ImportError:
+        from starlette.middleware.wsgi import WSGIMiddleware
+    
+    routes = [
+        Route('/api/scanner/scan-qr', scan_qr, methods=['POST']),
+        Route('/api/attendant/assigned', get_assigned_passes, methods=['GET']),
+        Route('/api/passes/today', get_today_passes, methods=['GET']),
+        Route('/api/aarti', get_aarti_slots, methods=['GET']),
+        Mount('/', app=WSGIMiddleware(flask_app))
+    ]
+    
+    return Starlette(
+        routes=routes,
+        middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+        lifespan=lifespan
+    )
@@ -0,0 +1,127 @@
+import asyncio
+import contextvars
+import logging
+import time
+from app.backends.mysql_backend import OperationalError
+from app.config import Config
+from app.database import notify_query_observers
+
+logger = logging.getLogger(__name__)
+
+# aiomysql is only needed for the async serving mode, imported when the first pool is created
+_pools = {}
+_pool_lock = None
+_replica_down_until = 0.0
+# Set for the rest of a request whose reads must see the latest writes
+_use_primary = contextvars.ContextVar('use_primary', default=False)
+
+def use_primary():
+    """Send the rest of this request's reads to the primary, like app.database.use_primary()"""
+    _use_primary.set(True)
+
+async def _create_pool(host, user, password, port, **kwargs):
+    import aiomysql
+    
+    return await aiomysql.create_pool(
+        host=host,
+        user=user,
+        password=password,
+        db=Config.DB_NAME,
+        port=port,
+        minsize=Config.ASYNC_DB_POOL_MIN_SIZE,
+        maxsize=Config.ASYNC_DB_POOL_MAX_SIZE,
+        cursorclass=aiomysql.DictCursor,
+        autocommit=True,
+        **kwargs
+    )
+
+async def _get_pool(readonly):
+    """Pool on the replica for reads when one is configured (falling back to the primary), else the primary"""
+    global _pool_lock, _replica_down_until
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    
+    async with _pool_lock:
+        if readonly and Config.DB_READ_HOST and time.monotonic() >= _replica_down_until:
+            if 'replica' not in _pools:
+                try:
+                    _pools['replica'] = await _create_pool(
+                        Config.DB_READ_HOST,
+                        Config.DB_READ_USER,
+                        Config.DB_READ_PASSWORD,
+                        Config.DB_READ_PORT,
+                        connect_timeout=Config.DB_READ_CONNECT_TIMEOUT
+                    )
+                except Exception as e:
+                    _replica_down_until = time.monotonic() + Config.DB_READ_RETRY_SECONDS
+                    logger.warning("Read replica unavailable, falling back to primary: %s", e)
+            if 'replica' in _pools:
+                return _pools['replica']
+        
+        if 'primary' not in _pools:
+            _pools['primary'] = await _create_pool(Config.DB_HOST, Config.DB_USER, Config.DB_PASSWORD, Config.DB_PORT)
+        return _pools['primary']
+
+def _fetch_sync(query, args, readonly, one):
+    from app.database import get_db_connection
+    
+    conn = get_db_connection(readonly=readonly)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, args)
+        result = cursor.fetchone() if one else cursor.fetchall()
+        cursor.close()
+        return result
+    finally:
+        conn.close()
+
+def _replica_failed(pool, error):
+    """Drop a replica pool that stopped answering, reads go to the primary until the retry interval passes"""
+    global _replica_down_until
+    # Concurrent reads fail together, only the first one drops the pool
+    if _pools.get('replica') is not pool:
+        return
+    del _pools['replica']
+    pool.close()
+    _replica_down_until = time.monotonic() + Config.DB_READ_RETRY_SECONDS
+    logger.warning("Read replica unavailable, falling back to primary: %s", error)
+
+async def _execute(pool, query, args, one):
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            # aiomysql cursors aren't instrumented, report to the query observers here
+            start = time.perf_counter()
+            try:
+                await cursor.execute(query, args)
+            finally:
+                notify_query_observers(None, query, args, time.perf_counter() - start, cursor.rowcount)
+            return await (cursor.fetchone() if one else cursor.fetchall())
+
+async def _fetch(query, args, readonly, one):
+    readonly = readonly and not _use_primary.get()
+    
+    # The embedded SQLite backend has no async driver, run it on a worker thread
+    if Config.DB_BACKEND == 'sqlite':
+        return await asyncio.to_thread(_fetch_sync, query, args, readonly, one)
+    
+    pool = await _get_pool(readonly)
+    on_replica = pool is _pools.get('replica')
+    try:
+        return await _execute(pool, query, args, one)
+    except (OperationalError, OSError, asyncio.TimeoutError) as e:
+        if not on_replica:
+            raise
+        _replica_failed(pool, e)
+    return await _execute(await _get_pool(False), query, args, one)
+
+async def fetchall(query, args=(), readonly=True):
+    return await _fetch(query, args, readonly, one=False)
+
+async def fetchone(query, args=(), readonly=True):
+    return await _fetch(query, args, readonly, one=True)
+
+async def close_pools():
+    for pool in list(_pools.values()):
+        pool.close()
+        await pool.wait_closed()
+    _pools.clear()
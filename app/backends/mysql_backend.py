@@ -0,0 +1,17 @@
+import pymysql
+
+# Errors callers may want to catch without importing the driver
+IntegrityError = pymysql.err.IntegrityError
+OperationalError = pymysql.err.OperationalError
+
+def connect(host, user, password, database, port, **kwargs):
+    return pymysql.connect(
+        host=host,
+        user=user,
+        password=password,
+        database=database,
+        port=port,
+        cursorclass=pymysql.cursors.DictCursor,
+        autocommit=False,
+        **kwargs
+    )
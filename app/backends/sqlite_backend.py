@@ -0,0 +1,478 @@
+import glob
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+IntegrityError = sqlite3.IntegrityError
+OperationalError = sqlite3.OperationalError
+
+_schema_lock = threading.Lock()
+_initialized_paths = set()
+_memory_keepers = {}
+
+# Type conversions matching what PyMySQL returns
+
+def _format_datetime(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+def _format_timedelta(value):
+    seconds = int(value.total_seconds())
+    sign = '-' if seconds < 0 else ''
+    seconds = abs(seconds)
+    return f'{sign}{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}'
+
+def _parse_datetime(value):
+    if isinstance(value, bytes):
+        value = value.decode()
+    value = value.replace('T', ' ')
+    if len(value) == 10:
+        return datetime.strptime(value, '%Y-%m-%d')
+    return datetime.fromisoformat(value)
+
+def _parse_timedelta(value):
+    if isinstance(value, bytes):
+        value = value.decode()
+    parts = value.split(':')
+    hours, minutes = int(parts[0]), int(parts[1])
+    seconds = float(parts[2]) if len(parts) > 2 else 0
+    return timedelta(hours=hours, minutes=minutes, seconds=seconds)
+
+sqlite3.register_adapter(datetime, _format_datetime)
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(time, lambda value: value.strftime('%H:%M:%S'))
+sqlite3.register_adapter(timedelta, _format_timedelta)
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_converter('DATE', lambda value: _parse_datetime(value).date())
+sqlite3.register_converter('TIMESTAMP', _parse_datetime)
+sqlite3.register_converter('DATETIME', _parse_datetime)
+sqlite3.register_converter('TIME', _parse_timedelta)
+
+# MySQL functions used by the controllers
+
+def _to_datetime(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value
+    return _parse_datetime(str(value))
+
+def _sql_now():
+    return _format_datetime(datetime.now())
+
+def _sql_curdate():
+    return date.today().isoformat()
+
+def _sql_timestamp(date_value, time_value=None):
+    if date_value is None:
+        return None
+    moment = _to_datetime(date_value)
+    if time_value is not None:
+        moment += _parse_timedelta(str(time_value))
+    return _format_datetime(moment)
+
+_UNIT_SECONDS = {'SECOND': 1, 'MINUTE': 60, 'HOUR': 3600, 'DAY': 86400, 'WEEK': 604800}
+
+def _sql_timestampdiff(unit, start, end):
+    if start is None or end is None:
+        return None
+    seconds = (_to_datetime(end) - _to_datetime(start)).total_seconds()
+    # Float so that "TIMESTAMPDIFF(...) / 3600" divides like MySQL instead of truncating
+    return float(int(seconds / _UNIT_SECONDS[unit.upper()]))
+
+def _sql_unix_timestamp(value=None):
+    moment = datetime.now() if value is None else _to_datetime(value)
+    return int(moment.timestamp()) if moment else None
+
+def _sql_from_unixtime(value):
+    return None if value is None else _format_datetime(datetime.fromtimestamp(value))
+
+def _sql_floor(value):
+    return None if value is None else int(value // 1)
+
+def _register_functions(connection):
+    connection.create_function('NOW', 0, _sql_now)
+    connection.create_function('CURDATE', 0, _sql_curdate)
+    connection.create_function('TIMESTAMP', 1, _sql_timestamp)
+    connection.create_function('TIMESTAMP', 2, _sql_timestamp)
+    connection.create_function('TIMESTAMPDIFF', 3, _sql_timestampdiff)
+    connection.create_function('UNIX_TIMESTAMP', 0, _sql_unix_timestamp)
+    connection.create_function('UNIX_TIMESTAMP', 1, _sql_unix_timestamp)
+    connection.create_function('FROM_UNIXTIME', 1, _sql_from_unixtime)
+    connection.create_function('FLOOR', 1, _sql_floor)
+
+# Statement translation
+
+_TIMESTAMPDIFF_UNIT = re.compile(r'TIMESTAMPDIFF\(\s*(\w+)\s*,', re.IGNORECASE)
+_FOR_UPDATE = re.compile(r'\s+FOR\s+UPDATE\b', re.IGNORECASE)
+_INSERT_IGNORE = re.compile(r'^\s*INSERT\s+IGNORE\b', re.IGNORECASE)
+_EXPLAIN = re.compile(r'^\s*EXPLAIN\s+(?!QUERY\s+PLAN)', re.IGNORECASE)
+_ON_DUPLICATE_KEY = re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', re.IGNORECASE)
+_VALUES_FUNCTION = re.compile(r'\bVALUES\(\s*(\w+)\s*\)', re.IGNORECASE)
+_translation_cache = {}
+
+def translate_query(query):
+    """Translate a MySQL statement, returns (sql, locks) where locks means it was SELECT ... FOR UPDATE"""
+    cached = _translation_cache.get(query)
+    if cached is not None:
+        return cached
+    
+    sql = query.replace('%s', '?').replace('%%', '%')
+    sql = _TIMESTAMPDIFF_UNIT.sub(lambda m: f"TIMESTAMPDIFF('{m.group(1).upper()}',", sql)
+    sql = _INSERT_IGNORE.sub('INSERT OR IGNORE', sql)
+    sql = _EXPLAIN.sub('EXPLAIN QUERY PLAN ', sql)
+    upsert = _ON_DUPLICATE_KEY.search(sql)
+    if upsert:
+        # SQLite 3.35+ accepts an upsert without a conflict target, VALUES(col) becomes excluded.col
+        updates = _VALUES_FUNCTION.sub(r'excluded.\1', sql[upsert.end():])
+        sql = sql[:upsert.start()] + 'ON CONFLICT DO UPDATE SET' + updates
+    locks = bool(_FOR_UPDATE.search(sql))
+    if locks:
+        sql = _FOR_UPDATE.sub('', sql)
+    
+    result = (sql, locks)
+    if len(_translation_cache) < 10000:
+        _translation_cache[query] = result
+    return result
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+class SQLiteCursor:
+    """Subset of PyMySQL's DictCursor on top of sqlite3"""
+    
+    def __init__(self, connection):
+        self._connection = connection
+        self._cursor = connection.raw.cursor()
+    
+    def execute(self, query, args=None):
+        sql, locks = translate_query(query)
+        if locks and not self._connection.raw.in_transaction:
+            # SQLite has no row locks, take the write lock up front instead
+            self._cursor.execute('BEGIN IMMEDIATE')
+        self._cursor.execute(sql, tuple(args) if args is not None else ())
+        return self._cursor.rowcount
+    
+    def executemany(self, query, args):
+        sql, _ = translate_query(query)
+        self._cursor.executemany(sql, [tuple(row) for row in args])
+        return self._cursor.rowcount
+    
+    def fetchone(self):
+        return self._cursor.fetchone()
+    
+    def fetchall(self):
+        return self._cursor.fetchall()
+    
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size or self._cursor.arraysize)
+    
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+    
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+    
+    @property
+    def description(self):
+        return self._cursor.description
+    
+    def __iter__(self):
+        return iter(self._cursor)
+    
+    def close(self):
+        self._cursor.close()
+
+class SQLiteConnection:
+    """Subset of a PyMySQL connection on top of sqlite3"""
+    
+    def __init__(self, raw):
+        self.raw = raw
+    
+    def cursor(self):
+        return SQLiteCursor(self)
+    
+    def commit(self):
+        self.raw.commit()
+    
+    def rollback(self):
+        self.raw.rollback()
+    
+    def close(self):
+        self.raw.close()
+
+# Schema translation from the MySQL migrations
+
+_COLUMN_TRANSLATIONS = [
+    (re.compile(r'\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b', re.IGNORECASE), 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    (re.compile(r'\bBIGINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b', re.IGNORECASE), 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    (re.compile(r'\bENUM\s*\([^)]*\)', re.IGNORECASE), 'TEXT'),
+    (re.compile(r'\bJSON\b', re.IGNORECASE), 'TEXT'),
+    (re.compile(r'\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP\b', re.IGNORECASE), ''),
+    (re.compile(r'\bDEFAULT\s+CURRENT_TIMESTAMP\b', re.IGNORECASE), "DEFAULT (datetime('now', 'localtime'))"),
+    (re.compile(r'\s+(AFTER\s+\w+|FIRST)\s*$', re.IGNORECASE), ''),
+]
+_CONSTRAINT_PREFIX = re.compile(r'^(PRIMARY\s+KEY|FOREIGN\s+KEY|UNIQUE|KEY|INDEX|FULLTEXT|CONSTRAINT|CHECK)\b', re.IGNORECASE)
+_INLINE_INDEX = re.compile(r'^(UNIQUE\s+)?(?:KEY|INDEX)\s+(\w+)\s*\((.*)\)$', re.IGNORECASE | re.DOTALL)
+_CREATE_TABLE = re.compile(r'^CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?\s*\((.*)\)[^)]*$', re.IGNORECASE | re.DOTALL)
+_ALTER_TABLE = re.compile(r'^ALTER\s+TABLE\s+`?(\w+)`?\s+(.*)$', re.IGNORECASE | re.DOTALL)
+_ADD_COLUMN = re.compile(r'^ADD\s+(?:COLUMN\s+)?(?!INDEX\b|KEY\b|UNIQUE\b|FULLTEXT\b|CONSTRAINT\b|PRIMARY\b|FOREIGN\b)(\w+)\s+(.*)$', re.IGNORECASE | re.DOTALL)
+_MODIFY_COLUMN = re.compile(r'^MODIFY\s+(?:COLUMN\s+)?(\w+)\s+(.*)$', re.IGNORECASE | re.DOTALL)
+_ADD_INDEX = re.compile(r'^ADD\s+(UNIQUE\s+)?(?:KEY|INDEX)\s+(\w+)\s*\((.*)\)$', re.IGNORECASE | re.DOTALL)
+_CREATE_INDEX = re.compile(r'^CREATE\s+(UNIQUE\s+)?INDEX\s+(\w+)\s+ON\s+(\w+)\s*\((.*)\)', re.IGNORECASE | re.DOTALL)
+_INDEX_PREFIX_LENGTH = re.compile(r'(\w+)\s*\(\d+\)')
+
+def _split_top_level(text, separator=','):
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == separator and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    if ''.join(current).strip():
+        parts.append(''.join(current).strip())
+    return parts
+
+def _translate_column(definition):
+    for pattern, replacement in _COLUMN_TRANSLATIONS:
+        definition = pattern.sub(replacement, definition)
+    return definition.strip()
+
+def _index_columns(columns):
+    # SQLite has no prefix indexes
+    return _INDEX_PREFIX_LENGTH.sub(r'\1', columns)
+
+def _read_statements(path):
+    """Split a migration into statements, dropping the ones marked "-- mysql-only" """
+    statements = []
+    mysql_only = False
+    current = []
+    with open(path, encoding='utf-8') as migration:
+        for line in migration:
+            stripped = line.strip()
+            if stripped.startswith('--'):
+                if 'mysql-only' in stripped.lower():
+                    mysql_only = True
+                continue
+            current.append(line)
+            if stripped.endswith(';'):
+                statement = ''.join(current).strip().rstrip(';').strip()
+                current = []
+                if statement and not mysql_only:
+                    statements.append(statement)
+                mysql_only = False
+    return statements
+
+class _SchemaBuilder:
+    """Collects translated DDL so later ALTERs can be folded into tables created in the same run"""
+    
+    def __init__(self, connection):
+        self.connection = connection
+        self.operations = []
+        self.tables = {}
+    
+    def add(self, statement):
+        head = ' '.join(statement.split()[:2]).upper()
+        
+        if head.startswith('CREATE DATABASE') or head.startswith('USE ') or head == 'USE':
+            return
+        
+        match = _CREATE_TABLE.match(statement)
+        if match:
+            self._create_table(match.group(1), match.group(2))
+            return
+        
+        match = _CREATE_INDEX.match(statement)
+        if match:
+            self._index(match.group(3), match.group(2), match.group(4), bool(match.group(1)))
+            return
+        
+        match = _ALTER_TABLE.match(statement)
+        if match:
+            for clause in _split_top_level(match.group(2)):
+                self._alter(match.group(1), clause)
+            return
+        
+        self.operations.append(('sql', statement))
+    
+    def _create_table(self, name, body):
+        columns, constraints, indexes = [], [], []
+        for item in _split_top_level(body):
+            index = _INLINE_INDEX.match(item)
+            if index and not index.group(1):
+                indexes.append((index.group(2), index.group(3)))
+            elif index:
+                constraints.append(f'UNIQUE ({_index_columns(index.group(3))})')
+            elif item.upper().startswith('FULLTEXT'):
+                continue
+            elif _CONSTRAINT_PREFIX.match(item):
+                constraints.append(item)
+            else:
+                columns.append(_translate_column(item))
+        table = {'name': name, 'columns': columns, 'constraints': constraints}
+        self.tables[name] = table
+        self.operations.append(('table', table))
+        for index_name, index_columns in indexes:
+            self._index(name, index_name, index_columns, False)
+    
+    def _alter(self, table_name, clause):
+        table = self.tables.get(table_name)
+        
+        match = _ADD_INDEX.match(clause)
+        if match:
+            self._index(table_name, match.group(2), match.group(3), bool(match.group(1)))
+            return
+        
+        match = _ADD_COLUMN.match(clause)
+        if match:
+            definition = _translate_column(f'{match.group(1)} {match.group(2)}')
+            if table:
+                table['columns'].append(definition)
+            else:
+                self.operations.append(('sql', f'ALTER TABLE {table_name} ADD COLUMN {definition}'))
+            return
+        
+        match = _MODIFY_COLUMN.match(clause)
+        if match:
+            definition = _translate_column(f'{match.group(1)} {match.group(2)}')
+            if table:
+                table['columns'] = [
+                    definition if column.split()[0] == match.group(1) else column
+                    for column in table['columns']
+                ]
+            else:
+                logger.warning("SQLite cannot modify %s.%s on an existing database, skipping", table_name, match.group(1))
+            return
+        
+        logger.warning("Skipping unsupported ALTER TABLE %s clause for SQLite: %s", table_name, clause)
+    
+    def _index(self, table_name, index_name, columns, unique):
+        unique_sql = 'UNIQUE ' if unique else ''
+        self.operations.append((
+            'sql',
+            f'CREATE {unique_sql}INDEX IF NOT EXISTS {index_name} ON {table_name} ({_index_columns(columns)})'
+        ))
+    
+    def apply(self):
+        cursor = self.connection.cursor()
+        for kind, operation in self.operations:
+            if kind == 'table':
+                body = ',\n    '.join(operation['columns'] + operation['constraints'])
+                cursor.execute(f"CREATE TABLE IF NOT EXISTS {operation['name']} (\n    {body}\n)")
+            else:
+                cursor.execute(operation)
+        cursor.close()
+
+def _migration_files(migrations_dir):
+    return sorted(glob.glob(os.path.join(migrations_dir, '*.sql')))
+
+def apply_migrations(connection, migrations_dir):
+    """Apply the migrations not yet recorded in schema_migrations"""
+    raw = connection.raw
+    raw.execute("CREATE TABLE IF NOT EXISTS schema_migrations (name TEXT PRIMARY KEY)")
+    applied = {row['name'] for row in raw.execute("SELECT name FROM schema_migrations").fetchall()}
+    pending = [path for path in _migration_files(migrations_dir) if os.path.basename(path) not in applied]
+    
+    if not pending:
+        return []
+    
+    builder = _SchemaBuilder(connection)
+    for path in pending:
+        for statement in _read_statements(path):
+            builder.add(statement)
+    
+    try:
+        builder.apply()
+        raw.executemany(
+            "INSERT INTO schema_migrations (name) VALUES (?)",
+            [(os.path.basename(path),) for path in pending]
+        )
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    
+    logger.info("Applied %d migrations to SQLite database", len(pending))
+    return pending
+
+# Full-text search, FTS5 trigram tables standing in for the FULLTEXT ngram indexes of 011_pass_search.sql
+
+SEARCH_INDEXES = {
+    'passes': 'passes_search',
+    'passes_archive': 'passes_archive_search',
+}
+SEARCH_COLUMNS = ('visitor_name', 'visitor_phone', 'qr_code_string')
+
+def ensure_search_indexes(raw):
+    """Create the external-content FTS5 tables and the triggers keeping them in step, filling new ones"""
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+    existing = {row['name'] for row in raw.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()}
+    
+    for table, index in SEARCH_INDEXES.items():
+        if index in existing or table not in existing:
+            continue
+        
+        raw.executescript(f"""
+            CREATE VIRTUAL TABLE {index} USING fts5({columns}, content='{table}', content_rowid='id', tokenize='trigram');
+            CREATE TRIGGER {index}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {index} (rowid, {columns}) VALUES (new.id, {new_values});
+            END;
+            CREATE TRIGGER {index}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {index} ({index}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            END;
+            CREATE TRIGGER {index}_au AFTER UPDATE OF {columns} ON {table} BEGIN
+                INSERT INTO {index} ({index}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO {index} (rowid, {columns}) VALUES (new.id, {new_values});
+            END;
+            INSERT INTO {index} ({index}) VALUES ('rebuild');
+        """)
+        logger.info("Built SQLite search index %s", index)
+
+def _open(path):
+    if path == ':memory:':
+        # A named shared-cache database so every connection sees the same data
+        raw = sqlite3.connect(
+            'file:siddhivinayak_memory?mode=memory&cache=shared',
+            uri=True,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+            timeout=30
+        )
+    else:
+        raw = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False, timeout=30)
+        raw.execute('PRAGMA journal_mode=WAL')
+        raw.execute('PRAGMA synchronous=NORMAL')
+    raw.row_factory = _dict_row
+    raw.execute('PRAGMA foreign_keys=ON')
+    _register_functions(raw)
+    return raw
+
+def connect(path, migrations_dir):
+    """Open a connection, creating the schema from the migrations on first use"""
+    connection = SQLiteConnection(_open(path))
+    
+    if path not in _initialized_paths:
+        with _schema_lock:
+            if path not in _initialized_paths:
+                if path == ':memory:':
+                    # The in-memory database lives as long as one connection stays open
+                    _memory_keepers[path] = _open(path)
+                apply_migrations(connection, migrations_dir)
+                ensure_search_indexes(connection.raw)
+                _initialized_paths.add(path)
+    
+    return connection
@@ -4,10 +4,140 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class Config:
+    # 'mysql', or 'sqlite' to run everything on an embedded database file (':memory:' for a throwaway one)
+    DB_BACKEND = os.getenv('DB_BACKEND', 'mysql')
+    SQLITE_PATH = os.getenv('SQLITE_PATH', 'siddhivinayak.db')
+    MIGRATIONS_DIR = os.getenv('MIGRATIONS_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations'))
+    
     DB_HOST = os.getenv('DB_HOST', 'localhost')
     DB_USER = os.getenv('DB_USER', 'root')
     DB_PASSWORD = os.getenv('DB_PASSWORD', '')
     DB_NAME = os.getenv('DB_NAME', 'siddhivinayak_pro')
     DB_PORT = int(os.getenv('DB_PORT', 3306))
+    
+    # Read replica used by GET requests, leave DB_READ_HOST empty to read from the primary
+    DB_READ_HOST = os.getenv('DB_READ_HOST', '')
+    DB_READ_USER = os.getenv('DB_READ_USER', DB_USER)
+    DB_READ_PASSWORD = os.getenv('DB_READ_PASSWORD', DB_PASSWORD)
+    DB_READ_PORT = int(os.getenv('DB_READ_PORT', DB_PORT))
+    DB_READ_CONNECT_TIMEOUT = int(os.getenv('DB_READ_CONNECT_TIMEOUT', 2))
+    DB_READ_RETRY_SECONDS = int(os.getenv('DB_READ_RETRY_SECONDS', 30))
     JWT_SECRET = os.getenv('JWT_SECRET')
-    GRACE_MINUTES_DEFAULT = 30
\ No newline at end of file
+    GRACE_MINUTES_DEFAULT = 30
+    
+    # Pass expiry sweeper
+    EXPIRY_SWEEP_ENABLED = os.getenv('EXPIRY_SWEEP_ENABLED', 'true').lower() == 'true'
+    EXPIRY_SWEEP_INTERVAL_SECONDS = int(os.getenv('EXPIRY_SWEEP_INTERVAL_SECONDS', 60))
+    EXPIRY_SWEEP_MODE = os.getenv('EXPIRY_SWEEP_MODE', 'EXPIRE')  # EXPIRE or NO_SHOW
+    
+    # Slow-query log
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', 0.1))
+    SLOW_QUERY_MAX_STATEMENTS = int(os.getenv('SLOW_QUERY_MAX_STATEMENTS', 500))
+    
+    # Import ReportLab/qrcode at startup instead of on first use, for workers that render tickets
+    PRELOAD_RENDERERS = os.getenv('PRELOAD_RENDERERS', 'false').lower() == 'true'
+    
+    # Hot/cold archiving
+    ARCHIVE_ENABLED = os.getenv('ARCHIVE_ENABLED', 'false').lower() == 'true'
+    ARCHIVE_INTERVAL_SECONDS = int(os.getenv('ARCHIVE_INTERVAL_SECONDS', 86400))
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 1000))
+    PASS_RETENTION_DAYS = int(os.getenv('PASS_RETENTION_DAYS', 30))
+    LOG_RETENTION_DAYS = int(os.getenv('LOG_RETENTION_DAYS', 90))
+    LOG_ARCHIVE_DIR = os.getenv('LOG_ARCHIVE_DIR', 'log_archive')
+    
+    # Reminder dispatcher, what to send and when is configured in settings.reminder_config
+    REMINDERS_ENABLED = os.getenv('REMINDERS_ENABLED', 'false').lower() == 'true'
+    REMINDER_TICK_SECONDS = int(os.getenv('REMINDER_TICK_SECONDS', 30))
+    REMINDER_WORKERS = int(os.getenv('REMINDER_WORKERS', 8))
+    REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', 500))
+    REMINDER_MAX_ATTEMPTS = int(os.getenv('REMINDER_MAX_ATTEMPTS', 5))
+    REMINDER_RETRY_BASE_SECONDS = int(os.getenv('REMINDER_RETRY_BASE_SECONDS', 30))
+    
+    # Response compression and the shared-view response cache
+    COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', 1024))
+    GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+    BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 5))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 256))
+    
+    # Admission control, concurrency budget / max queued requests / queue timeout per traffic class
+    ADMISSION_CONTROL_ENABLED = os.getenv('ADMISSION_CONTROL_ENABLED', 'true').lower() == 'true'
+    ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv('ADMISSION_RETRY_AFTER_SECONDS', 2))
+    ADMISSION_GATE_CONCURRENCY = int(os.getenv('ADMISSION_GATE_CONCURRENCY', 64))
+    ADMISSION_GATE_QUEUE = int(os.getenv('ADMISSION_GATE_QUEUE', 256))
+    ADMISSION_GATE_TIMEOUT = float(os.getenv('ADMISSION_GATE_TIMEOUT', 5))
+    ADMISSION_CREATE_CONCURRENCY = int(os.getenv('ADMISSION_CREATE_CONCURRENCY', 32))
+    ADMISSION_CREATE_QUEUE = int(os.getenv('ADMISSION_CREATE_QUEUE', 128))
+    ADMISSION_CREATE_TIMEOUT = float(os.getenv('ADMISSION_CREATE_TIMEOUT', 3))
+    ADMISSION_REPORT_CONCURRENCY = int(os.getenv('ADMISSION_REPORT_CONCURRENCY', 4))
+    ADMISSION_REPORT_QUEUE = int(os.getenv('ADMISSION_REPORT_QUEUE', 8))
+    ADMISSION_REPORT_TIMEOUT = float(os.getenv('ADMISSION_REPORT_TIMEOUT', 1))
+    ADMISSION_DEFAULT_CONCURRENCY = int(os.getenv('ADMISSION_DEFAULT_CONCURRENCY', 32))
+    ADMISSION_DEFAULT_QUEUE = int(os.getenv('ADMISSION_DEFAULT_QUEUE', 128))
+    ADMISSION_DEFAULT_TIMEOUT = float(os.getenv('ADMISSION_DEFAULT_TIMEOUT', 3))
+    # Sync (WSGI) server only: requests allowed to queue across all classes, each one blocks a worker thread.
+    # Keep it well below the server's thread count, 0 sheds as soon as a class is saturated
+    ADMISSION_MAX_QUEUED_THREADS = int(os.getenv('ADMISSION_MAX_QUEUED_THREADS', 0))
+    
+    # Aarti schedule generation
+    AARTI_SCHEDULE_MAX_DAYS = int(os.getenv('AARTI_SCHEDULE_MAX_DAYS', 366))
+    # Dates whose slots each worker keeps in memory, least recently read are dropped first
+    AARTI_CACHE_MAX_DATES = int(os.getenv('AARTI_CACHE_MAX_DATES', 400))
+    
+    # Visitor phone numbers, region assumed for numbers entered without a country code
+    DEFAULT_PHONE_REGION = os.getenv('DEFAULT_PHONE_REGION', 'IN')
+    PHONE_BACKFILL_ENABLED = os.getenv('PHONE_BACKFILL_ENABLED', 'true').lower() == 'true'
+    PHONE_BACKFILL_INTERVAL_SECONDS = int(os.getenv('PHONE_BACKFILL_INTERVAL_SECONDS', 3600))
+    PHONE_BACKFILL_BATCH_SIZE = int(os.getenv('PHONE_BACKFILL_BATCH_SIZE', 1000))
+    
+    # Idempotency-Key replay store (idempotency_keys table, with a per-worker LRU in front)
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', 86400))
+    IDEMPOTENCY_MAX_ENTRIES = int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', 10000))
+    # How long an unfinished claim holds off retries, in case the worker running it died
+    IDEMPOTENCY_CLAIM_SECONDS = int(os.getenv('IDEMPOTENCY_CLAIM_SECONDS', 300))
+    
+    # Most pass ids accepted by one POST /passes/batch
+    PASS_BATCH_MAX_IDS = int(os.getenv('PASS_BATCH_MAX_IDS', 100))
+    
+    # Darshan slots, passes are grouped into SLOT_MINUTES buckets for capacity limits
+    SLOT_MINUTES = int(os.getenv('SLOT_MINUTES', 30))
+    SLOT_OPENING_TIME = os.getenv('SLOT_OPENING_TIME', '05:00')
+    SLOT_CLOSING_TIME = os.getenv('SLOT_CLOSING_TIME', '22:00')
+    
+    # Cross-worker cache coherence through the change_log table
+    COHERENCE_ENABLED = os.getenv('COHERENCE_ENABLED', 'false').lower() == 'true'
+    COHERENCE_POLL_MS = int(os.getenv('COHERENCE_POLL_MS', 300))
+    COHERENCE_RETENTION_SECONDS = int(os.getenv('COHERENCE_RETENTION_SECONDS', 3600))
+    
+    # Warm-start snapshots of the in-memory indexes (slot occupancy, aarti availability)
+    SNAPSHOT_ENABLED = os.getenv('SNAPSHOT_ENABLED', 'false').lower() == 'true'
+    SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', 'snapshots/warm_start.snap')
+    SNAPSHOT_INTERVAL_SECONDS = int(os.getenv('SNAPSHOT_INTERVAL_SECONDS', 60))
+    SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv('SNAPSHOT_MAX_AGE_SECONDS', 21600))
+    
+    # Audit log API, widest time range one activity query may aggregate
+    LOG_ACTIVITY_MAX_RANGE_HOURS = int(os.getenv('LOG_ACTIVITY_MAX_RANGE_HOURS', 168))
+    
+    # Optional async serving mode (asgi.py), aiomysql pool per database
+    ASYNC_DB_POOL_MIN_SIZE = int(os.getenv('ASYNC_DB_POOL_MIN_SIZE', 1))
+    ASYNC_DB_POOL_MAX_SIZE = int(os.getenv('ASYNC_DB_POOL_MAX_SIZE', 20))
+    
+    # On-demand request profiling, admins send X-Profile: 1 or a PROFILE_SAMPLE_RATE fraction is sampled
+    PROFILE_ENABLED = os.getenv('PROFILE_ENABLED', 'true').lower() == 'true'
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 5))
+    PROFILE_MAX_SECONDS = int(os.getenv('PROFILE_MAX_SECONDS', 60))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 500))
+    
+    # Help-desk pass search, candidates fetched per table before re-ranking and the weakest match kept
+    SEARCH_CANDIDATE_LIMIT = int(os.getenv('SEARCH_CANDIDATE_LIMIT', 500))
+    SEARCH_MIN_SCORE = float(os.getenv('SEARCH_MIN_SCORE', 0.6))
+    SEARCH_DEFAULT_WINDOW_DAYS = int(os.getenv('SEARCH_DEFAULT_WINDOW_DAYS', 30))
+    SEARCH_MAX_WINDOW_DAYS = int(os.getenv('SEARCH_MAX_WINDOW_DAYS', 366))
+    
+    # Most issue ids accepted by one POST /scanner/issues/resolve
+    ISSUE_RESOLVE_MAX_IDS = int(os.getenv('ISSUE_RESOLVE_MAX_IDS', 500))
+    
+    # Bearer token GET /metrics requires, empty leaves it open and it must then be firewalled from the public
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
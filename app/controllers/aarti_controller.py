@@ -1,37 +1,74 @@
 from flask import Blueprint, request, jsonify
+from app.config import Config
 from app.database import get_db_connection
 from app.middleware.auth_middleware import token_required, role_required
+from app.middleware.idempotency import idempotent
 from app.utils.qr_generator import generate_qr_string
-from app.utils.helpers import assign_attendant_round_robin, log_action, json_serializer
-from datetime import datetime
+from app.utils.helpers import assign_attendant_round_robin, log_action
+from app.utils.response_cache import cached_json_response
+from app.utils.phone import normalize_phone
+from app.utils import aarti_cache, occupancy
+from datetime import date, datetime, timedelta
 
 aarti_bp = Blueprint('aarti', __name__)
 
+AARTI_NAMES = ('KAKAD', 'MADHYAN', 'DHOOP', 'SHEJ')
+WEEKDAYS = ('MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', 'SUNDAY')
+
+# Time written on passes created by an aarti booking
+AARTI_PASS_TIME = '06:00:00'
+
+AARTI_SLOTS_QUERY = """
+    SELECT * FROM aarti WHERE date = %s ORDER BY name
+"""
+
+# Rows per multi-row upsert statement
+SCHEDULE_CHUNK_SIZE = 500
+
 @aarti_bp.route('/aarti', methods=['GET'])
 @token_required
 def get_aarti_slots(current_user):
     date_param = request.args.get('date')
     
     if not date_param:
-        date_param = datetime.now().date()
+        date_param = datetime.now().date().isoformat()
     
-    conn = get_db_connection()
+    try:
+        date_param = date.fromisoformat(date_param).isoformat()
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+    
+    version, aarti_slots = aarti_cache.get_slots(date_param, fetch_aarti_slots)
+    
+    # Clients send back the version they hold to get a cheap "unchanged" answer
+    if request.args.get('version', type=int) == version:
+        return jsonify({'unchanged': True, 'version': version}), 200
+    
+    key, tables = aarti_slots_cache_key(date_param, version)
+    return cached_json_response(key, tables, lambda: {'aarti_slots': aarti_slots, 'version': version})
+
+def aarti_slots_cache_key(date_param, version):
+    """(response cache key, tables) of a date's slots, the version already changes with every write"""
+    return ('aarti_slots', date_param, version), ()
+
+def fetch_aarti_slots(date_param):
+    # Primary, the cached slots must include the write that invalidated them
+    conn = get_db_connection(readonly=False)
     cursor = conn.cursor()
     
-    cursor.execute("""
-        SELECT * FROM aarti WHERE date = %s ORDER BY name
-    """, (date_param,))
+    cursor.execute(AARTI_SLOTS_QUERY, (date_param,))
     
     aarti_slots = cursor.fetchall()
     
     cursor.close()
     conn.close()
     
-    return jsonify({'aarti_slots': aarti_slots}, default=json_serializer), 200
+    return aarti_slots
 
 @aarti_bp.route('/aarti/book', methods=['POST'])
 @token_required
 @role_required(['TRUSTEE', 'ASSISTANT', 'ADMIN'])
+@idempotent
 def book_aarti(current_user):
     data = request.json
     
@@ -46,7 +83,7 @@ def book_aarti(current_user):
     try:
         # Get aarti slot
         cursor.execute("""
-            SELECT * FROM aarti WHERE id = %s
+            SELECT * FROM aarti WHERE id = %s FOR UPDATE
         """, (data['aarti_id'],))
         
         aarti = cursor.fetchone()
@@ -77,19 +114,21 @@ def book_aarti(current_user):
         # Create pass for aarti
         cursor.execute("""
             INSERT INTO passes (
-                trustee_id, visitor_name, visitor_phone, visitor_email,
+                trustee_id, assistant_id, visitor_name, visitor_phone, visitor_phone_e164, visitor_email,
                 total_people, darshan_type, date, time, grace_minutes,
                 assigned_attendant_id, qr_code_string, status, trustee_note
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """, (
             current_user['user_id'],
+            current_user['user_id'] if current_user['role'] == 'ASSISTANT' else None,
             data['visitor_name'],
             data['visitor_phone'],
+            normalize_phone(data['visitor_phone']),
             data.get('visitor_email'),
             data['count'],
             'NORMAL',
             aarti['date'],
-            '06:00:00',  # Default time, adjust as needed
+            AARTI_PASS_TIME,
             grace_minutes,
             attendant['id'],
             qr_string,
@@ -101,11 +140,15 @@ def book_aarti(current_user):
         
         # Update aarti capacity
         cursor.execute("""
-            UPDATE aarti SET booked_capacity = booked_capacity + %s
+            UPDATE aarti SET booked_capacity = booked_capacity + %s, updated_at = NOW()
             WHERE id = %s
         """, (data['count'], data['aarti_id']))
         
+        conn.mark_changed('aarti', aarti['date'])
+        conn.mark_changed('occupancy', aarti['date'])
         conn.commit()
+        aarti_cache.apply_booking(aarti['date'], aarti['id'], data['count'])
+        occupancy.add(aarti['date'], AARTI_PASS_TIME, data['count'])
         
         # Log action
         log_action(conn, current_user['user_id'], 'BOOK_AARTI', 'AARTI', data['aarti_id'], data)
@@ -152,7 +195,7 @@ def update_aarti_capacity(current_user):
         if existing:
             # Update existing
             cursor.execute("""
-                UPDATE aarti SET total_capacity = %s, status = %s
+                UPDATE aarti SET total_capacity = %s, status = %s, updated_at = NOW()
                 WHERE id = %s
             """, (data['total_capacity'], data.get('status', 'OPEN'), existing['id']))
         else:
@@ -162,7 +205,9 @@ def update_aarti_capacity(current_user):
                 VALUES (%s, %s, %s, 0, %s)
             """, (data['name'], data['date'], data['total_capacity'], data.get('status', 'OPEN')))
         
+        conn.mark_changed('aarti', data['date'])
         conn.commit()
+        aarti_cache.invalidate(data['date'])
         
         return jsonify({'message': 'Aarti capacity updated'}), 200
         
@@ -172,3 +217,119 @@ def update_aarti_capacity(current_user):
     finally:
         cursor.close()
         conn.close()
+
+def _capacity_map(value, label):
+    """Validate a {aarti name: capacity} mapping, raises ValueError"""
+    if not isinstance(value, dict):
+        raise ValueError(f'{label} must be an object of aarti name to capacity')
+    capacities = {}
+    for name, capacity in value.items():
+        name = str(name).upper()
+        if name not in AARTI_NAMES:
+            raise ValueError(f'{label}: unknown aarti {name}')
+        if not isinstance(capacity, int) or isinstance(capacity, bool) or capacity < 0:
+            raise ValueError(f'{label}: capacity for {name} must be a non-negative integer')
+        capacities[name] = capacity
+    return capacities
+
+def build_aarti_schedule(data):
+    """Expand a date range, template and overrides into (name, date, capacity, status) rows, raises ValueError"""
+    try:
+        start = date.fromisoformat(data['start_date'])
+        end = date.fromisoformat(data['end_date'])
+    except (TypeError, ValueError):
+        raise ValueError('start_date and end_date must be YYYY-MM-DD dates')
+    
+    days = (end - start).days + 1
+    if days < 1:
+        raise ValueError('end_date must not be before start_date')
+    if days > Config.AARTI_SCHEDULE_MAX_DAYS:
+        raise ValueError(f'At most {Config.AARTI_SCHEDULE_MAX_DAYS} days can be scheduled at once')
+    
+    status = data.get('status', 'OPEN')
+    if status not in ('OPEN', 'CLOSED'):
+        raise ValueError('status must be OPEN or CLOSED')
+    
+    template = _capacity_map(data['capacities'], 'capacities')
+    
+    weekday_overrides = {}
+    for weekday, capacities in (data.get('weekday_overrides') or {}).items():
+        if str(weekday).upper() not in WEEKDAYS:
+            raise ValueError(f'weekday_overrides: unknown weekday {weekday}')
+        weekday_overrides[WEEKDAYS.index(str(weekday).upper())] = _capacity_map(capacities, f'weekday_overrides.{weekday}')
+    
+    # Festival days, applied over the weekday overrides
+    date_overrides = {}
+    for day, capacities in (data.get('date_overrides') or {}).items():
+        try:
+            override_date = date.fromisoformat(day)
+        except (TypeError, ValueError):
+            raise ValueError(f'date_overrides: {day} is not a YYYY-MM-DD date')
+        date_overrides[override_date] = _capacity_map(capacities, f'date_overrides.{day}')
+    
+    rows = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        capacities = dict(template)
+        capacities.update(weekday_overrides.get(day.weekday(), {}))
+        capacities.update(date_overrides.get(day, {}))
+        for name in AARTI_NAMES:
+            if name in capacities:
+                rows.append((name, day, capacities[name], status))
+    return rows
+
+@aarti_bp.route('/aarti/schedule', methods=['POST'])
+@token_required
+@role_required(['ADMIN', 'TRUSTEE'])
+def schedule_aarti(current_user):
+    data = request.get_json(silent=True) or {}
+    
+    required_fields = ['start_date', 'end_date', 'capacities']
+    for field in required_fields:
+        if field not in data:
+            return jsonify({'error': f'{field} is required'}), 400
+    
+    try:
+        rows = build_aarti_schedule(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # Existing slots keep their bookings, only capacity and status change
+        for start in range(0, len(rows), SCHEDULE_CHUNK_SIZE):
+            chunk = rows[start:start + SCHEDULE_CHUNK_SIZE]
+            cursor.execute(f"""
+                INSERT INTO aarti (name, date, total_capacity, booked_capacity, status)
+                VALUES {', '.join(['(%s, %s, %s, 0, %s)'] * len(chunk))}
+                ON DUPLICATE KEY UPDATE total_capacity = VALUES(total_capacity), status = VALUES(status), updated_at = NOW()
+            """, [value for row in chunk for value in row])
+        
+        scheduled_dates = sorted({row[1] for row in rows})
+        for day in scheduled_dates:
+            conn.mark_changed('aarti', day)
+        conn.commit()
+        aarti_cache.invalidate(*scheduled_dates)
+        
+        log_action(conn, current_user['user_id'], 'SCHEDULE_AARTI', 'AARTI', None, {
+            'start_date': data['start_date'],
+            'end_date': data['end_date'],
+            'slots': len(rows)
+        })
+        
+        return jsonify({
+            'message': 'Aarti schedule saved',
+            'start_date': data['start_date'],
+            'end_date': data['end_date'],
+            'days': len(scheduled_dates),
+            'slots': len(rows)
+        }), 200
+    
+    except Exception as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
@@ -1,8 +1,17 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, send_from_directory
+from app.config import Config
 from app.database import get_db_connection
 from app.middleware.auth_middleware import token_required, role_required
-from app.utils.helpers import json_serializer
+from app.utils.query_log import get_top_queries
+from app.utils.profiler import list_profiles, is_profile_name
+from app.utils.helpers import log_action
+from app.utils.rebalancer import rebalance_passes
+from app.utils.occupancy import parse_capacity_config
+from app.utils.reminders import validate_reminder_config
 import bcrypt
+import json
+import os
+from datetime import date, datetime, timedelta
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -104,8 +113,16 @@ def update_user(current_user, user_id):
         if cursor.rowcount == 0:
             return jsonify({'error': 'User not found'}), 404
         
+        # A deactivated attendant's remaining passes go to those still on duty
+        rebalance = None
+        if data.get('is_active') is False:
+            rebalance = rebalance_passes(conn, [user_id])
+        
         conn.commit()
         
+        if rebalance and rebalance['moves']:
+            log_action(conn, current_user['user_id'], 'REBALANCE_PASSES', 'USER', user_id, rebalance)
+        
         return jsonify({'message': 'User updated successfully'}), 200
         
     except Exception as e:
@@ -115,6 +132,46 @@ def update_user(current_user, user_id):
         cursor.close()
         conn.close()
 
+@admin_bp.route('/admin/rebalance', methods=['POST'])
+@token_required
+@role_required(['ADMIN'])
+def rebalance_attendants(current_user):
+    data = request.get_json(silent=True) or {}
+    attendant_ids = data.get('attendant_ids')
+    
+    if not attendant_ids or not isinstance(attendant_ids, list):
+        return jsonify({'error': 'attendant_ids must be a non-empty list'}), 400
+    
+    if not all(isinstance(attendant_id, int) and not isinstance(attendant_id, bool) and attendant_id > 0 for attendant_id in attendant_ids):
+        return jsonify({'error': 'attendant_ids must be positive integers'}), 400
+    
+    try:
+        day = date.fromisoformat(data['date']) if data.get('date') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+    
+    dry_run = bool(data.get('dry_run', False))
+    
+    conn = get_db_connection()
+    
+    try:
+        rebalance = rebalance_passes(conn, list(dict.fromkeys(attendant_ids)), day, dry_run=dry_run)
+        
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+            if rebalance['moves']:
+                log_action(conn, current_user['user_id'], 'REBALANCE_PASSES', 'USER', None, rebalance)
+        
+        return jsonify(rebalance), 200
+    
+    except Exception as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        conn.close()
+
 @admin_bp.route('/admin/attendance', methods=['GET'])
 @token_required
 @role_required(['ADMIN'])
@@ -150,7 +207,7 @@ def get_attendance(current_user):
     cursor.close()
     conn.close()
     
-    return jsonify({'attendance': attendance_records}, default=json_serializer), 200
+    return jsonify({'attendance': attendance_records}), 200
 
 @admin_bp.route('/admin/performance', methods=['GET'])
 @token_required
@@ -181,7 +238,33 @@ def get_performance(current_user):
     cursor.close()
     conn.close()
     
-    return jsonify({'performance': performance}, default=json_serializer), 200
+    return jsonify({'performance': performance}), 200
+
+@admin_bp.route('/admin/slow-queries', methods=['GET'])
+@token_required
+@role_required(['ADMIN'])
+def get_slow_queries(current_user):
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+    
+    return jsonify({'queries': get_top_queries(limit)}), 200
+
+@admin_bp.route('/admin/profiles', methods=['GET'])
+@token_required
+@role_required(['ADMIN'])
+def get_profiles(current_user):
+    endpoint = request.args.get('endpoint')
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    
+    return jsonify({'profiles': list_profiles(endpoint, limit)}), 200
+
+@admin_bp.route('/admin/profiles/<name>', methods=['GET'])
+@token_required
+@role_required(['ADMIN'])
+def download_profile(current_user, name):
+    if not is_profile_name(name):
+        return jsonify({'error': 'Profile not found'}), 404
+    
+    return send_from_directory(os.path.abspath(Config.PROFILE_DIR), name, mimetype='text/plain')
 
 @admin_bp.route('/admin/settings', methods=['PATCH'])
 @token_required
@@ -205,9 +288,22 @@ def update_settings(current_user):
             values.append(data['max_visitors_per_attendant'])
         
         if 'reminder_config' in data:
+            try:
+                validate_reminder_config(data['reminder_config'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
             update_fields.append('reminder_config = %s')
             values.append(json.dumps(data['reminder_config']))
         
+        if 'slot_capacity_config' in data:
+            try:
+                parse_capacity_config(data['slot_capacity_config'])
+            except (AttributeError, TypeError, ValueError):
+                return jsonify({'error': 'slot_capacity_config must look like {"default": 200, "slots": {"09:00": 80}}, '
+                                         'with whole numbers of people or null'}), 400
+            update_fields.append('slot_capacity_config = %s')
+            values.append(json.dumps(data['slot_capacity_config']))
+        
         if not update_fields:
             return jsonify({'error': 'No fields to update'}), 400
         
@@ -224,3 +320,142 @@ def update_settings(current_user):
     finally:
         cursor.close()
         conn.close()
+
+LOG_ENTITY_TYPES = ('PASS', 'USER', 'AARTI', 'SETTINGS', 'OTHER')
+
+def _parse_log_time(value):
+    """ISO datetime as naive server local time like logs.created_at, raises ValueError"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+def _log_filters(args):
+    """WHERE conditions and args for the shared audit log filters, raises ValueError"""
+    conditions, values = [], []
+    
+    if args.get('user_id'):
+        conditions.append('user_id = %s')
+        values.append(int(args['user_id']))
+    
+    if args.get('action'):
+        conditions.append('action = %s')
+        values.append(args['action'])
+    
+    if args.get('entity_type'):
+        if args['entity_type'] not in LOG_ENTITY_TYPES:
+            raise ValueError('Invalid entity_type')
+        conditions.append('entity_type = %s')
+        values.append(args['entity_type'])
+    
+    if args.get('entity_id'):
+        conditions.append('entity_id = %s')
+        values.append(int(args['entity_id']))
+    
+    if args.get('from'):
+        conditions.append('created_at >= %s')
+        values.append(_parse_log_time(args['from']))
+    
+    if args.get('to'):
+        conditions.append('created_at < %s')
+        values.append(_parse_log_time(args['to']))
+    
+    return conditions, values
+
+@admin_bp.route('/admin/logs', methods=['GET'])
+@token_required
+@role_required(['ADMIN'])
+def get_logs(current_user):
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    
+    try:
+        conditions, values = _log_filters(request.args)
+        
+        # Keyset pagination, newest first, '<created_at>:<id>' of the last row seen
+        if request.args.get('cursor'):
+            cursor_created_at, cursor_id = request.args['cursor'].rsplit(':', 1)
+            cursor_created_at = _parse_log_time(cursor_created_at)
+            conditions.append('(created_at < %s OR (created_at = %s AND id < %s))')
+            values.extend([cursor_created_at, cursor_created_at, int(cursor_id)])
+    except ValueError as e:
+        return jsonify({'error': f'Invalid filter: {e}'}), 400
+    
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    # Served by the (filter column, created_at, id) indexes
+    cursor.execute(f"""
+        SELECT id, user_id, action, entity_type, entity_id, payload, created_at
+        FROM logs
+        {where}
+        ORDER BY created_at DESC, id DESC
+        LIMIT %s
+    """, (*values, limit + 1))
+    
+    logs = cursor.fetchall()
+    
+    cursor.close()
+    conn.close()
+    
+    next_cursor = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        next_cursor = f"{logs[-1]['created_at'].isoformat()}:{logs[-1]['id']}"
+    
+    for log in logs:
+        if isinstance(log['payload'], str):
+            log['payload'] = json.loads(log['payload'])
+    
+    return jsonify({'logs': logs, 'next_cursor': next_cursor}), 200
+
+@admin_bp.route('/admin/logs/activity', methods=['GET'])
+@token_required
+@role_required(['ADMIN'])
+def get_log_activity(current_user):
+    bucket_seconds = request.args.get('bucket_seconds', 60, type=int)
+    if not 1 <= bucket_seconds <= 86400:
+        return jsonify({'error': 'bucket_seconds must be between 1 and 86400'}), 400
+    
+    # Always a bounded time range, an unbounded aggregate would scan the whole table
+    args = request.args.to_dict()
+    try:
+        end = _parse_log_time(args['to']) if args.get('to') else datetime.now()
+        start = _parse_log_time(args['from']) if args.get('from') else end - timedelta(hours=1)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid filter: {e}'}), 400
+    
+    if end - start > timedelta(hours=Config.LOG_ACTIVITY_MAX_RANGE_HOURS):
+        return jsonify({'error': f'Time range is limited to {Config.LOG_ACTIVITY_MAX_RANGE_HOURS} hours'}), 400
+    
+    args['from'], args['to'] = start.isoformat(), end.isoformat()
+    try:
+        conditions, values = _log_filters(args)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid filter: {e}'}), 400
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(f"""
+        SELECT FROM_UNIXTIME(FLOOR(UNIX_TIMESTAMP(created_at) / %s) * %s) as bucket_start,
+               action,
+               COUNT(*) as count
+        FROM logs
+        WHERE {' AND '.join(conditions)}
+        GROUP BY bucket_start, action
+        ORDER BY bucket_start, action
+    """, (bucket_seconds, bucket_seconds, *values))
+    
+    buckets = cursor.fetchall()
+    
+    cursor.close()
+    conn.close()
+    
+    return jsonify({
+        'from': start,
+        'to': end,
+        'bucket_seconds': bucket_seconds,
+        'buckets': buckets
+    }), 200
@@ -1,12 +1,23 @@
 from flask import Blueprint, request, jsonify
 from app.database import get_db_connection
 from app.middleware.auth_middleware import token_required, role_required
-from app.utils.helpers import log_action, json_serializer
+from app.middleware.idempotency import idempotent
+from app.utils import occupancy
+from app.utils.helpers import log_action
+from app.utils.rebalancer import rebalance_passes
 import json
 from datetime import datetime, date
 
 attendant_bp = Blueprint('attendant', __name__)
 
+ASSIGNED_PASSES_QUERY = """
+SELECT p.*, u.name as trustee_name
+FROM passes p
+LEFT JOIN users u ON p.trustee_id = u.id
+WHERE p.assigned_attendant_id = %s AND p.date = %s
+ORDER BY p.time ASC
+"""
+
 @attendant_bp.route('/attendant/assigned', methods=['GET'])
 @token_required
 @role_required(['ATTENDANT'])
@@ -16,21 +27,13 @@ def get_assigned_passes(current_user):
     
     today = date.today()
     
-    query = """
-    SELECT p.*, u.name as trustee_name
-    FROM passes p
-    LEFT JOIN users u ON p.trustee_id = u.id
-    WHERE p.assigned_attendant_id = %s AND DATE(p.date) = %s
-    ORDER BY p.time ASC
-    """
-    
-    cursor.execute(query, (current_user['user_id'], today))
+    cursor.execute(ASSIGNED_PASSES_QUERY, (current_user['user_id'], today))
     passes = cursor.fetchall()
     
     cursor.close()
     conn.close()
     
-    return jsonify({'passes': passes}, default=json_serializer), 200
+    return jsonify({'passes': passes}), 200
 
 @attendant_bp.route('/attendant/upcoming', methods=['GET'])
 @token_required
@@ -45,7 +48,7 @@ def get_upcoming_passes(current_user):
     SELECT p.*, u.name as trustee_name
     FROM passes p
     LEFT JOIN users u ON p.trustee_id = u.id
-    WHERE p.assigned_attendant_id = %s AND DATE(p.date) > %s
+    WHERE p.assigned_attendant_id = %s AND p.date > %s
     ORDER BY p.date ASC, p.time ASC
     LIMIT 20
     """
@@ -56,7 +59,7 @@ def get_upcoming_passes(current_user):
     cursor.close()
     conn.close()
     
-    return jsonify({'passes': passes}, default=json_serializer), 200
+    return jsonify({'passes': passes}), 200
 
 @attendant_bp.route('/attendant/mark-contacted', methods=['POST'])
 @token_required
@@ -98,6 +101,7 @@ def mark_contacted(current_user):
 @attendant_bp.route('/attendant/update-status', methods=['POST'])
 @token_required
 @role_required(['ATTENDANT'])
+@idempotent
 def update_status(current_user):
     data = request.json
     pass_id = data.get('pass_id')
@@ -117,7 +121,7 @@ def update_status(current_user):
     try:
         # Check if pass exists and is assigned to this attendant
         cursor.execute("""
-            SELECT status FROM passes 
+            SELECT status, date, time, total_people FROM passes 
             WHERE id = %s AND assigned_attendant_id = %s
         """, (pass_id, current_user['user_id']))
         
@@ -139,7 +143,10 @@ def update_status(current_user):
                 VALUES (%s, %s, 'ATTENDANT', NOW())
             """, (pass_id, stage_map[status]))
         
+        if status == 'COMPLETED':
+            conn.mark_changed('occupancy', pass_data['date'])
         conn.commit()
+        occupancy.apply_status_change(pass_data, status)
         
         # Log action
         log_action(conn, current_user['user_id'], 'UPDATE_STATUS', 'PASS', pass_id, {'status': status})
@@ -284,9 +291,19 @@ def mark_attendance_out(current_user):
             WHERE id = %s
         """, (record['id'],))
         
+        # Hand remaining passes to the attendants still on duty
+        rebalance = rebalance_passes(conn, [current_user['user_id']], today)
+        
         conn.commit()
         
-        return jsonify({'message': 'Attendance marked OUT'}), 200
+        if rebalance['moves']:
+            log_action(conn, current_user['user_id'], 'REBALANCE_PASSES', 'USER', current_user['user_id'], rebalance)
+        
+        return jsonify({
+            'message': 'Attendance marked OUT',
+            'reassigned_passes': len(rebalance['moves']),
+            'unassigned_passes': len(rebalance['unassigned_pass_ids'])
+        }), 200
         
     except Exception as e:
         conn.rollback()
@@ -1,16 +1,56 @@
 from flask import Blueprint, request, jsonify
+from app.config import Config
 from app.database import get_db_connection
 from app.middleware.auth_middleware import token_required, role_required
+from app.middleware.idempotency import idempotent
 from app.utils.qr_generator import generate_qr_string
-from app.utils.helpers import assign_attendant_round_robin, log_action, json_serializer
+from app.utils.helpers import assign_attendant_round_robin, log_action
+from app.utils.response_cache import cached_json_response
+from app.utils.phone import normalize_phone
+from app.utils import occupancy
 import json
 from datetime import datetime
 
 pass_bp = Blueprint('pass', __name__)
 
+# Today's list per role, the async views run the same queries
+TODAY_PASSES_QUERIES = {
+    'TRUSTEE': """
+        SELECT p.*, u.name as attendant_name, u.phone as attendant_phone
+        FROM passes p
+        LEFT JOIN users u ON p.assigned_attendant_id = u.id
+        WHERE p.trustee_id = %s AND p.date = %s
+        ORDER BY p.time ASC
+    """,
+    'ATTENDANT': """
+        SELECT p.*, u.name as trustee_name
+        FROM passes p
+        LEFT JOIN users u ON p.trustee_id = u.id
+        WHERE p.assigned_attendant_id = %s AND p.date = %s
+        ORDER BY p.time ASC
+    """
+}
+
+ALL_PASSES_FOR_DATE_QUERY = """
+    SELECT p.*, 
+           t.name as trustee_name,
+           a.name as attendant_name,
+           a.phone as attendant_phone
+    FROM passes p
+    LEFT JOIN users t ON p.trustee_id = t.id
+    LEFT JOIN users a ON p.assigned_attendant_id = a.id
+    WHERE p.date = %s
+    ORDER BY p.time ASC
+"""
+
+def passes_today_cache_key(day):
+    """(response cache key, tables it depends on) of the admin view of a day"""
+    return ('passes_today', day), ('passes', 'users')
+
 @pass_bp.route('/passes', methods=['POST'])
 @token_required
 @role_required(['TRUSTEE', 'ASSISTANT', 'ADMIN'])
+@idempotent
 def create_pass(current_user):
     data = request.json
     
@@ -20,20 +60,51 @@ def create_pass(current_user):
         if field not in data:
             return jsonify({'error': f'{field} is required'}), 400
     
+    try:
+        occupancy.slot_bucket(data['time'])
+    except (TypeError, ValueError):
+        return jsonify({'error': 'time must be HH:MM'}), 400
+    
+    try:
+        data['total_people'] = int(str(data['total_people']))
+    except ValueError:
+        return jsonify({'error': 'total_people must be a whole number'}), 400
+    if data['total_people'] < 1:
+        return jsonify({'error': 'total_people must be at least 1'}), 400
+    
     conn = get_db_connection()
     cursor = conn.cursor()
+    reserved = False
     
     try:
-        # Get grace minutes from settings
-        cursor.execute("SELECT grace_minutes_default FROM settings WHERE id = 1")
+        # First in the transaction, so the capacity recheck below sees every booking committed before it
+        occupancy.lock_slot(conn, data['date'], data['time'])
+        
+        # Get grace minutes and slot limits from settings
+        cursor.execute("SELECT grace_minutes_default, slot_capacity_config FROM settings WHERE id = 1")
         settings = cursor.fetchone()
         grace_minutes = settings['grace_minutes_default'] if settings else 30
+        capacity_config = occupancy.parse_capacity_config(settings['slot_capacity_config'] if settings else None)
         
         # Assign attendant using round-robin
         attendant = assign_attendant_round_robin(conn)
         if not attendant:
             return jsonify({'error': 'No active attendants available'}), 400
         
+        # Hold room in the slot, given back below if the pass is not created
+        reserved, booked, capacity = occupancy.reserve(data['date'], data['time'], data['total_people'], capacity_config, conn)
+        if reserved and capacity is not None:
+            # The index misses other workers' bookings, recheck against the database under the slot's lock
+            booked = occupancy.committed_people(conn, data['date'], data['time']) + data['total_people']
+            if booked > capacity:
+                occupancy.cancel(data['date'], data['time'], data['total_people'])
+                reserved, booked = False, booked - data['total_people']
+        if not reserved:
+            return jsonify({
+                'error': f'Slot is full, {max(capacity - booked, 0)} places left',
+                'suggested_slots': occupancy.find_open_slots(data['date'], data['time'], data['total_people'], capacity_config)
+            }), 400
+        
         # Generate QR code
         qr_string = generate_qr_string()
         
@@ -43,17 +114,19 @@ def create_pass(current_user):
         # Insert pass
         query = """
         INSERT INTO passes (
-            trustee_id, assistant_id, visitor_name, visitor_phone, visitor_email,
+            trustee_id, assistant_id, visitor_name, visitor_phone, visitor_phone_e164, visitor_email,
             total_people, darshan_type, vastra_count, vastra_names, date, time,
             grace_minutes, assigned_attendant_id, trustee_note, qr_code_string, status
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """
         
         cursor.execute(query, (
             current_user['user_id'],
-            data.get('assistant_id'),
+            # Assistants see the passes they created through assistant_id
+            current_user['user_id'] if current_user['role'] == 'ASSISTANT' else data.get('assistant_id'),
             data['visitor_name'],
             data['visitor_phone'],
+            normalize_phone(data['visitor_phone']),
             data.get('visitor_email'),
             data['total_people'],
             data['darshan_type'],
@@ -69,7 +142,10 @@ def create_pass(current_user):
         ))
         
         pass_id = cursor.lastrowid
+        conn.mark_changed('occupancy', data['date'])
         conn.commit()
+        occupancy.confirm(data['date'], data['time'], data['total_people'])
+        reserved = False
         
         # Log action
         log_action(conn, current_user['user_id'], 'CREATE_PASS', 'PASS', pass_id, data)
@@ -86,59 +162,74 @@ def create_pass(current_user):
         
     except Exception as e:
         conn.rollback()
+        if reserved:
+            occupancy.cancel(data['date'], data['time'], data['total_people'])
         return jsonify({'error': str(e)}), 500
     finally:
         cursor.close()
         conn.close()
 
-@pass_bp.route('/passes/today', methods=['GET'])
+@pass_bp.route('/passes/availability', methods=['GET'])
 @token_required
-def get_today_passes(current_user):
+@role_required(['TRUSTEE', 'ASSISTANT', 'ADMIN'])
+def get_slot_availability(current_user):
+    date_param = request.args.get('date') or datetime.now().date().isoformat()
+    time_param = request.args.get('time') or Config.SLOT_OPENING_TIME
+    people = request.args.get('people', 1, type=int)
+    limit = min(max(request.args.get('limit', 5, type=int), 1), 50)
+    
+    try:
+        occupancy.slot_bucket(time_param)
+    except ValueError:
+        return jsonify({'error': 'time must be HH:MM'}), 400
+    
     conn = get_db_connection()
     cursor = conn.cursor()
+    capacity_config = occupancy.load_capacity_config(cursor)
+    cursor.close()
+    conn.close()
     
+    # Served from the in-memory occupancy index, passes is not scanned
+    return jsonify({
+        'date': date_param,
+        'slot_minutes': Config.SLOT_MINUTES,
+        'slots': occupancy.find_open_slots(date_param, time_param, people, capacity_config, limit)
+    }), 200
+
+@pass_bp.route('/passes/today', methods=['GET'])
+@token_required
+def get_today_passes(current_user):
     today = datetime.now().date()
     
+    # Every admin sees the same list, serve it from the shared response cache
+    if current_user['role'] not in TODAY_PASSES_QUERIES:
+        key, tables = passes_today_cache_key(today)
+        return cached_json_response(key, tables, lambda: {'passes': fetch_all_passes_for_date(today)})
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
     # Role-based filtering
-    if current_user['role'] == 'TRUSTEE':
-        query = """
-        SELECT p.*, u.name as attendant_name, u.phone as attendant_phone
-        FROM passes p
-        LEFT JOIN users u ON p.assigned_attendant_id = u.id
-        WHERE p.trustee_id = %s AND DATE(p.date) = %s
-        ORDER BY p.time ASC
-        """
-        cursor.execute(query, (current_user['user_id'], today))
-        
-    elif current_user['role'] == 'ATTENDANT':
-        query = """
-        SELECT p.*, u.name as trustee_name
-        FROM passes p
-        LEFT JOIN users u ON p.trustee_id = u.id
-        WHERE p.assigned_attendant_id = %s AND DATE(p.date) = %s
-        ORDER BY p.time ASC
-        """
-        cursor.execute(query, (current_user['user_id'], today))
-        
-    else:  # ADMIN
-        query = """
-        SELECT p.*, 
-               t.name as trustee_name,
-               a.name as attendant_name,
-               a.phone as attendant_phone
-        FROM passes p
-        LEFT JOIN users t ON p.trustee_id = t.id
-        LEFT JOIN users a ON p.assigned_attendant_id = a.id
-        WHERE DATE(p.date) = %s
-        ORDER BY p.time ASC
-        """
-        cursor.execute(query, (today,))
+    cursor.execute(TODAY_PASSES_QUERIES[current_user['role']], (current_user['user_id'], today))
     
     passes = cursor.fetchall()
     cursor.close()
     conn.close()
     
-    return jsonify({'passes': passes}, default=json_serializer), 200
+    return jsonify({'passes': passes}), 200
+
+def fetch_all_passes_for_date(day):
+    """All passes for a date with trustee and attendant names (the admin view)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(ALL_PASSES_FOR_DATE_QUERY, (day,))
+    
+    passes = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    
+    return passes
 
 @pass_bp.route('/passes/<int:pass_id>', methods=['GET'])
 @token_required
@@ -146,19 +237,22 @@ def get_pass_details(current_user, pass_id):
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    # Get pass details
-    cursor.execute("""
-        SELECT p.*, 
-               t.name as trustee_name,
-               a.name as attendant_name,
-               a.phone as attendant_phone
-        FROM passes p
-        LEFT JOIN users t ON p.trustee_id = t.id
-        LEFT JOIN users a ON p.assigned_attendant_id = a.id
-        WHERE p.id = %s
-    """, (pass_id,))
+    # Old passes live in the archive tables, fall back to them transparently
+    for passes_table, scans_table in (('passes', 'scans'), ('passes_archive', 'scans_archive')):
+        cursor.execute(f"""
+            SELECT p.*, 
+                   t.name as trustee_name,
+                   a.name as attendant_name,
+                   a.phone as attendant_phone
+            FROM {passes_table} p
+            LEFT JOIN users t ON p.trustee_id = t.id
+            LEFT JOIN users a ON p.assigned_attendant_id = a.id
+            WHERE p.id = %s
+        """, (pass_id,))
     
-    pass_data = cursor.fetchone()
+        pass_data = cursor.fetchone()
+        if pass_data:
+            break
     
     if not pass_data:
         cursor.close()
@@ -166,8 +260,8 @@ def get_pass_details(current_user, pass_id):
         return jsonify({'error': 'Pass not found'}), 404
     
     # Get timeline (scans)
-    cursor.execute("""
-        SELECT * FROM scans WHERE pass_id = %s ORDER BY created_at ASC
+    cursor.execute(f"""
+        SELECT * FROM {scans_table} WHERE pass_id = %s ORDER BY created_at ASC
     """, (pass_id,))
     
     timeline = cursor.fetchall()
@@ -177,5 +271,81 @@ def get_pass_details(current_user, pass_id):
     
     return jsonify({
         'pass': pass_data,
-        'timeline': timeline
-    }, default=json_serializer), 200
+        'timeline': timeline,
+        'archived': passes_table == 'passes_archive'
+    }), 200
+
+@pass_bp.route('/passes/batch', methods=['POST'])
+@token_required
+def get_pass_details_batch(current_user):
+    data = request.get_json(silent=True) or {}
+    pass_ids = data.get('pass_ids')
+    
+    if not isinstance(pass_ids, list) or not pass_ids:
+        return jsonify({'error': 'pass_ids must be a non-empty list'}), 400
+    
+    if not all(isinstance(pass_id, int) and not isinstance(pass_id, bool) for pass_id in pass_ids):
+        return jsonify({'error': 'pass_ids must be integers'}), 400
+    
+    pass_ids = list(dict.fromkeys(pass_ids))
+    if len(pass_ids) > Config.PASS_BATCH_MAX_IDS:
+        return jsonify({'error': f'At most {Config.PASS_BATCH_MAX_IDS} pass_ids per request'}), 400
+    
+    # Same visibility as get_today_passes
+    scope_sql, scope_args = '', ()
+    if current_user['role'] == 'TRUSTEE':
+        scope_sql, scope_args = 'AND p.trustee_id = %s', (current_user['user_id'],)
+    elif current_user['role'] == 'ATTENDANT':
+        scope_sql, scope_args = 'AND p.assigned_attendant_id = %s', (current_user['user_id'],)
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    found = {}
+    archived = set()
+    
+    # Old passes live in the archive tables, only look there for ids not found live
+    for passes_table in ('passes', 'passes_archive'):
+        missing = [pass_id for pass_id in pass_ids if pass_id not in found]
+        if not missing:
+            break
+        
+        cursor.execute(f"""
+            SELECT p.*, 
+                   t.name as trustee_name,
+                   a.name as attendant_name,
+                   a.phone as attendant_phone
+            FROM {passes_table} p
+            LEFT JOIN users t ON p.trustee_id = t.id
+            LEFT JOIN users a ON p.assigned_attendant_id = a.id
+            WHERE p.id IN ({', '.join(['%s'] * len(missing))}) {scope_sql}
+        """, (*missing, *scope_args))
+        
+        for pass_data in cursor.fetchall():
+            found[pass_data['id']] = pass_data
+            if passes_table == 'passes_archive':
+                archived.add(pass_data['id'])
+    
+    # All timelines in one query per table, grouped by pass
+    timelines = {pass_id: [] for pass_id in found}
+    for scans_table, ids in (('scans', [i for i in found if i not in archived]), ('scans_archive', list(archived))):
+        if not ids:
+            continue
+        cursor.execute(f"""
+            SELECT * FROM {scans_table}
+            WHERE pass_id IN ({', '.join(['%s'] * len(ids))})
+            ORDER BY pass_id, created_at ASC
+        """, ids)
+        for scan in cursor.fetchall():
+            timelines[scan['pass_id']].append(scan)
+    
+    cursor.close()
+    conn.close()
+    
+    return jsonify({
+        'passes': [
+            {'pass': found[pass_id], 'timeline': timelines[pass_id], 'archived': pass_id in archived}
+            for pass_id in pass_ids if pass_id in found
+        ],
+        'not_found': [pass_id for pass_id in pass_ids if pass_id not in found]
+    }), 200
@@ -1,11 +1,49 @@
 from flask import Blueprint, request, jsonify
+from app.config import Config
 from app.database import get_db_connection
 from app.middleware.auth_middleware import token_required, role_required
-from app.utils.helpers import log_action, json_serializer
+from app.middleware.idempotency import idempotent
+from app.utils import occupancy
+from app.utils.expiry_sweeper import PENDING_STATUSES
+from app.utils.helpers import log_action
 from datetime import datetime
 
 scanner_bp = Blueprint('scanner', __name__)
 
+SCAN_QR_QUERY = """
+    SELECT p.*,
+           t.name as trustee_name,
+           a.name as attendant_name,
+           a.phone as attendant_phone
+    FROM passes p
+    LEFT JOIN users t ON p.trustee_id = t.id
+    LEFT JOIN users a ON p.assigned_attendant_id = a.id
+    WHERE p.qr_code_string = %s
+"""
+
+def scan_result(pass_data):
+    """(body, status) answering a scanned QR code, shared with the async views"""
+    if not pass_data:
+        return {'error': 'Invalid QR code'}, 404
+    
+    # Check if pass is valid
+    if pass_data['status'] in ['CANCELLED', 'EXPIRED']:
+        return {
+            'error': f'Pass is {pass_data["status"]}',
+            'pass': pass_data
+        }, 400
+    
+    if pass_data['status'] == 'COMPLETED':
+        return {
+            'error': 'Pass already completed',
+            'pass': pass_data
+        }, 400
+    
+    return {
+        'message': 'Valid pass',
+        'pass': pass_data
+    }, 200
+
 @scanner_bp.route('/scanner/scan-qr', methods=['POST'])
 @token_required
 @role_required(['SCANNER', 'ADMIN'])
@@ -20,46 +58,20 @@ def scan_qr(current_user):
     cursor = conn.cursor()
     
     # Get pass details
-    cursor.execute("""
-        SELECT p.*,
-               t.name as trustee_name,
-               a.name as attendant_name,
-               a.phone as attendant_phone
-        FROM passes p
-        LEFT JOIN users t ON p.trustee_id = t.id
-        LEFT JOIN users a ON p.assigned_attendant_id = a.id
-        WHERE p.qr_code_string = %s
-    """, (qr_code_string,))
+    cursor.execute(SCAN_QR_QUERY, (qr_code_string,))
     
     pass_data = cursor.fetchone()
     
     cursor.close()
     conn.close()
     
-    if not pass_data:
-        return jsonify({'error': 'Invalid QR code'}), 404
-    
-    # Check if pass is valid
-    if pass_data['status'] in ['CANCELLED', 'EXPIRED']:
-        return jsonify({
-            'error': f'Pass is {pass_data["status"]}',
-            'pass': pass_data
-        }, default=json_serializer), 400
-    
-    if pass_data['status'] == 'COMPLETED':
-        return jsonify({
-            'error': 'Pass already completed',
-            'pass': pass_data
-        }, default=json_serializer), 400
-    
-    return jsonify({
-        'message': 'Valid pass',
-        'pass': pass_data
-    }, default=json_serializer), 200
+    body, status = scan_result(pass_data)
+    return jsonify(body), status
 
 @scanner_bp.route('/scanner/update-status', methods=['POST'])
 @token_required
 @role_required(['SCANNER', 'ADMIN'])
+@idempotent
 def update_pass_status(current_user):
     data = request.json
     pass_id = data.get('pass_id')
@@ -80,6 +92,14 @@ def update_pass_status(current_user):
         # Update pass status
         status_map = {'ARRIVED': 'REACHED', 'AT_GATE': 'AT_GATE', 'COMPLETED': 'COMPLETED'}
         
+        # Completing frees the pass's place in its slot
+        previous = None
+        if stage == 'COMPLETED':
+            cursor.execute("""
+                SELECT status, date, time, total_people FROM passes WHERE id = %s
+            """, (pass_id,))
+            previous = cursor.fetchone()
+        
         cursor.execute("""
             UPDATE passes SET status = %s, updated_at = NOW()
             WHERE id = %s
@@ -94,7 +114,11 @@ def update_pass_status(current_user):
             VALUES (%s, %s, 'SCANNER', NOW())
         """, (pass_id, stage))
         
+        if previous:
+            conn.mark_changed('occupancy', previous['date'])
         conn.commit()
+        if previous:
+            occupancy.apply_status_change(previous, status_map[stage])
         
         # Log action
         log_action(conn, current_user['user_id'], 'SCANNER_UPDATE', 'PASS', pass_id, {'stage': stage})
@@ -108,6 +132,11 @@ def update_pass_status(current_user):
         cursor.close()
         conn.close()
 
+ISSUE_TYPES = ('LATE', 'DUPLICATE_QR', 'NO_SHOW', 'OTHER')
+
+# Statuses a bulk resolve may set instead of restoring each pass's previous one
+RESOLVED_PASS_STATUSES = ('NOT_CONTACTED', 'CONTACTED', 'CONFIRMED', 'REACHED', 'AT_GATE', 'COMPLETED', 'CANCELLED', 'EXPIRED')
+
 @scanner_bp.route('/scanner/issue', methods=['POST'])
 @token_required
 @role_required(['SCANNER', 'ADMIN'])
@@ -117,23 +146,52 @@ def report_issue(current_user):
     issue_type = data.get('issue_type')
     description = data.get('description', '')
     
-    valid_types = ['LATE', 'DUPLICATE_QR', 'NO_SHOW', 'OTHER']
-    
     if not pass_id or not issue_type:
         return jsonify({'error': 'pass_id and issue_type are required'}), 400
     
-    if issue_type not in valid_types:
+    if issue_type not in ISSUE_TYPES:
         return jsonify({'error': 'Invalid issue_type'}), 400
     
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
+        # Locking the pass serializes reports for it, so two scanners can't both open the same issue
+        cursor.execute("""
+            SELECT id, status, date, time, total_people FROM passes WHERE id = %s FOR UPDATE
+        """, (pass_id,))
+        pass_data = cursor.fetchone()
+        
+        if not pass_data:
+            return jsonify({'error': 'Pass not found'}), 404
+        
+        # Served by idx_issues_pass_type_status
+        cursor.execute("""
+            SELECT id, issue_type, previous_pass_status FROM issues
+            WHERE pass_id = %s AND status = 'OPEN'
+        """, (pass_id,))
+        open_issues = cursor.fetchall()
+        
+        for issue in open_issues:
+            if issue['issue_type'] == issue_type:
+                conn.commit()
+                return jsonify({
+                    'message': 'Issue already reported',
+                    'issue_id': issue['id'],
+                    'duplicate': True
+                }), 200
+        
+        # A pass already in ISSUE keeps the status it had before its first open issue
+        previous_status = pass_data['status']
+        if previous_status == 'ISSUE':
+            previous_status = next((issue['previous_pass_status'] for issue in open_issues if issue['previous_pass_status']), None)
+        
         # Insert issue
         cursor.execute("""
-            INSERT INTO issues (pass_id, reported_by_user_id, issue_type, description, status)
-            VALUES (%s, %s, %s, %s, 'OPEN')
-        """, (pass_id, current_user['user_id'], issue_type, description))
+            INSERT INTO issues (pass_id, reported_by_user_id, issue_type, description, status, previous_pass_status)
+            VALUES (%s, %s, %s, %s, 'OPEN', %s)
+        """, (pass_id, current_user['user_id'], issue_type, description, previous_status))
+        issue_id = cursor.lastrowid
         
         # Update pass status
         cursor.execute("""
@@ -141,10 +199,188 @@ def report_issue(current_user):
             WHERE id = %s
         """, (pass_id,))
         
+        # A finished pass takes its place in the slot again while the issue is open
+        reoccupies = pass_data['status'] not in occupancy.OCCUPYING_STATUSES
+        if reoccupies:
+            conn.mark_changed('occupancy', pass_data['date'])
+        conn.commit()
+        if reoccupies:
+            occupancy.add(pass_data['date'], pass_data['time'], pass_data['total_people'])
+        
+        return jsonify({'message': 'Issue reported successfully', 'issue_id': issue_id}), 201
+        
+    except Exception as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@scanner_bp.route('/scanner/issues', methods=['GET'])
+@token_required
+@role_required(['SCANNER', 'ADMIN'])
+def get_open_issues(current_user):
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    
+    conditions = ["i.status = 'OPEN'"]
+    values = []
+    
+    issue_type = request.args.get('issue_type')
+    if issue_type:
+        if issue_type not in ISSUE_TYPES:
+            return jsonify({'error': 'Invalid issue_type'}), 400
+        conditions.append('i.issue_type = %s')
+        values.append(issue_type)
+    
+    # Keyset pagination, oldest first, '<created_at>:<id>' of the last issue seen
+    if request.args.get('cursor'):
+        try:
+            cursor_created_at, cursor_id = request.args['cursor'].rsplit(':', 1)
+            cursor_created_at = datetime.fromisoformat(cursor_created_at)
+            cursor_id = int(cursor_id)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        conditions.append('(i.created_at > %s OR (i.created_at = %s AND i.id > %s))')
+        values.extend([cursor_created_at, cursor_created_at, cursor_id])
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    # Served by idx_issues_status_created
+    cursor.execute(f"""
+        SELECT i.id, i.pass_id, i.issue_type, i.description, i.status, i.previous_pass_status,
+               i.reported_by_user_id, u.name as reported_by_name, i.created_at,
+               p.visitor_name, p.visitor_phone, p.date, p.time, p.status as pass_status, p.qr_code_string
+        FROM issues i
+        JOIN passes p ON p.id = i.pass_id
+        LEFT JOIN users u ON u.id = i.reported_by_user_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY i.created_at ASC, i.id ASC
+        LIMIT %s
+    """, (*values, limit + 1))
+    
+    issues = cursor.fetchall()
+    
+    cursor.close()
+    conn.close()
+    
+    next_cursor = None
+    if len(issues) > limit:
+        issues = issues[:limit]
+        next_cursor = f"{issues[-1]['created_at'].isoformat()}:{issues[-1]['id']}"
+    
+    return jsonify({'issues': issues, 'next_cursor': next_cursor}), 200
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+@scanner_bp.route('/scanner/issues/resolve', methods=['POST'])
+@token_required
+@role_required(['SCANNER', 'ADMIN'])
+def resolve_issues(current_user):
+    data = request.json
+    issue_ids = data.get('issue_ids')
+    pass_status = data.get('pass_status')
+    
+    if not isinstance(issue_ids, list) or not issue_ids:
+        return jsonify({'error': 'issue_ids must be a non-empty list'}), 400
+    
+    if not all(isinstance(issue_id, int) and not isinstance(issue_id, bool) for issue_id in issue_ids):
+        return jsonify({'error': 'issue_ids must be integers'}), 400
+    
+    issue_ids = list(dict.fromkeys(issue_ids))
+    if len(issue_ids) > Config.ISSUE_RESOLVE_MAX_IDS:
+        return jsonify({'error': f'At most {Config.ISSUE_RESOLVE_MAX_IDS} issue_ids per request'}), 400
+    
+    if pass_status is not None and pass_status not in RESOLVED_PASS_STATUSES:
+        return jsonify({'error': 'Invalid pass_status'}), 400
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # Lock the open issues and their passes
+        cursor.execute(f"""
+            SELECT i.id, i.pass_id, i.previous_pass_status, p.status as pass_status, p.date, p.time, p.total_people,
+                   TIMESTAMPDIFF(MINUTE, TIMESTAMP(p.date, p.time), NOW()) > p.grace_minutes as overdue
+            FROM issues i
+            JOIN passes p ON p.id = i.pass_id
+            WHERE i.id IN ({_placeholders(issue_ids)}) AND i.status = 'OPEN'
+            FOR UPDATE
+        """, issue_ids)
+        rows = cursor.fetchall()
+        
+        if not rows:
+            conn.commit()
+            return jsonify({'resolved_issue_ids': [], 'restored_passes': [], 'unrestored_pass_ids': []}), 200
+        
+        resolved_ids = [row['id'] for row in rows]
+        cursor.execute(f"""
+            UPDATE issues SET status = 'RESOLVED', resolved_by_user_id = %s, updated_at = NOW()
+            WHERE id IN ({_placeholders(resolved_ids)})
+        """, (current_user['user_id'], *resolved_ids))
+        
+        passes = {}
+        for row in rows:
+            pass_row = passes.setdefault(row['pass_id'], row)
+            if not pass_row['previous_pass_status']:
+                pass_row['previous_pass_status'] = row['previous_pass_status']
+        
+        # Passes with other issues still open stay in ISSUE
+        pass_ids = list(passes)
+        cursor.execute(f"""
+            SELECT DISTINCT pass_id FROM issues
+            WHERE pass_id IN ({_placeholders(pass_ids)}) AND status = 'OPEN'
+        """, pass_ids)
+        still_open = {row['pass_id'] for row in cursor.fetchall()}
+        
+        restores, unrestored = [], []
+        for pass_id, pass_row in passes.items():
+            if pass_id in still_open or pass_row['pass_status'] != 'ISSUE':
+                continue
+            new_status = pass_status or pass_row['previous_pass_status']
+            # A pending pass past its slot plus grace would be swept straight back into a new issue
+            if new_status in PENDING_STATUSES and pass_row['overdue']:
+                new_status = 'EXPIRED'
+            if new_status:
+                restores.append((pass_row, new_status))
+            else:
+                # Reported before previous statuses were recorded
+                unrestored.append(pass_id)
+        
+        if restores:
+            case_sql = ' '.join(['WHEN %s THEN %s'] * len(restores))
+            case_args = [value for pass_row, new_status in restores for value in (pass_row['pass_id'], new_status)]
+            restore_ids = [pass_row['pass_id'] for pass_row, _ in restores]
+            cursor.execute(f"""
+                UPDATE passes
+                SET status = CASE id {case_sql} END, updated_at = NOW()
+                WHERE id IN ({_placeholders(restore_ids)})
+            """, (*case_args, *restore_ids))
+        
+        released = [
+            (pass_row, new_status) for pass_row, new_status in restores
+            if new_status not in occupancy.OCCUPYING_STATUSES
+        ]
+        for day in {pass_row['date'] for pass_row, _ in released}:
+            conn.mark_changed('occupancy', day)
         conn.commit()
+        for pass_row, new_status in released:
+            occupancy.apply_status_change({**pass_row, 'status': 'ISSUE'}, new_status)
         
-        return jsonify({'message': 'Issue reported successfully'}), 201
+        result = {
+            'resolved_issue_ids': resolved_ids,
+            'restored_passes': [
+                {'pass_id': pass_row['pass_id'], 'status': new_status} for pass_row, new_status in restores
+            ],
+            'unrestored_pass_ids': unrestored
+        }
         
+        # One log row per batch
+        log_action(conn, current_user['user_id'], 'RESOLVE_ISSUES', 'PASS', None, result)
+        
+        return jsonify(result), 200
+    
     except Exception as e:
         conn.rollback()
         return jsonify({'error': str(e)}), 500
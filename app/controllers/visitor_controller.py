@@ -0,0 +1,170 @@
+from flask import Blueprint, request, jsonify
+from app.config import Config
+from app.database import get_db_connection
+from app.middleware.auth_middleware import token_required, role_required
+from app.utils.phone import normalize_phone
+from app.utils.search import normalize_query, candidate_query, rank_matches
+from datetime import date, timedelta
+
+visitor_bp = Blueprint('visitor', __name__)
+
+VISITOR_PASS_COLUMNS = """
+    p.id, p.trustee_id, p.assistant_id, p.visitor_name, p.visitor_phone, p.visitor_phone_e164,
+    p.visitor_email, p.total_people, p.darshan_type, p.date, p.time, p.assigned_attendant_id,
+    p.qr_code_string, p.status, p.created_at
+"""
+
+# Column each role is limited to, admins see every pass
+ROLE_SCOPE = {
+    'TRUSTEE': 'trustee_id',
+    'ASSISTANT': 'assistant_id',
+    'ATTENDANT': 'assigned_attendant_id'
+}
+
+def _parse_cursor(value):
+    """'<date>:<id>' of the last pass on the previous page, raises ValueError"""
+    day, pass_id = value.rsplit(':', 1)
+    return date.fromisoformat(day), int(pass_id)
+
+@visitor_bp.route('/visitors/<phone>/passes', methods=['GET'])
+@token_required
+@role_required(['TRUSTEE', 'ASSISTANT', 'ATTENDANT', 'ADMIN'])
+def get_visitor_passes(current_user, phone):
+    phone_e164 = normalize_phone(phone)
+    if not phone_e164:
+        return jsonify({'error': 'Invalid phone number'}), 400
+    
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    
+    conditions = ['p.visitor_phone_e164 = %s']
+    args = [phone_e164]
+    
+    scope = ROLE_SCOPE.get(current_user['role'])
+    if scope:
+        conditions.append(f'p.{scope} = %s')
+        args.append(current_user['user_id'])
+    
+    # Keyset pagination, newest first
+    if request.args.get('cursor'):
+        try:
+            cursor_date, cursor_id = _parse_cursor(request.args['cursor'])
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        conditions.append('(p.date < %s OR (p.date = %s AND p.id < %s))')
+        args.extend([cursor_date, cursor_date, cursor_id])
+    
+    where = ' AND '.join(conditions)
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    # Both halves are served by the (visitor_phone_e164, date, id) indexes
+    cursor.execute(f"""
+        SELECT * FROM (
+            SELECT {VISITOR_PASS_COLUMNS}, 0 as archived FROM passes p WHERE {where}
+            UNION ALL
+            SELECT {VISITOR_PASS_COLUMNS}, 1 as archived FROM passes_archive p WHERE {where}
+        ) history
+        ORDER BY date DESC, id DESC
+        LIMIT %s
+    """, (*args, *args, limit + 1))
+    
+    passes = cursor.fetchall()
+    
+    cursor.close()
+    conn.close()
+    
+    next_cursor = None
+    if len(passes) > limit:
+        passes = passes[:limit]
+        next_cursor = f"{passes[-1]['date']}:{passes[-1]['id']}"
+    
+    for pass_row in passes:
+        pass_row['archived'] = bool(pass_row['archived'])
+    
+    return jsonify({
+        'phone': phone_e164,
+        'passes': passes,
+        'next_cursor': next_cursor
+    }), 200
+
+@visitor_bp.route('/visitors/search', methods=['GET'])
+@token_required
+@role_required(['TRUSTEE', 'ASSISTANT', 'ATTENDANT', 'ADMIN'])
+def search_passes(current_user):
+    query = normalize_query(request.args.get('q'))
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    
+    today = date.today()
+    try:
+        date_from = date.fromisoformat(request.args['from']) if request.args.get('from') else today - timedelta(days=Config.SEARCH_DEFAULT_WINDOW_DAYS)
+        date_to = date.fromisoformat(request.args['to']) if request.args.get('to') else today + timedelta(days=Config.SEARCH_DEFAULT_WINDOW_DAYS)
+    except ValueError:
+        return jsonify({'error': 'Invalid date format, use YYYY-MM-DD'}), 400
+    
+    if date_from > date_to:
+        return jsonify({'error': 'from must not be after to'}), 400
+    
+    if (date_to - date_from).days > Config.SEARCH_MAX_WINDOW_DAYS:
+        return jsonify({'error': f'Date window cannot exceed {Config.SEARCH_MAX_WINDOW_DAYS} days'}), 400
+    
+    conditions = ['p.date BETWEEN %s AND %s']
+    args = [date_from, date_to]
+    
+    scope = ROLE_SCOPE.get(current_user['role'])
+    if scope:
+        conditions.append(f'p.{scope} = %s')
+        args.append(current_user['user_id'])
+    
+    where = ' AND '.join(conditions)
+    
+    # The archive only holds passes older than the retention window
+    tables = [('passes', False)]
+    if date_from < today - timedelta(days=Config.PASS_RETENTION_DAYS):
+        tables.append(('passes_archive', True))
+    
+    phone_e164 = normalize_phone(query) if any(ch.isdigit() for ch in query) else None
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    candidates = {}
+    for table, archived in tables:
+        # Same number typed in another format, straight from the (visitor_phone_e164, date, id) index
+        if phone_e164:
+            cursor.execute(f"""
+                SELECT {VISITOR_PASS_COLUMNS} FROM {table} p
+                WHERE p.visitor_phone_e164 = %s AND {where}
+                LIMIT %s
+            """, (phone_e164, *args, Config.SEARCH_CANDIDATE_LIMIT))
+            for row in cursor.fetchall():
+                row['archived'] = archived
+                candidates[(archived, row['id'])] = row
+    
+    # Typo-tolerant candidates only when the exact matches don't fill the page
+    for fuzzy in (False, True):
+        if fuzzy and len(candidates) >= limit:
+            break
+        for table, archived in tables:
+            statement = candidate_query(table, VISITOR_PASS_COLUMNS, where, args, query, fuzzy)
+            if statement is None:
+                continue
+            cursor.execute(*statement)
+            for row in cursor.fetchall():
+                row['archived'] = archived
+                candidates[(archived, row['id'])] = row
+    
+    cursor.close()
+    conn.close()
+    
+    matches = rank_matches(query, list(candidates.values()), limit, phone_e164)
+    
+    return jsonify({
+        'query': query,
+        'from': date_from,
+        'to': date_to,
+        'passes': matches
+    }), 200
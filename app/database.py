@@ -1,13 +1,187 @@
-import pymysql
+import logging
+import re
+import time
+from flask import g, has_request_context, request
 from app.config import Config
+from app.backends import mysql_backend
 
-def get_db_connection():
-    return pymysql.connect(
-        host=Config.DB_HOST,
-        user=Config.DB_USER,
-        password=Config.DB_PASSWORD,
-        database=Config.DB_NAME,
-        port=Config.DB_PORT,
-        cursorclass=pymysql.cursors.DictCursor,
-        autocommit=False
-    )
\ No newline at end of file
+logger = logging.getLogger(__name__)
+
+# Header a client sends to read its own writes from the primary
+READ_YOUR_WRITES_HEADER = 'X-Read-Your-Writes'
+
+_WRITE_TARGET = re.compile(
+    r'^\s*(?:INSERT(?:\s+IGNORE)?\s+INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM)\s+`?(\w+)',
+    re.IGNORECASE
+)
+
+_query_observers = []
+_pre_commit_hooks = []
+_commit_listeners = []
+_write_targets = {}
+_replica_down_until = 0.0
+
+def register_query_observer(observer):
+    """Register a callback(connection, query, args, elapsed, rowcount) run after every statement"""
+    _query_observers.append(observer)
+
+def notify_query_observers(connection, query, args, elapsed, rowcount):
+    """Report a statement to the query observers, connection is None for the async driver's statements"""
+    for observer in _query_observers:
+        observer(connection, query, args, elapsed, rowcount)
+
+def register_pre_commit_hook(hook):
+    """Register a callback(connection, tables, changes) run inside the transaction right before commit"""
+    _pre_commit_hooks.append(hook)
+
+def register_commit_listener(listener):
+    """Register a callback(tables) run after a commit that wrote to the given set of tables"""
+    _commit_listeners.append(listener)
+
+def written_table(query):
+    """Table an INSERT/UPDATE/DELETE writes to, None for reads"""
+    table = _write_targets.get(query, False)
+    if table is False:
+        match = _WRITE_TARGET.match(query)
+        table = match.group(1).lower() if match else None
+        if len(_write_targets) < 10000:
+            _write_targets[query] = table
+    return table
+
+class InstrumentedCursor:
+    """Cursor wrapper that times every statement and reports it to the query observers"""
+    
+    def __init__(self, cursor, connection):
+        self._cursor = cursor
+        self._connection = connection
+    
+    def execute(self, query, args=None):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(query, args)
+        finally:
+            self._notify(query, args, time.perf_counter() - start)
+    
+    def executemany(self, query, args):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            self._notify(query, args, time.perf_counter() - start)
+    
+    def _notify(self, query, args, elapsed):
+        table = written_table(query)
+        if table:
+            self._connection.written_tables.add(table)
+        notify_query_observers(self._connection, query, args, elapsed, self._cursor.rowcount)
+    
+    def __iter__(self):
+        return iter(self._cursor)
+    
+    # Looked up on the type, __getattr__ doesn't forward these
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+        return False
+    
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class InstrumentedConnection:
+    """Connection wrapper whose cursors are instrumented, everything else is delegated"""
+    
+    def __init__(self, connection, is_replica=False):
+        self.raw = connection
+        self.is_replica = is_replica
+        self.written_tables = set()
+        self.changes = set()
+    
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self.raw.cursor(*args, **kwargs), self)
+    
+    def mark_changed(self, topic, key=None):
+        """Record that this transaction changes a cache topic, optionally just one key of it (e.g. a date)"""
+        if key is not None and hasattr(key, 'isoformat'):
+            key = key.isoformat()
+        self.changes.add((topic, None if key is None else str(key)))
+    
+    def commit(self):
+        if (self.written_tables or self.changes) and _pre_commit_hooks:
+            for hook in _pre_commit_hooks:
+                hook(self, self.written_tables, self.changes)
+        self.raw.commit()
+        tables, self.written_tables = self.written_tables, set()
+        self.changes = set()
+        if tables:
+            for listener in _commit_listeners:
+                listener(tables)
+    
+    def rollback(self):
+        self.written_tables = set()
+        self.changes = set()
+        self.raw.rollback()
+    
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+def get_integrity_error():
+    """The IntegrityError class of the configured backend"""
+    if Config.DB_BACKEND == 'sqlite':
+        from app.backends import sqlite_backend
+        return sqlite_backend.IntegrityError
+    return mysql_backend.IntegrityError
+
+def use_primary():
+    """Send the rest of this request's reads to the primary"""
+    g.use_primary = True
+
+def wants_replica():
+    """GET requests read from the replica unless the client or view asked for read-your-writes"""
+    if not Config.DB_READ_HOST or Config.DB_BACKEND != 'mysql' or not has_request_context():
+        return False
+    if request.method != 'GET' or g.get('use_primary'):
+        return False
+    return request.headers.get(READ_YOUR_WRITES_HEADER, '').lower() not in ('1', 'true')
+
+def _connect(host, user, password, port, **kwargs):
+    return mysql_backend.connect(host, user, password, Config.DB_NAME, port, **kwargs)
+
+def _connect_replica():
+    """Connect to the replica, returns None while it is unreachable"""
+    global _replica_down_until
+    
+    if time.monotonic() < _replica_down_until:
+        return None
+    
+    try:
+        return _connect(
+            Config.DB_READ_HOST,
+            Config.DB_READ_USER,
+            Config.DB_READ_PASSWORD,
+            Config.DB_READ_PORT,
+            connect_timeout=Config.DB_READ_CONNECT_TIMEOUT
+        )
+    except mysql_backend.OperationalError as e:
+        # Don't pay the connect timeout on every request while the replica is down
+        _replica_down_until = time.monotonic() + Config.DB_READ_RETRY_SECONDS
+        logger.warning("Read replica unavailable, falling back to primary: %s", e)
+        return None
+
+def get_db_connection(readonly=None):
+    """Connect to the replica for reads (GET requests by default) and to the primary otherwise"""
+    if Config.DB_BACKEND == 'sqlite':
+        from app.backends import sqlite_backend
+        return InstrumentedConnection(sqlite_backend.connect(Config.SQLITE_PATH, Config.MIGRATIONS_DIR))
+    
+    if readonly is None:
+        readonly = wants_replica()
+    
+    if readonly and Config.DB_READ_HOST:
+        connection = _connect_replica()
+        if connection is not None:
+            return InstrumentedConnection(connection, is_replica=True)
+    
+    connection = _connect(Config.DB_HOST, Config.DB_USER, Config.DB_PASSWORD, Config.DB_PORT)
+    return InstrumentedConnection(connection)
@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import time
+from flask import g, jsonify, request
+from app.config import Config
+from app.utils.metrics import Counter, Gauge, Histogram
+
+# Gate traffic first, then pass creation, reports last
+ENDPOINT_CLASSES = {
+    'attendant.update_status': 'gate',
+    'attendant.mark_contacted': 'gate',
+    'pass.create_pass': 'create',
+    'aarti.book_aarti': 'create',
+}
+BLUEPRINT_CLASSES = {
+    'scanner': 'gate',
+    'admin': 'report',
+}
+# Never queued or shed
+EXEMPT_ENDPOINTS = ('metrics', 'health', 'home')
+
+admission_in_flight = Gauge('sv_admission_in_flight', 'Requests currently admitted per traffic class', ('class',))
+admission_queued = Gauge('sv_admission_queued', 'Requests waiting for admission per traffic class', ('class',))
+admission_admitted = Counter('sv_admission_admitted_total', 'Requests admitted per traffic class', ('class',))
+admission_rejected = Counter('sv_admission_rejected_total', 'Requests shed with 503 per traffic class', ('class', 'reason'))
+admission_wait = Histogram('sv_admission_wait_seconds', 'Time spent queued for admission', ('class',))
+
+class QueueBudget:
+    """Requests allowed to wait across all classes, every waiting request holds a server thread"""
+    
+    def __init__(self, limit):
+        self.limit = limit
+        self._waiting = 0
+        self._lock = threading.Lock()
+    
+    def enter(self):
+        with self._lock:
+            if self._waiting >= self.limit:
+                return False
+            self._waiting += 1
+            return True
+    
+    def leave(self):
+        with self._lock:
+            self._waiting -= 1
+
+class TrafficClass:
+    """Concurrency budget with a bounded, time-limited queue, optionally also bounded by a shared QueueBudget"""
+    
+    def __init__(self, name, concurrency, max_queue, timeout, queue_budget=None):
+        self.name = name
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.queue_budget = queue_budget
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._queued = 0
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Returns None once admitted, otherwise the reason the request was shed"""
+        # Fast path, no queueing when a slot is free
+        if self._slots.acquire(blocking=False):
+            return None
+        
+        with self._lock:
+            if self._queued >= self.max_queue:
+                return 'queue_full'
+            # Waiting blocks this thread, leave enough of them free for the other classes
+            if self.queue_budget is not None and not self.queue_budget.enter():
+                return 'threads_busy'
+            self._queued += 1
+        admission_queued.inc((self.name,))
+        
+        start = time.perf_counter()
+        try:
+            admitted = self._slots.acquire(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self._queued -= 1
+            if self.queue_budget is not None:
+                self.queue_budget.leave()
+            admission_queued.dec((self.name,))
+            admission_wait.observe((self.name,), time.perf_counter() - start)
+        
+        return None if admitted else 'timeout'
+    
+    def release(self):
+        self._slots.release()
+
+class AsyncTrafficClass:
+    """TrafficClass for the async endpoints, queued requests wait on the event loop instead of a thread"""
+    
+    def __init__(self, name, concurrency, max_queue, timeout):
+        self.name = name
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(concurrency)
+        self._queued = 0
+    
+    async def acquire(self):
+        """Returns None once admitted, otherwise the reason the request was shed"""
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return None
+        
+        if self._queued >= self.max_queue:
+            return 'queue_full'
+        self._queued += 1
+        admission_queued.inc((self.name,))
+        
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            return 'timeout'
+        finally:
+            self._queued -= 1
+            admission_queued.dec((self.name,))
+            admission_wait.observe((self.name,), time.perf_counter() - start)
+        return None
+    
+    def release(self):
+        self._slots.release()
+
+def build_classes(traffic_class=TrafficClass, **kwargs):
+    return {
+        'gate': traffic_class('gate', Config.ADMISSION_GATE_CONCURRENCY, Config.ADMISSION_GATE_QUEUE, Config.ADMISSION_GATE_TIMEOUT, **kwargs),
+        'create': traffic_class('create', Config.ADMISSION_CREATE_CONCURRENCY, Config.ADMISSION_CREATE_QUEUE, Config.ADMISSION_CREATE_TIMEOUT, **kwargs),
+        'report': traffic_class('report', Config.ADMISSION_REPORT_CONCURRENCY, Config.ADMISSION_REPORT_QUEUE, Config.ADMISSION_REPORT_TIMEOUT, **kwargs),
+        'default': traffic_class('default', Config.ADMISSION_DEFAULT_CONCURRENCY, Config.ADMISSION_DEFAULT_QUEUE, Config.ADMISSION_DEFAULT_TIMEOUT, **kwargs),
+    }
+
+def classify(endpoint, blueprint):
+    if endpoint in ENDPOINT_CLASSES:
+        return ENDPOINT_CLASSES[endpoint]
+    return BLUEPRINT_CLASSES.get(blueprint, 'default')
+
+def init_admission_control(app):
+    """Admit requests per traffic class, shedding with 503 + Retry-After when a class is saturated
+    
+    The per-class queues are only used as far as ADMISSION_MAX_QUEUED_THREADS allows, a queued request
+    blocks one of the server's threads. By default a saturated class sheds straight away.
+    """
+    traffic_classes = build_classes(queue_budget=QueueBudget(Config.ADMISSION_MAX_QUEUED_THREADS))
+    
+    @app.before_request
+    def admit():
+        if request.endpoint is None or request.endpoint in EXEMPT_ENDPOINTS or request.method == 'OPTIONS':
+            return None
+        
+        traffic_class = traffic_classes[classify(request.endpoint, request.blueprint)]
+        reason = traffic_class.acquire()
+        
+        if reason is not None:
+            admission_rejected.inc((traffic_class.name, reason))
+            response = jsonify({'error': 'Server is busy, please retry shortly'})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(Config.ADMISSION_RETRY_AFTER_SECONDS)
+            return response
+        
+        g.admission_class = traffic_class
+        admission_admitted.inc((traffic_class.name,))
+        admission_in_flight.inc((traffic_class.name,))
+        return None
+    
+    @app.teardown_request
+    def release(exception=None):
+        traffic_class = g.pop('admission_class', None)
+        if traffic_class is not None:
+            admission_in_flight.dec((traffic_class.name,))
+            traffic_class.release()
@@ -4,25 +4,29 @@ import jwt
 from app.config import Config
 from app.database import get_db_connection
 
+def decode_token(token):
+    """(current_user, None) for a valid Authorization header value, (None, error message) otherwise"""
+    if not token:
+        return None, 'Token is missing'
+    
+    try:
+        if token.startswith('Bearer '):
+            token = token.split(' ')[1]
+        
+        return jwt.decode(token, Config.JWT_SECRET, algorithms=['HS256']), None
+        
+    except jwt.ExpiredSignatureError:
+        return None, 'Token has expired'
+    except jwt.InvalidTokenError:
+        return None, 'Invalid token'
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        
-        if not token:
-            return jsonify({'error': 'Token is missing'}), 401
+        current_user, error = decode_token(request.headers.get('Authorization'))
         
-        try:
-            if token.startswith('Bearer '):
-                token = token.split(' ')[1]
-            
-            data = jwt.decode(token, Config.JWT_SECRET, algorithms=['HS256'])
-            current_user = data
-            
-        except jwt.ExpiredSignatureError:
-            return jsonify({'error': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'error': 'Invalid token'}), 401
+        if error:
+            return jsonify({'error': error}), 401
         
         return f(current_user, *args, **kwargs)
     
@@ -0,0 +1,29 @@
+from flask import request
+from app.config import Config
+from app.utils.compression import choose_encoding, compress
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/html', 'text/csv')
+
+def init_compression(app):
+    """Compress responses above COMPRESSION_MIN_BYTES with gzip or brotli, as the client accepts"""
+    
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough
+                or response.status_code < 200 or response.status_code >= 300
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        if len(body) < Config.COMPRESSION_MIN_BYTES:
+            return response
+        
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+        
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,209 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import request, jsonify, make_response
+from app.config import Config
+from app.database import get_db_connection
+from app.utils.metrics import Counter
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+PRUNE_INTERVAL_SECONDS = 60
+
+idempotent_replays = Counter('sv_idempotent_replays_total', 'Requests answered from the idempotency store', ('endpoint',))
+
+class IdempotencyStore:
+    """Bounded LRU of first responses per key, entries expire after ttl seconds"""
+    
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def begin(self, key, fingerprint):
+        """Claim a key, returns ('new', None), ('pending', None), ('mismatch', None) or ('replay', response)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['expires'] <= now:
+                del self._entries[key]
+                entry = None
+            
+            if entry is None:
+                self._entries[key] = {'fingerprint': fingerprint, 'response': None, 'expires': now + self.ttl}
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                return 'new', None
+            
+            self._entries.move_to_end(key)
+            if entry['fingerprint'] != fingerprint:
+                return 'mismatch', None
+            if entry['response'] is None:
+                return 'pending', None
+            return 'replay', entry['response']
+    
+    def finish(self, key, fingerprint, response):
+        """Save the response of a claimed key"""
+        with self._lock:
+            self._entries[key] = {'fingerprint': fingerprint, 'response': response, 'expires': time.monotonic() + self.ttl}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def abandon(self, key):
+        """Forget a key whose request failed so a retry runs again"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+store = IdempotencyStore(Config.IDEMPOTENCY_MAX_ENTRIES, Config.IDEMPOTENCY_TTL_SECONDS)
+
+_last_prune = 0.0
+
+def claim_shared(key, fingerprint):
+    """Claim a key in idempotency_keys for all workers, returns the same states as IdempotencyStore.begin()"""
+    global _last_prune
+    now = datetime.now()
+    claim_expires = now + timedelta(seconds=Config.IDEMPOTENCY_CLAIM_SECONDS)
+    conn = get_db_connection(readonly=False)
+    cursor = conn.cursor()
+    
+    try:
+        if time.monotonic() - _last_prune > PRUNE_INTERVAL_SECONDS:
+            _last_prune = time.monotonic()
+            cursor.execute("DELETE FROM idempotency_keys WHERE expires_at <= %s", (now,))
+        
+        # The unique key lets exactly one worker insert the claim
+        cursor.execute("""
+            INSERT IGNORE INTO idempotency_keys (user_id, endpoint, idempotency_key, fingerprint, expires_at)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (*key, fingerprint, claim_expires))
+        if cursor.rowcount == 1:
+            conn.commit()
+            return 'new', None
+        
+        # Take over an expired row, its response or abandoned claim no longer counts
+        cursor.execute("""
+            UPDATE idempotency_keys
+            SET fingerprint = %s, status_code = NULL, mimetype = NULL, response_body = NULL, expires_at = %s
+            WHERE user_id = %s AND endpoint = %s AND idempotency_key = %s AND expires_at <= %s
+        """, (fingerprint, claim_expires, *key, now))
+        if cursor.rowcount == 1:
+            conn.commit()
+            return 'new', None
+        
+        cursor.execute("""
+            SELECT fingerprint, status_code, mimetype, response_body FROM idempotency_keys
+            WHERE user_id = %s AND endpoint = %s AND idempotency_key = %s
+        """, key)
+        row = cursor.fetchone()
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+    
+    # A row deleted meanwhile was an abandoned claim, the client can retry
+    if row is None or (row['fingerprint'] == fingerprint and row['status_code'] is None):
+        return 'pending', None
+    if row['fingerprint'] != fingerprint:
+        return 'mismatch', None
+    return 'replay', (bytes(row['response_body']), row['status_code'], row['mimetype'])
+
+def finish_shared(key, fingerprint, response):
+    """Save the response of a claimed key for retries on any worker"""
+    body, status, mimetype = response
+    conn = get_db_connection(readonly=False)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            UPDATE idempotency_keys SET status_code = %s, mimetype = %s, response_body = %s, expires_at = %s
+            WHERE user_id = %s AND endpoint = %s AND idempotency_key = %s AND fingerprint = %s
+        """, (status, mimetype, body, datetime.now() + timedelta(seconds=Config.IDEMPOTENCY_TTL_SECONDS), *key, fingerprint))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+def abandon_shared(key, fingerprint):
+    """Release a claim whose request failed so a retry runs again"""
+    conn = get_db_connection(readonly=False)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            DELETE FROM idempotency_keys
+            WHERE user_id = %s AND endpoint = %s AND idempotency_key = %s AND fingerprint = %s AND status_code IS NULL
+        """, (*key, fingerprint))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+def idempotent(f):
+    """Answer retries carrying the same Idempotency-Key with the first response, goes under role_required
+    
+    The local LRU answers retries this worker already saw, every other key is claimed in the shared table
+    before the view runs so that concurrent retries on different workers can't both run it.
+    """
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not idempotency_key:
+            return f(current_user, *args, **kwargs)
+        
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} is too long'}), 400
+        
+        # Keys are per user and endpoint, the body must match the first request
+        key = (current_user['user_id'], request.endpoint, idempotency_key)
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+        
+        state, saved = store.begin(key, fingerprint)
+        if state == 'new':
+            try:
+                state, saved = claim_shared(key, fingerprint)
+            except Exception:
+                store.abandon(key)
+                raise
+            if state == 'replay':
+                store.finish(key, fingerprint, saved)
+            elif state != 'new':
+                store.abandon(key)
+        
+        if state == 'replay':
+            idempotent_replays.inc((request.endpoint,))
+            body, status, mimetype = saved
+            response = make_response(body, status)
+            response.mimetype = mimetype
+            response.headers[REPLAYED_HEADER] = 'true'
+            return response
+        if state == 'pending':
+            return jsonify({'error': 'A request with this Idempotency-Key is still in progress'}), 409
+        if state == 'mismatch':
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used with a different request body'}), 422
+        
+        try:
+            response = make_response(f(current_user, *args, **kwargs))
+        except Exception:
+            store.abandon(key)
+            abandon_shared(key, fingerprint)
+            raise
+        
+        # Server errors are not saved, the client may retry them
+        if response.status_code >= 500:
+            store.abandon(key)
+            abandon_shared(key, fingerprint)
+        else:
+            saved = (response.get_data(), response.status_code, response.mimetype)
+            finish_shared(key, fingerprint, saved)
+            store.finish(key, fingerprint, saved)
+        return response
+    
+    return decorated
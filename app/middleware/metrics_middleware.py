@@ -0,0 +1,67 @@
+import hmac
+import time
+from flask import g, request, has_request_context, jsonify, Response
+from app.config import Config
+from app.database import register_query_observer
+from app.utils.metrics import Histogram, QUERY_COUNT_BUCKETS, render_prometheus
+
+REQUEST_LABELS = ('blueprint', 'endpoint', 'method', 'status')
+
+request_latency = Histogram(
+    'sv_http_request_duration_seconds',
+    'HTTP request latency in seconds',
+    REQUEST_LABELS
+)
+request_db_queries = Histogram(
+    'sv_http_request_db_queries',
+    'Number of DB statements executed per HTTP request',
+    REQUEST_LABELS,
+    buckets=QUERY_COUNT_BUCKETS
+)
+request_db_time = Histogram(
+    'sv_http_request_db_duration_seconds',
+    'Cumulative DB time per HTTP request in seconds',
+    REQUEST_LABELS
+)
+
+def _count_query(connection, query, args, elapsed, rowcount):
+    if has_request_context():
+        g.db_query_count = g.get('db_query_count', 0) + 1
+        g.db_time = g.get('db_time', 0.0) + elapsed
+
+def _metrics_authorized():
+    if not Config.METRICS_TOKEN:
+        return True
+    expected = 'Bearer ' + Config.METRICS_TOKEN
+    return hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected.encode())
+
+def init_metrics(app):
+    """Record per-endpoint latency and DB usage and expose it at /metrics, behind METRICS_TOKEN when set"""
+    register_query_observer(_count_query)
+    
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+    
+    @app.after_request
+    def record_request(response):
+        start = g.get('request_start')
+        if start is None or request.endpoint == 'metrics':
+            return response
+        
+        labels = (
+            request.blueprint or '',
+            request.endpoint or 'unmatched',
+            request.method,
+            str(response.status_code)
+        )
+        request_latency.observe(labels, time.perf_counter() - start)
+        request_db_queries.observe(labels, g.get('db_query_count', 0))
+        request_db_time.observe(labels, g.get('db_time', 0.0))
+        return response
+    
+    @app.route('/metrics')
+    def metrics():
+        if not _metrics_authorized():
+            return jsonify({'error': 'Metrics token is missing or invalid'}), 401
+        return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,69 @@
+import logging
+import random
+import threading
+from flask import g, request
+from app.config import Config
+from app.middleware.auth_middleware import decode_token
+from app.utils.metrics import Counter
+from app.utils.profiler import SamplingProfiler, save_profile
+
+logger = logging.getLogger(__name__)
+
+# Admins send this header to profile a single request
+PROFILE_HEADER = 'X-Profile'
+# Name of the saved profile, fetch it from /api/admin/profiles/<name>
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+EXEMPT_ENDPOINTS = ('metrics', 'health', 'home')
+
+profiles_captured = Counter('sv_profiles_captured_total', 'Requests profiled by trigger', ('trigger',))
+
+def _trigger():
+    """'header' or 'sampled' when this request should be profiled, None otherwise"""
+    if request.headers.get(PROFILE_HEADER, '').lower() in ('1', 'true'):
+        current_user, error = decode_token(request.headers.get('Authorization'))
+        if not error and current_user.get('role') == 'ADMIN':
+            return 'header'
+    
+    if Config.PROFILE_SAMPLE_RATE and random.random() < Config.PROFILE_SAMPLE_RATE:
+        return 'sampled'
+    
+    return None
+
+def init_profiling(app):
+    """Profile requests an admin asks for with X-Profile: 1, plus a PROFILE_SAMPLE_RATE fraction of all requests"""
+    
+    @app.before_request
+    def start_profiler():
+        if request.endpoint in EXEMPT_ENDPOINTS or request.method == 'OPTIONS':
+            return None
+        
+        trigger = _trigger()
+        if trigger:
+            g.profiler = SamplingProfiler(threading.get_ident()).start()
+            profiles_captured.inc((trigger,))
+        return None
+    
+    @app.after_request
+    def save_request_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        
+        profiler.stop()
+        try:
+            name = save_profile(profiler, request.endpoint)
+        except OSError as e:
+            logger.warning("Could not save request profile: %s", e)
+            return response
+        
+        if name:
+            response.headers[PROFILE_ID_HEADER] = name
+        return response
+    
+    @app.teardown_request
+    def stop_profiler(exception=None):
+        # Unhandled errors skip after_request, don't leave the sampler running
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
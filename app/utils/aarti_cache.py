@@ -0,0 +1,121 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from app.config import Config
+from app.utils.coherence import register_change_listener
+from app.utils.helpers import dumps_json
+from app.utils.snapshots import register_snapshot_section
+
+# date -> {'version': int, 'slots': {aarti_id: slot}}, least recently used first
+_dates = OrderedDict()
+# date -> generation, bumped by every change so a load that raced a write is not stored
+_generations = OrderedDict()
+_lock = threading.Lock()
+
+# Left out of the version, they change on every write without changing what clients show
+UNVERSIONED_COLUMNS = ('created_at', 'updated_at', 'remaining_capacity')
+
+def _key(day):
+    return day.isoformat() if hasattr(day, 'isoformat') else str(day)
+
+def _version(slots):
+    """Hash of the slots' contents, so every worker gives the same data the same version"""
+    content = [
+        {column: value for column, value in slot.items() if column not in UNVERSIONED_COLUMNS}
+        for _, slot in sorted(slots.items())
+    ]
+    # 52 bits, exact in a JavaScript number
+    return int(hashlib.sha256(dumps_json(content).encode('utf-8')).hexdigest()[:13], 16)
+
+def _bump(key):
+    """Advance a date's generation, the caller holds _lock"""
+    _generations[key] = _generations.get(key, 0) + 1
+    _generations.move_to_end(key)
+    while len(_generations) > Config.AARTI_CACHE_MAX_DATES:
+        _generations.popitem(last=False)
+
+def _with_remaining(slot):
+    slot = dict(slot)
+    slot['remaining_capacity'] = max(slot['total_capacity'] - (slot['booked_capacity'] or 0), 0)
+    return slot
+
+def lookup(day):
+    """(version, slots) on a hit, (None, generation) on a miss, pass the generation on to store()"""
+    key = _key(day)
+    with _lock:
+        entry = _dates.get(key)
+        if entry is not None:
+            _dates.move_to_end(key)
+            return entry['version'], list(entry['slots'].values())
+        return None, _generations.get(key, 0)
+
+def store(day, generation, rows):
+    """Cache rows loaded after lookup() missed, unless a change landed meanwhile, returns (version, slots)"""
+    key = _key(day)
+    slots = {row['id']: _with_remaining(row) for row in rows}
+    version = _version(slots)
+    with _lock:
+        entry = _dates.get(key)
+        if entry is None:
+            entry = {'version': version, 'slots': slots}
+            if _generations.get(key, 0) == generation:
+                _dates[key] = entry
+                while len(_dates) > Config.AARTI_CACHE_MAX_DATES:
+                    _dates.popitem(last=False)
+    return entry['version'], list(entry['slots'].values())
+
+def get_slots(day, loader):
+    """(version, slots in loader order) for a date, loading them with loader(day) on a miss"""
+    version, found = lookup(day)
+    if version is not None:
+        return version, found
+    return store(day, found, loader(_key(day)))
+
+def apply_booking(day, aarti_id, count):
+    """Update a cached slot in place after a committed booking"""
+    key = _key(day)
+    with _lock:
+        _bump(key)
+        entry = _dates.get(key)
+        if entry is None:
+            return
+        slot = entry['slots'].get(aarti_id)
+        if slot is None:
+            _dates.pop(key, None)
+            return
+        slot = dict(slot)
+        slot['booked_capacity'] = (slot['booked_capacity'] or 0) + count
+        entry['slots'][aarti_id] = _with_remaining(slot)
+        entry['version'] = _version(entry['slots'])
+
+def invalidate(*days):
+    """Drop the cached slots for the given dates (all dates when none are given)"""
+    with _lock:
+        keys = [_key(day) for day in days] if days else list(set(_dates) | set(_generations))
+        for key in keys:
+            _bump(key)
+            _dates.pop(key, None)
+
+def dump_state():
+    with _lock:
+        return {'dates': {key: {'version': entry['version'], 'slots': list(entry['slots'].values())} for key, entry in _dates.items()}}
+
+def load_state(state):
+    """Restore cached dates, their versions are recomputed from the restored slots"""
+    with _lock:
+        for key, entry in state['dates'].items():
+            slots = {slot['id']: slot for slot in entry['slots']}
+            _dates[key] = {'version': _version(slots), 'slots': slots}
+        while len(_dates) > Config.AARTI_CACHE_MAX_DATES:
+            _dates.popitem(last=False)
+
+def _on_remote_changes(changes):
+    if changes is not None and 'aarti' not in changes:
+        return
+    if changes is None or changes['aarti'] is None:
+        invalidate()
+    else:
+        invalidate(*changes['aarti'])
+
+register_change_listener(_on_remote_changes)
+register_snapshot_section('aarti', dump_state, load_state)
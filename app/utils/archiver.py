@@ -0,0 +1,135 @@
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from app.config import Config
+from app.database import get_db_connection
+from app.utils.helpers import json_serializer, log_action
+from app.utils.occupancy import prune_slot_locks
+from app.utils.scheduler import run_periodically
+
+logger = logging.getLogger(__name__)
+
+# Kept in step with the *_archive tables in migrations/003_archive_tables.sql (and later ALTERs)
+PASS_COLUMNS = [
+    'id', 'trustee_id', 'assistant_id', 'visitor_name', 'visitor_phone', 'visitor_email',
+    'total_people', 'darshan_type', 'vastra_count', 'vastra_names', 'date', 'time',
+    'grace_minutes', 'assigned_attendant_id', 'trustee_note', 'attendant_notes',
+    'qr_code_string', 'status', 'created_at', 'updated_at', 'visitor_phone_e164'
+]
+SCAN_COLUMNS = ['id', 'pass_id', 'stage', 'source', 'created_at']
+ISSUE_COLUMNS = [
+    'id', 'pass_id', 'reported_by_user_id', 'issue_type', 'description', 'status',
+    'previous_pass_status', 'resolved_by_user_id', 'created_at', 'updated_at'
+]
+
+def _move_rows(cursor, table, columns, key, ids):
+    """Copy rows whose `key` is in ids into <table>_archive and delete them from table"""
+    column_list = ', '.join(columns)
+    placeholders = ', '.join(['%s'] * len(ids))
+    cursor.execute(f"""
+        INSERT INTO {table}_archive ({column_list})
+        SELECT {column_list} FROM {table} WHERE {key} IN ({placeholders})
+    """, ids)
+    cursor.execute(f"DELETE FROM {table} WHERE {key} IN ({placeholders})", ids)
+    return cursor.rowcount
+
+def archive_passes(connection, cutoff_date, batch_size=None):
+    """Move passes dated before cutoff_date, with their scans and issues, into the archive tables"""
+    batch_size = batch_size or Config.ARCHIVE_BATCH_SIZE
+    cursor = connection.cursor()
+    moved = 0
+    
+    try:
+        while True:
+            cursor.execute("""
+                SELECT id FROM passes WHERE date < %s ORDER BY id LIMIT %s FOR UPDATE
+            """, (cutoff_date, batch_size))
+            pass_ids = [row['id'] for row in cursor.fetchall()]
+            
+            if not pass_ids:
+                connection.commit()
+                break
+            
+            # Children first, they cascade-delete with their pass
+            _move_rows(cursor, 'scans', SCAN_COLUMNS, 'pass_id', pass_ids)
+            _move_rows(cursor, 'issues', ISSUE_COLUMNS, 'pass_id', pass_ids)
+            moved += _move_rows(cursor, 'passes', PASS_COLUMNS, 'id', pass_ids)
+            connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    
+    return moved
+
+def export_logs(connection, cutoff, archive_dir=None, batch_size=None):
+    """Write logs created before cutoff to a gzipped NDJSON file, then delete them, returns (count, path)"""
+    archive_dir = archive_dir or Config.LOG_ARCHIVE_DIR
+    batch_size = batch_size or Config.ARCHIVE_BATCH_SIZE
+    os.makedirs(archive_dir, exist_ok=True)
+    
+    path = os.path.join(archive_dir, f"logs-before-{cutoff.strftime('%Y%m%dT%H%M%S')}-{datetime.now().strftime('%Y%m%dT%H%M%S')}.ndjson.gz")
+    tmp_path = path + '.tmp'
+    cursor = connection.cursor()
+    exported = 0
+    last_id = 0
+    
+    try:
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as archive:
+            while True:
+                cursor.execute("""
+                    SELECT * FROM logs WHERE created_at < %s AND id > %s ORDER BY id LIMIT %s
+                """, (cutoff, last_id, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                for row in rows:
+                    if isinstance(row.get('payload'), str):
+                        row['payload'] = json.loads(row['payload'])
+                    archive.write(json.dumps(row, default=json_serializer) + '\n')
+                exported += len(rows)
+                last_id = rows[-1]['id']
+        
+        if not exported:
+            os.remove(tmp_path)
+            return 0, None
+        
+        os.replace(tmp_path, path)
+        
+        # Only delete once the file is safely on disk
+        cursor.execute("DELETE FROM logs WHERE created_at < %s AND id <= %s", (cutoff, last_id))
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        cursor.close()
+    
+    return exported, path
+
+def run_archiver():
+    now = datetime.now()
+    conn = get_db_connection()
+    try:
+        passes_moved = archive_passes(conn, (now - timedelta(days=Config.PASS_RETENTION_DAYS)).date())
+        logs_exported, path = export_logs(conn, now - timedelta(days=Config.LOG_RETENTION_DAYS))
+        prune_slot_locks(conn)
+        
+        if passes_moved or logs_exported:
+            log_action(conn, None, 'ARCHIVE', 'OTHER', None, {
+                'passes_archived': passes_moved,
+                'logs_exported': logs_exported,
+                'log_file': path
+            })
+        logger.info("Archived %d passes and exported %d log rows", passes_moved, logs_exported)
+    finally:
+        conn.close()
+
+def start_archiver():
+    """Start the background archiving thread"""
+    return run_periodically('archiver', Config.ARCHIVE_INTERVAL_SECONDS, run_archiver)
@@ -0,0 +1,153 @@
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from app.config import Config
+from app.database import get_db_connection, register_pre_commit_hook
+from app.utils.scheduler import run_periodically
+
+logger = logging.getLogger(__name__)
+
+# Identifies this worker's own rows so it does not invalidate what it already updated in place
+ORIGIN = f'{socket.gethostname()}:{os.getpid()}'[:64]
+
+# Ids are allocated before commit, so a slow transaction can land below the high-water mark.
+# Ids a poll skipped are asked for again on every poll until they show up. Once one has been missing
+# for GAP_TIMEOUT_SECONDS, or more than MAX_GAPS are outstanding, every cache is dropped instead.
+GAP_TIMEOUT_SECONDS = 30
+MAX_GAPS = 1000
+POLL_BATCH_SIZE = 1000
+PRUNE_INTERVAL_SECONDS = 60
+
+# Write-heavy tables no in-process cache reads, not worth a change_log row
+IGNORED_TABLES = ('change_log', 'logs', 'reminder_outbox', 'idempotency_keys')
+
+_change_listeners = []
+_last_id = None
+# Skipped id -> time.monotonic() of the poll that first skipped it
+_gaps = {}
+_last_prune = 0.0
+
+def register_change_listener(listener):
+    """Register a callback(changes) for other workers' writes, changes maps topic -> set of keys or None for all.
+
+    changes itself is None when a write may have been missed and every cache must be dropped.
+    """
+    _change_listeners.append(listener)
+
+def record_changes(connection, tables, changes):
+    """Pre-commit hook writing one change_log row per table and marked topic of the transaction"""
+    marked_topics = {topic for topic, _ in changes}
+    rows = [(table, None, ORIGIN) for table in tables if table not in IGNORED_TABLES and table not in marked_topics]
+    rows.extend((topic, key, ORIGIN) for topic, key in changes)
+    if not rows:
+        return
+    
+    # Raw cursor, these rows must not count as a write to change_log themselves
+    cursor = connection.raw.cursor()
+    try:
+        cursor.executemany("""
+            INSERT INTO change_log (topic, entity_key, origin) VALUES (%s, %s, %s)
+        """, rows)
+    finally:
+        cursor.close()
+
+def apply_changes(changes):
+    """Hand changes ({topic: set of keys or None}, or None for everything) to the registered change listeners"""
+    for listener in _change_listeners:
+        try:
+            listener(changes)
+        except Exception:
+            logger.exception("Change listener failed")
+
+def poll_changes(connection):
+    """Invalidate caches for changes other workers committed since the last poll.
+
+    Returns how many topics were invalidated, None when every cache was dropped.
+    """
+    global _last_id, _last_prune
+    cursor = connection.cursor()
+    
+    try:
+        if _last_id is None:
+            # Caches start empty, only changes from here on matter
+            cursor.execute("SELECT MAX(id) as last_id FROM change_log")
+            _last_id = cursor.fetchone()['last_id'] or 0
+            connection.commit()
+            return 0
+        
+        late = []
+        if _gaps:
+            placeholders = ', '.join(['%s'] * len(_gaps))
+            cursor.execute(f"""
+                SELECT id, topic, entity_key, origin FROM change_log WHERE id IN ({placeholders})
+            """, tuple(_gaps))
+            late = cursor.fetchall()
+        
+        cursor.execute("""
+            SELECT id, topic, entity_key, origin FROM change_log
+            WHERE id > %s ORDER BY id LIMIT %s
+        """, (_last_id, POLL_BATCH_SIZE))
+        rows = cursor.fetchall()
+        
+        if time.monotonic() - _last_prune > PRUNE_INTERVAL_SECONDS:
+            _last_prune = time.monotonic()
+            cursor.execute("DELETE FROM change_log WHERE created_at < %s", (
+                datetime.now() - timedelta(seconds=Config.COHERENCE_RETENTION_SECONDS),
+            ))
+        
+        # End the read snapshot so the next poll sees newer commits (REPEATABLE READ)
+        connection.commit()
+    finally:
+        cursor.close()
+    
+    now = time.monotonic()
+    for row in late:
+        del _gaps[row['id']]
+    
+    overflow = False
+    for row in rows:
+        if row['id'] - _last_id - 1 + len(_gaps) > MAX_GAPS:
+            overflow = True
+        elif not overflow:
+            _gaps.update((skipped, now) for skipped in range(_last_id + 1, row['id']))
+        _last_id = row['id']
+    
+    if overflow or any(now - skipped_at > GAP_TIMEOUT_SECONDS for skipped_at in _gaps.values()):
+        logger.warning("Lost track of change_log ids below %s, dropping every cache", _last_id)
+        _gaps.clear()
+        apply_changes(None)
+        return None
+    
+    changes = {}
+    for row in [*late, *rows]:
+        if row['origin'] == ORIGIN:
+            continue
+        if row['entity_key'] is None:
+            changes[row['topic']] = None
+        elif changes.get(row['topic'], set()) is not None:
+            changes.setdefault(row['topic'], set()).add(row['entity_key'])
+    
+    if changes:
+        apply_changes(changes)
+    return len(changes)
+
+_poll_connection = None
+
+def run_coherence_poll():
+    global _poll_connection
+    # One long-lived connection, polling every few hundred ms must not pay for a connect each time
+    if _poll_connection is None:
+        _poll_connection = get_db_connection(readonly=False)
+    try:
+        poll_changes(_poll_connection)
+    except Exception:
+        _poll_connection.close()
+        _poll_connection = None
+        raise
+
+def start_coherence_poller():
+    """Record every write in change_log and start polling it for other workers' changes"""
+    register_pre_commit_hook(record_changes)
+    return run_periodically('coherence-poller', Config.COHERENCE_POLL_MS / 1000.0, run_coherence_poll)
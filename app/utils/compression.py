@@ -0,0 +1,41 @@
+import gzip
+from app.config import Config
+
+# Brotli is in requirements.txt, a build without it still serves gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def choose_encoding(accept_encoding):
+    """Best encoding the client accepts (by q-value, brotli preferred on ties), None for identity"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        pieces = part.strip().split(';')
+        name = pieces[0].strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in pieces[1:]:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=Config.BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=Config.GZIP_LEVEL)
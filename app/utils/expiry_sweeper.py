@@ -0,0 +1,93 @@
+import logging
+from datetime import datetime
+from app.config import Config
+from app.database import get_db_connection
+from app.utils.helpers import log_action
+from app.utils.scheduler import run_periodically
+
+logger = logging.getLogger(__name__)
+
+# Passes the visitor has not turned up for yet
+PENDING_STATUSES = ('NOT_CONTACTED', 'CONTACTED', 'CONFIRMED')
+
+_expiry_listeners = []
+
+def register_expiry_listener(listener):
+    """Register a callback(expired_rows, new_status) run after each sweep that changed passes"""
+    _expiry_listeners.append(listener)
+
+def sweep_expired_passes(connection, now=None, mode=None):
+    """Mark every pending pass whose slot time plus grace has passed, returns the affected rows"""
+    now = now or datetime.now()
+    mode = mode or Config.EXPIRY_SWEEP_MODE
+    new_status = 'ISSUE' if mode == 'NO_SHOW' else 'EXPIRED'
+    
+    cursor = connection.cursor()
+    
+    try:
+        # Lock the overdue passes (served by idx_passes_status_date)
+        placeholders = ', '.join(['%s'] * len(PENDING_STATUSES))
+        cursor.execute(f"""
+            SELECT id, date, time, total_people, assigned_attendant_id, status
+            FROM passes
+            WHERE status IN ({placeholders}) AND date <= %s
+              AND TIMESTAMPDIFF(MINUTE, TIMESTAMP(date, time), %s) > grace_minutes
+            FOR UPDATE
+        """, (*PENDING_STATUSES, now.date(), now))
+        
+        expired = cursor.fetchall()
+        
+        if not expired:
+            connection.commit()
+            return []
+        
+        pass_ids = [row['id'] for row in expired]
+        id_placeholders = ', '.join(['%s'] * len(pass_ids))
+        
+        cursor.execute(f"""
+            UPDATE passes SET status = %s, updated_at = NOW()
+            WHERE id IN ({id_placeholders})
+        """, (new_status, *pass_ids))
+        
+        if mode == 'NO_SHOW':
+            cursor.executemany("""
+                INSERT INTO issues (pass_id, reported_by_user_id, issue_type, description, status, previous_pass_status)
+                VALUES (%s, NULL, 'NO_SHOW', %s, 'OPEN', %s)
+            """, [(row['id'], 'Not scanned within grace period', row['status']) for row in expired])
+        
+        for day in {row['date'] for row in expired}:
+            connection.mark_changed('occupancy', day)
+        connection.commit()
+        
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    
+    # One log row per batch instead of one per pass
+    log_action(connection, None, 'EXPIRE_PASSES', 'PASS', None, {
+        'status': new_status,
+        'count': len(pass_ids),
+        'pass_ids': pass_ids
+    })
+    
+    for listener in _expiry_listeners:
+        try:
+            listener(expired, new_status)
+        except Exception:
+            logger.exception("Expiry listener failed")
+    
+    logger.info("Expiry sweep marked %d passes as %s", len(pass_ids), new_status)
+    return expired
+
+def run_expiry_sweep():
+    conn = get_db_connection()
+    try:
+        sweep_expired_passes(conn)
+    finally:
+        conn.close()
+
+def start_expiry_sweeper():
+    """Start the background sweeper thread"""
+    return run_periodically('expiry-sweeper', Config.EXPIRY_SWEEP_INTERVAL_SECONDS, run_expiry_sweep)
@@ -1,12 +1,23 @@
 import json
-from datetime import datetime, date, time
+from datetime import datetime, date, time, timedelta
+from decimal import Decimal
 
 def json_serializer(obj):
     """JSON serializer for objects not serializable by default"""
     if isinstance(obj, (datetime, date, time)):
         return obj.isoformat()
+    if isinstance(obj, timedelta):
+        # MySQL TIME columns come back as timedelta
+        seconds = int(obj.total_seconds())
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    if isinstance(obj, Decimal):
+        return float(obj)
     raise TypeError(f"Type {type(obj)} not serializable")
 
+def dumps_json(obj):
+    """Serialize a response body the way the Flask app's JSON provider does"""
+    return json.dumps(obj, default=json_serializer, sort_keys=True)
+
 def assign_attendant_round_robin(connection):
     """Assign attendant using round-robin with load balancing"""
     cursor = connection.cursor()
@@ -18,7 +29,7 @@ def assign_attendant_round_robin(connection):
     query = """
     SELECT u.id, u.name, u.phone, COUNT(p.id) as pass_count
     FROM users u
-    LEFT JOIN passes p ON p.assigned_attendant_id = u.id AND DATE(p.date) = %s
+    LEFT JOIN passes p ON p.assigned_attendant_id = u.id AND p.date = %s
     WHERE u.role = 'ATTENDANT' AND u.is_active = TRUE
     GROUP BY u.id
     ORDER BY pass_count ASC
@@ -37,6 +48,6 @@ def log_action(connection, user_id, action, entity_type, entity_id=None, payload
     INSERT INTO logs (user_id, action, entity_type, entity_id, payload)
     VALUES (%s, %s, %s, %s, %s)
     """
-    cursor.execute(query, (user_id, action, entity_type, entity_id, json.dumps(payload)))
+    cursor.execute(query, (user_id, action, entity_type, entity_id, json.dumps(payload, default=json_serializer)))
     connection.commit()
     cursor.close()
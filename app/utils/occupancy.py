@@ -0,0 +1,307 @@
+import json
+import threading
+from datetime import date, timedelta
+from app.config import Config
+from app.database import get_db_connection
+from app.utils.coherence import register_change_listener
+from app.utils.expiry_sweeper import register_expiry_listener
+from app.utils.snapshots import register_snapshot_section
+
+# Passes still expected at the gate, they hold their slot's capacity
+OCCUPYING_STATUSES = ('NOT_CONTACTED', 'CONTACTED', 'CONFIRMED', 'REACHED', 'AT_GATE', 'ISSUE')
+
+# date -> {bucket start minute: total_people}, None until seeded
+_occupancy = None
+# Same shape, people this worker reserved but has not committed yet, kept on top of every reload
+_pending = {}
+_lock = threading.Lock()
+
+def _key(day):
+    return day.isoformat() if hasattr(day, 'isoformat') else str(day)
+
+def _minutes(value):
+    """Minute of the day for a TIME column value (timedelta) or an 'HH:MM[:SS]' string"""
+    if isinstance(value, timedelta):
+        return int(value.total_seconds()) // 60
+    if hasattr(value, 'hour'):
+        return value.hour * 60 + value.minute
+    hours, minutes = str(value).split(':')[:2]
+    return int(hours) * 60 + int(minutes)
+
+def _format_minutes(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+def slot_bucket(time_value):
+    """Start minute of the SLOT_MINUTES bucket a time falls in"""
+    minutes = _minutes(time_value)
+    return minutes - minutes % Config.SLOT_MINUTES
+
+def load_capacity_config(cursor):
+    """settings.slot_capacity_config as {'default': int or None, 'slots': {bucket minute: int}}"""
+    cursor.execute("SELECT slot_capacity_config FROM settings WHERE id = 1")
+    settings = cursor.fetchone()
+    stored = settings['slot_capacity_config'] if settings else None
+    return parse_capacity_config(stored)
+
+def _capacity_value(value):
+    if value is None or (isinstance(value, int) and not isinstance(value, bool) and value >= 0):
+        return value
+    raise ValueError(f'Slot capacity must be a whole number of people or null, got {value!r}')
+
+def parse_capacity_config(stored):
+    """Stored slot_capacity_config by bucket, raises ValueError (or TypeError/AttributeError on a bad shape)"""
+    config = (json.loads(stored) if isinstance(stored, str) else stored) or {}
+    return {
+        'default': _capacity_value(config.get('default')),
+        'slots': {slot_bucket(slot): _capacity_value(capacity) for slot, capacity in (config.get('slots') or {}).items()}
+    }
+
+def slot_capacity(capacity_config, bucket):
+    """People allowed in a bucket, None when unlimited"""
+    return capacity_config['slots'].get(bucket, capacity_config['default'])
+
+def _seed(connection, days=None):
+    """Occupancy from one aggregate over today onwards, or over just the given dates (idx_passes_date_time)"""
+    cursor = connection.cursor()
+    placeholders = ', '.join(['%s'] * len(OCCUPYING_STATUSES))
+    
+    if days:
+        date_sql, date_args = f"date IN ({', '.join(['%s'] * len(days))})", tuple(days)
+    else:
+        date_sql, date_args = 'date >= %s', (date.today(),)
+    
+    cursor.execute(f"""
+        SELECT date, time, SUM(total_people) as people
+        FROM passes
+        WHERE {date_sql} AND status IN ({placeholders})
+        GROUP BY date, time
+    """, (*date_args, *OCCUPYING_STATUSES))
+    
+    occupancy = {_key(day): {} for day in days or ()}
+    for row in cursor.fetchall():
+        buckets = occupancy.setdefault(_key(row['date']), {})
+        bucket = slot_bucket(row['time'])
+        buckets[bucket] = buckets.get(bucket, 0) + int(row['people'])
+    cursor.close()
+    return occupancy
+
+def _with_pending(fresh, keys=None):
+    """Add the pending reservations (of just the given dates) to occupancy loaded from the database"""
+    for key, pending in _pending.items():
+        if keys is not None and key not in keys:
+            continue
+        buckets = fresh.setdefault(key, {})
+        for bucket, people in pending.items():
+            buckets[bucket] = buckets.get(bucket, 0) + people
+    return fresh
+
+def _ensure_seeded(connection=None):
+    """Seed the index on first use, the caller holds _lock"""
+    global _occupancy
+    if _occupancy is not None:
+        return
+    if connection is not None:
+        _occupancy = _with_pending(_seed(connection))
+        return
+    conn = get_db_connection()
+    try:
+        _occupancy = _with_pending(_seed(conn))
+    finally:
+        conn.close()
+
+def _prune():
+    today = date.today().isoformat()
+    for key in [key for key in _occupancy if key < today]:
+        del _occupancy[key]
+
+def reserve(day, time_value, people, capacity_config, connection=None):
+    """Add people to a slot if it has room, returns (ok, booked, capacity)
+    
+    Only this worker's view of the slot, confirm a limited slot with committed_people() under lock_slot().
+    Follow up with confirm() once the booking is committed or cancel() if it is not.
+    """
+    bucket = slot_bucket(time_value)
+    capacity = slot_capacity(capacity_config, bucket)
+    with _lock:
+        _ensure_seeded(connection)
+        buckets = _occupancy.get(_key(day))
+        booked = buckets.get(bucket, 0) if buckets else 0
+        if capacity is not None and booked + people > capacity:
+            return False, booked, capacity
+        if buckets is None:
+            _prune()
+            buckets = _occupancy.setdefault(_key(day), {})
+        buckets[bucket] = booked + people
+        _add_pending(_key(day), bucket, people)
+        return True, booked + people, capacity
+
+def _add_pending(key, bucket, people):
+    buckets = _pending.setdefault(key, {})
+    buckets[bucket] = buckets.get(bucket, 0) + people
+    if buckets[bucket] <= 0:
+        del buckets[bucket]
+        if not buckets:
+            del _pending[key]
+
+def confirm(day, time_value, people):
+    """Mark a reservation committed, from here on reloads count it from the database"""
+    with _lock:
+        _add_pending(_key(day), slot_bucket(time_value), -people)
+
+def cancel(day, time_value, people):
+    """Give back a reservation that was not committed"""
+    confirm(day, time_value, people)
+    release(day, time_value, people)
+
+def add(day, time_value, people):
+    """Count people in a slot without checking its capacity (e.g. aarti bookings, which have their own limit)"""
+    with _lock:
+        if _occupancy is None:
+            return
+        _prune()
+        buckets = _occupancy.setdefault(_key(day), {})
+        bucket = slot_bucket(time_value)
+        buckets[bucket] = buckets.get(bucket, 0) + people
+
+def release(day, time_value, people):
+    """Give back a slot's people, after a failed create or when a pass stops occupying it"""
+    with _lock:
+        if _occupancy is None:
+            return
+        buckets = _occupancy.get(_key(day))
+        if not buckets:
+            return
+        bucket = slot_bucket(time_value)
+        buckets[bucket] = max(buckets.get(bucket, 0) - people, 0)
+
+def apply_status_change(pass_row, new_status):
+    """Release a pass's people when it moves from an occupying status to a final one"""
+    if pass_row['status'] in OCCUPYING_STATUSES and new_status not in OCCUPYING_STATUSES:
+        release(pass_row['date'], pass_row['time'], pass_row['total_people'])
+
+def invalidate():
+    """Drop the index, it is seeded again on next use"""
+    global _occupancy
+    with _lock:
+        _occupancy = None
+
+def refresh(*days):
+    """Reload the given dates from the database, e.g. after another worker changed them"""
+    with _lock:
+        if _occupancy is None:
+            return
+    
+    keys = [_key(day) for day in days]
+    conn = get_db_connection(readonly=False)
+    try:
+        fresh = _seed(conn, keys)
+    finally:
+        conn.close()
+    
+    with _lock:
+        if _occupancy is not None:
+            _occupancy.update(_with_pending(fresh, keys))
+
+def lock_slot(connection, day, time_value):
+    """Lock a slot until the connection's transaction ends
+    
+    Take it before anything else in the transaction reads, with MySQL's REPEATABLE READ the snapshot comes
+    from the first read and committed_people() would otherwise miss bookings committed while waiting.
+    """
+    cursor = connection.cursor()
+    try:
+        # An upsert takes the row lock straight away, creating the row for a slot's first booking
+        cursor.execute("""
+            INSERT INTO slot_locks (date, slot_start) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE slot_start = VALUES(slot_start)
+        """, (day, slot_bucket(time_value)))
+    finally:
+        cursor.close()
+
+def committed_people(connection, day, time_value):
+    """People committed to a slot's bucket, exact for a slot locked with lock_slot()"""
+    bucket = slot_bucket(time_value)
+    cursor = connection.cursor()
+    placeholders = ', '.join(['%s'] * len(OCCUPYING_STATUSES))
+    
+    try:
+        cursor.execute(f"""
+            SELECT COALESCE(SUM(total_people), 0) as people
+            FROM passes
+            WHERE date = %s AND time >= %s AND time < %s AND status IN ({placeholders})
+        """, (day, _format_minutes(bucket), _format_minutes(bucket + Config.SLOT_MINUTES), *OCCUPYING_STATUSES))
+        return int(cursor.fetchone()['people'])
+    finally:
+        cursor.close()
+
+def prune_slot_locks(connection):
+    """Delete the lock rows of past dates"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("DELETE FROM slot_locks WHERE date < %s", (date.today(),))
+        connection.commit()
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+def find_open_slots(day, time_value, people, capacity_config, limit=5):
+    """Buckets on day with room for people, nearest to time_value first"""
+    requested = slot_bucket(time_value)
+    opening = slot_bucket(Config.SLOT_OPENING_TIME)
+    closing = _minutes(Config.SLOT_CLOSING_TIME)
+    
+    with _lock:
+        _ensure_seeded()
+        buckets = dict(_occupancy.get(_key(day)) or {})
+    
+    slots = []
+    for bucket in range(opening, closing, Config.SLOT_MINUTES):
+        capacity = slot_capacity(capacity_config, bucket)
+        booked = buckets.get(bucket, 0)
+        if capacity is None or booked + people <= capacity:
+            slots.append({
+                'time': _format_minutes(bucket),
+                'booked': booked,
+                'capacity': capacity,
+                'remaining': None if capacity is None else capacity - booked
+            })
+    
+    slots.sort(key=lambda slot: (abs(_minutes(slot['time']) - requested), slot['time']))
+    return slots[:limit]
+
+def _on_passes_expired(expired_rows, new_status):
+    for pass_row in expired_rows:
+        apply_status_change(pass_row, new_status)
+
+def dump_state():
+    with _lock:
+        if _occupancy is None:
+            return None
+        return {
+            'slot_minutes': Config.SLOT_MINUTES,
+            'dates': {key: {str(bucket): people for bucket, people in buckets.items()} for key, buckets in _occupancy.items()}
+        }
+
+def load_state(state):
+    """Restore a snapshot taken with the same SLOT_MINUTES"""
+    global _occupancy
+    if state.get('slot_minutes') != Config.SLOT_MINUTES:
+        return
+    with _lock:
+        _occupancy = {
+            key: {int(bucket): people for bucket, people in buckets.items()}
+            for key, buckets in state['dates'].items()
+        }
+        _prune()
+
+def _on_remote_changes(changes):
+    if changes is not None and 'occupancy' not in changes:
+        return
+    if changes is None or changes['occupancy'] is None:
+        invalidate()
+    else:
+        refresh(*changes['occupancy'])
+
+register_expiry_listener(_on_passes_expired)
+register_change_listener(_on_remote_changes)
+register_snapshot_section('occupancy', dump_state, load_state)
@@ -1,11 +1,21 @@
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
 from io import BytesIO
-import qrcode
+
+def preload_renderers():
+    """Import ReportLab, qrcode and PIL up front, for workers that render tickets"""
+    import qrcode
+    import qrcode.image.pil
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import inch
 
 def generate_visitor_ticket(pass_data, attendant_name, attendant_phone):
     """Generate PDF ticket for visitor"""
+    # Imported on first use so workers that never render tickets start faster
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.units import inch
+    import qrcode
+    
     buffer = BytesIO()
     c = canvas.Canvas(buffer, pagesize=A4)
     width, height = A4
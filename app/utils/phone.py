@@ -0,0 +1,69 @@
+import logging
+from app.config import Config
+from app.database import get_db_connection
+from app.utils.scheduler import run_periodically
+
+logger = logging.getLogger(__name__)
+
+def normalize_phone(raw, region=None):
+    """E.164 form of a phone number ('+919876543210'), None if it is not a valid number"""
+    # Imported on first use, phonenumbers loads its metadata tables on import
+    import phonenumbers
+    
+    if not raw:
+        return None
+    try:
+        number = phonenumbers.parse(str(raw), region or Config.DEFAULT_PHONE_REGION)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(number):
+        return None
+    return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164)
+
+def backfill_phone_e164(connection, table='passes', batch_size=None):
+    """Fill visitor_phone_e164 for rows written before it existed, returns how many were set"""
+    batch_size = batch_size or Config.PHONE_BACKFILL_BATCH_SIZE
+    cursor = connection.cursor()
+    updated = 0
+    last_id = 0
+    
+    try:
+        while True:
+            cursor.execute(f"""
+                SELECT id, visitor_phone FROM {table}
+                WHERE visitor_phone_e164 IS NULL AND id > %s
+                ORDER BY id LIMIT %s
+            """, (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            
+            # Numbers that do not parse stay NULL
+            updates = [(e164, row['id']) for row in rows if (e164 := normalize_phone(row['visitor_phone']))]
+            if updates:
+                cursor.executemany(f"""
+                    UPDATE {table} SET visitor_phone_e164 = %s WHERE id = %s AND visitor_phone_e164 IS NULL
+                """, updates)
+                updated += len(updates)
+            connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    
+    return updated
+
+def run_phone_backfill():
+    conn = get_db_connection()
+    try:
+        updated = backfill_phone_e164(conn, 'passes') + backfill_phone_e164(conn, 'passes_archive')
+        if updated:
+            logger.info("Normalized %d visitor phone numbers", updated)
+    finally:
+        conn.close()
+
+def start_phone_backfill():
+    """Start the background thread that normalizes visitor phones missing their E.164 form"""
+    return run_periodically('phone-backfill', Config.PHONE_BACKFILL_INTERVAL_SECONDS, run_phone_backfill)
@@ -0,0 +1,142 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from app.config import Config
+
+# Collapsed-stack format: one "outer;...;inner count" line per distinct stack, readable by
+# flamegraph.pl, speedscope and most flame graph viewers
+PROFILE_SUFFIX = '.collapsed'
+
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9_.-]+')
+_FILENAME = re.compile(r'^(\d{8}T\d{12})_(.+)_(\d+)ms_(\d+)samples\.collapsed$')
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_labels = {}
+
+def _frame_label(code):
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        if filename.startswith(_PROJECT_ROOT):
+            filename = os.path.relpath(filename, _PROJECT_ROOT)
+        elif 'site-packages' in filename:
+            filename = filename.split('site-packages' + os.sep, 1)[1]
+        label = f'{code.co_name} ({filename}:{code.co_firstlineno})'
+        if len(_labels) < 50000:
+            _labels[code] = label
+    return label
+
+class SamplingProfiler:
+    """Samples one thread's Python stack from a background thread until stopped"""
+    
+    def __init__(self, thread_id, interval=None, max_seconds=None):
+        self.thread_id = thread_id
+        self.interval = (interval if interval is not None else Config.PROFILE_INTERVAL_MS) / 1000
+        self.max_seconds = max_seconds if max_seconds is not None else Config.PROFILE_MAX_SECONDS
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop sampling, returns the collapsed stacks"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.elapsed = time.perf_counter() - self.started
+        return self.stacks
+    
+    def _run(self):
+        deadline = self.started + self.max_seconds
+        
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            
+            if labels:
+                labels.reverse()
+                self.stacks[';'.join(labels)] += 1
+                self.samples += 1
+            
+            if time.perf_counter() >= deadline:
+                break
+
+def render_collapsed(stacks):
+    return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+def _prune(directory):
+    names = sorted(name for name in os.listdir(directory) if name.endswith(PROFILE_SUFFIX))
+    for name in names[:max(0, len(names) - Config.PROFILE_MAX_FILES)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+def save_profile(profiler, endpoint):
+    """Write a stopped profiler's stacks to PROFILE_DIR, returns the file name or None if nothing was sampled"""
+    if not profiler.samples:
+        return None
+    
+    directory = Config.PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    
+    stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    endpoint = _UNSAFE_CHARS.sub('-', endpoint or 'unmatched')
+    name = f'{stamp}_{endpoint}_{round(profiler.elapsed * 1000)}ms_{profiler.samples}samples{PROFILE_SUFFIX}'
+    
+    tmp_path = os.path.join(directory, f'.{name}.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(render_collapsed(profiler.stacks))
+    os.replace(tmp_path, os.path.join(directory, name))
+    
+    _prune(directory)
+    return name
+
+def list_profiles(endpoint=None, limit=100):
+    """Saved profiles, newest first"""
+    directory = Config.PROFILE_DIR
+    if not os.path.isdir(directory):
+        return []
+    
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        match = _FILENAME.match(name)
+        if not match:
+            continue
+        if endpoint and match.group(2) != endpoint:
+            continue
+        
+        profiles.append({
+            'name': name,
+            'endpoint': match.group(2),
+            'captured_at': datetime.strptime(match.group(1), '%Y%m%dT%H%M%S%f').isoformat(),
+            'duration_ms': int(match.group(3)),
+            'samples': int(match.group(4)),
+            'size_bytes': os.path.getsize(os.path.join(directory, name))
+        })
+        if len(profiles) >= limit:
+            break
+    
+    return profiles
+
+def is_profile_name(name):
+    return bool(_FILENAME.match(name))
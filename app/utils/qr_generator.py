@@ -1,4 +1,3 @@
-import qrcode
 import io
 import base64
 import uuid
@@ -9,6 +8,9 @@ def generate_qr_string():
 
 def generate_qr_image(qr_string):
     """Generate QR code image as base64"""
+    # Imported on first use, qrcode pulls in PIL which most workers never need
+    import qrcode
+    
     qr = qrcode.QRCode(version=1, box_size=10, border=4)
     qr.add_data(qr_string)
     qr.make(fit=True)
@@ -0,0 +1,133 @@
+import logging
+import random
+import re
+import threading
+from contextvars import ContextVar
+from datetime import datetime
+from flask import has_request_context, request
+from app.config import Config
+from app.database import register_query_observer
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'IN\s*\(\s*%s(\s*,\s*%s)*\s*\)', re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(\.\d+)?\b')
+_WHITESPACE = re.compile(r'\s+')
+_EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'REPLACE')
+# Entry for the statements seen once SLOW_QUERY_MAX_STATEMENTS shapes are tracked
+OTHER_STATEMENTS = '<other statements>'
+
+# Endpoint of the request an async view is serving, Flask requests have request.endpoint
+current_endpoint = ContextVar('current_endpoint', default=None)
+
+_lock = threading.Lock()
+_stats = {}
+_normalized_cache = {}
+
+def normalize_query(query):
+    """Collapse a statement to its shape so different parameters aggregate together"""
+    normalized = _normalized_cache.get(query)
+    if normalized is None:
+        normalized = _WHITESPACE.sub(' ', query).strip()
+        normalized = _IN_LIST.sub('IN (...)', normalized)
+        normalized = _STRING_LITERAL.sub('?', normalized)
+        normalized = _NUMBER_LITERAL.sub('?', normalized)
+        normalized = normalized.replace('%s', '?')
+        if len(_normalized_cache) < 10000:
+            _normalized_cache[query] = normalized
+    return normalized
+
+def _explain(connection, query, args):
+    cursor = connection.raw.cursor()
+    try:
+        cursor.execute('EXPLAIN ' + query, args)
+        return cursor.fetchall()
+    except Exception as e:
+        return [{'error': str(e)}]
+    finally:
+        cursor.close()
+
+def _is_batch(args):
+    return isinstance(args, list) and args and isinstance(args[0], (list, tuple, dict))
+
+def _describe_args(args):
+    """Argument count and types only, values hold visitor details and password hashes"""
+    if _is_batch(args):
+        return f'<{len(args)} rows>'
+    if isinstance(args, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in args.items()) + '}'
+    if isinstance(args, (list, tuple)):
+        return '[' + ', '.join(type(value).__name__ for value in args) + ']'
+    return '[]' if args is None else f'[{type(args).__name__}]'
+
+def _record_query(connection, query, args, elapsed, rowcount):
+    normalized = normalize_query(query)
+    elapsed_ms = elapsed * 1000
+    
+    with _lock:
+        stats = _stats.get(normalized)
+        if stats is None:
+            # Past the cap new shapes are still timed and logged, aggregated under one entry
+            key = normalized if len(_stats) < Config.SLOW_QUERY_MAX_STATEMENTS else OTHER_STATEMENTS
+            stats = _stats.get(key)
+            if stats is None:
+                stats = _stats[key] = {
+                    'query': key,
+                    'calls': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'slow_calls': 0,
+                    'last_slow': None,
+                    'plan': None
+                }
+        stats['calls'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+    
+    if elapsed_ms < Config.SLOW_QUERY_THRESHOLD_MS:
+        return
+    
+    endpoint = request.endpoint if has_request_context() else current_endpoint.get()
+    params = _describe_args(args)
+    
+    logger.warning(
+        "Slow query (%.1f ms, %s rows, endpoint=%s): %s params=%s",
+        elapsed_ms, rowcount, endpoint, normalized, params
+    )
+    
+    plan = None
+    # Statements of the async driver have no sync connection to run EXPLAIN on
+    if (connection is not None
+            and not _is_batch(args)
+            and normalized.split(' ', 1)[0].upper() in _EXPLAINABLE
+            and random.random() < Config.SLOW_QUERY_EXPLAIN_SAMPLE_RATE):
+        plan = _explain(connection, query, args)
+    
+    with _lock:
+        stats['slow_calls'] += 1
+        stats['last_slow'] = {
+            'duration_ms': round(elapsed_ms, 3),
+            'params': params,
+            'rowcount': rowcount,
+            'endpoint': endpoint,
+            'at': datetime.now().isoformat()
+        }
+        if stats['query'] == OTHER_STATEMENTS:
+            stats['last_slow']['query'] = normalized
+        if plan is not None:
+            stats['plan'] = plan
+
+def get_top_queries(limit=20):
+    """Statements ordered by cumulative time, slowest first"""
+    with _lock:
+        rows = [dict(stats) for stats in _stats.values()]
+    rows.sort(key=lambda row: row['total_ms'], reverse=True)
+    for row in rows:
+        row['avg_ms'] = round(row['total_ms'] / row['calls'], 3) if row['calls'] else 0
+        row['total_ms'] = round(row['total_ms'], 3)
+        row['max_ms'] = round(row['max_ms'], 3)
+    return rows[:limit]
+
+def init_query_log():
+    register_query_observer(_record_query)
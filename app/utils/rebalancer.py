@@ -0,0 +1,88 @@
+import heapq
+from datetime import date
+
+# Passes an attendant still has to look after
+UNFINISHED_STATUSES = ('NOT_CONTACTED', 'CONTACTED', 'CONFIRMED', 'REACHED', 'AT_GATE', 'ISSUE')
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+def plan_rebalance(cursor, departing_ids, day, lock=False):
+    """Work out which checked-in attendant takes each unfinished pass of the departing attendants"""
+    status_sql = _placeholders(UNFINISHED_STATUSES)
+    departing_sql = _placeholders(departing_ids)
+    
+    cursor.execute(f"""
+        SELECT id, assigned_attendant_id, time
+        FROM passes
+        WHERE assigned_attendant_id IN ({departing_sql}) AND date = %s AND status IN ({status_sql})
+        ORDER BY time ASC, id ASC
+        {'FOR UPDATE' if lock else ''}
+    """, (*departing_ids, day, *UNFINISHED_STATUSES))
+    passes = cursor.fetchall()
+    
+    if not passes:
+        return [], []
+    
+    # Checked-in (in, not yet out) active attendants with their current unfinished load
+    cursor.execute(f"""
+        SELECT u.id, u.name, COUNT(p.id) as load_count
+        FROM users u
+        JOIN attendant_attendance aa ON aa.attendant_id = u.id AND aa.date = %s
+        LEFT JOIN passes p ON p.assigned_attendant_id = u.id AND p.date = %s AND p.status IN ({status_sql})
+        WHERE u.role = 'ATTENDANT' AND u.is_active = TRUE
+          AND aa.time_in IS NOT NULL AND aa.time_out IS NULL
+          AND u.id NOT IN ({departing_sql})
+        GROUP BY u.id, u.name
+    """, (day, day, *UNFINISHED_STATUSES, *departing_ids))
+    attendants = cursor.fetchall()
+    
+    if not attendants:
+        return [], [row['id'] for row in passes]
+    
+    names = {row['id']: row['name'] for row in attendants}
+    heap = [(row['load_count'], row['id']) for row in attendants]
+    heapq.heapify(heap)
+    
+    # Earliest slots first, each to whoever is least loaded at that point
+    moves = []
+    for pass_row in passes:
+        load, attendant_id = heapq.heappop(heap)
+        moves.append({
+            'pass_id': pass_row['id'],
+            'from_attendant_id': pass_row['assigned_attendant_id'],
+            'to_attendant_id': attendant_id,
+            'to_attendant_name': names[attendant_id]
+        })
+        heapq.heappush(heap, (load + 1, attendant_id))
+    
+    return moves, []
+
+def rebalance_passes(connection, departing_ids, day=None, dry_run=False):
+    """Move today's unfinished passes off departing attendants in one UPDATE, the caller commits"""
+    day = day or date.today()
+    departing_ids = list(departing_ids)
+    cursor = connection.cursor()
+    
+    try:
+        moves, unassigned = plan_rebalance(cursor, departing_ids, day, lock=not dry_run)
+        
+        if moves and not dry_run:
+            case_sql = ' '.join(['WHEN %s THEN %s'] * len(moves))
+            case_args = [value for move in moves for value in (move['pass_id'], move['to_attendant_id'])]
+            pass_ids = [move['pass_id'] for move in moves]
+            cursor.execute(f"""
+                UPDATE passes
+                SET assigned_attendant_id = CASE id {case_sql} END, updated_at = NOW()
+                WHERE id IN ({_placeholders(pass_ids)})
+            """, (*case_args, *pass_ids))
+    finally:
+        cursor.close()
+    
+    return {
+        'date': day,
+        'dry_run': dry_run,
+        'departing_attendant_ids': departing_ids,
+        'moves': moves,
+        'unassigned_pass_ids': unassigned
+    }
@@ -0,0 +1,347 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from app.config import Config
+from app.database import get_db_connection
+from app.utils.scheduler import run_periodically
+
+logger = logging.getLogger(__name__)
+
+# settings.reminder_config, e.g.
+# {"enabled": true, "lead_minutes": [1440, 120], "channels": ["SMS"],
+#  "rate_limits": {"SMS": 300}, "template": "..."}
+DEFAULT_REMINDER_CONFIG = {
+    'enabled': False,
+    'lead_minutes': [120],
+    'channels': ['SMS'],
+    'rate_limits': {},
+    'template': (
+        'Siddhivinayak darshan for {visitor_name} on {date} at {time}. '
+        'Your attendant: {attendant_name} {attendant_phone}'
+    )
+}
+
+# Passes still worth reminding about
+REMINDABLE_STATUSES = ('NOT_CONTACTED', 'CONTACTED', 'CONFIRMED')
+
+# A claimed reminder still SENDING after this long belongs to a dead worker
+STALE_SENDING_MINUTES = 10
+
+# A rate limited batch can take longer than that, its lease is renewed this often while it is sent
+LEASE_RENEW_SECONDS = 60
+
+# Stand-in pass used to check a template renders before it is saved
+SAMPLE_PASS = {
+    'visitor_name': 'Visitor',
+    'date': date(2000, 1, 1),
+    'time': timedelta(hours=9),
+    'attendant_name': 'Attendant',
+    'attendant_phone': '9000000000'
+}
+
+class LogSender:
+    """Local stub that only logs, used for any channel without a real sender"""
+    
+    def send(self, channel, recipient, message):
+        logger.info("Reminder via %s to %s: %s", channel, recipient, message)
+
+class RateLimiter:
+    """Token bucket allowing `per_minute` sends per minute, blocks until a token is free"""
+    
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute
+        self._next_free = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_free - now
+            self._next_free = max(now, self._next_free) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+_senders = {}
+_default_sender = LogSender()
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+_executor = None
+
+def register_sender(channel, sender):
+    """Plug in a sender object with send(channel, recipient, message) for a channel"""
+    _senders[channel] = sender
+
+def _rate_limiter(channel, per_minute):
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(channel)
+        if limiter is None or limiter.interval != 60.0 / per_minute:
+            limiter = _rate_limiters[channel] = RateLimiter(per_minute)
+        return limiter
+
+def load_reminder_config(cursor):
+    cursor.execute("SELECT reminder_config FROM settings WHERE id = 1")
+    settings = cursor.fetchone()
+    config = dict(DEFAULT_REMINDER_CONFIG)
+    if settings and settings['reminder_config']:
+        stored = settings['reminder_config']
+        config.update(json.loads(stored) if isinstance(stored, str) else stored)
+    return config
+
+def _format_time(value):
+    if isinstance(value, timedelta):
+        seconds = int(value.total_seconds())
+        return f'{seconds // 3600:02d}:{seconds % 3600 // 60:02d}'
+    return str(value)[:5]
+
+def render_message(template, pass_row):
+    return template.format(
+        visitor_name=pass_row['visitor_name'],
+        date=pass_row['date'],
+        time=_format_time(pass_row['time']),
+        attendant_name=pass_row['attendant_name'] or '',
+        attendant_phone=pass_row['attendant_phone'] or ''
+    )[:500]
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def validate_reminder_config(config):
+    """Raise ValueError unless every field the dispatcher reads is usable and the template renders"""
+    if not isinstance(config, dict):
+        raise ValueError('reminder_config must be an object')
+    
+    if not isinstance(config.get('enabled', False), bool):
+        raise ValueError('reminder_config.enabled must be true or false')
+    
+    lead_minutes = config.get('lead_minutes', DEFAULT_REMINDER_CONFIG['lead_minutes'])
+    if not isinstance(lead_minutes, list) or not all(isinstance(lead, int) and not isinstance(lead, bool) and lead > 0 for lead in lead_minutes):
+        raise ValueError('reminder_config.lead_minutes must be a list of positive whole minutes')
+    
+    channels = config.get('channels', DEFAULT_REMINDER_CONFIG['channels'])
+    if not isinstance(channels, list) or not all(isinstance(channel, str) and 0 < len(channel) <= 20 for channel in channels):
+        raise ValueError('reminder_config.channels must be a list of channel names of up to 20 characters')
+    
+    rate_limits = config.get('rate_limits') or {}
+    if not isinstance(rate_limits, dict) or not all(
+            isinstance(channel, str) and (per_minute is None or _is_number(per_minute) and per_minute > 0)
+            for channel, per_minute in rate_limits.items()):
+        raise ValueError('reminder_config.rate_limits must map channels to a positive number of sends per minute')
+    
+    template = config.get('template', DEFAULT_REMINDER_CONFIG['template'])
+    if not isinstance(template, str):
+        raise ValueError('reminder_config.template must be a string')
+    try:
+        render_message(template, SAMPLE_PASS)
+    except KeyError as e:
+        raise ValueError(f'reminder_config.template has an unknown placeholder {e}')
+    except (AttributeError, IndexError, TypeError, ValueError) as e:
+        raise ValueError(f'reminder_config.template is invalid: {e}')
+
+def _slot_datetime(row):
+    slot_time = row['time']
+    if not isinstance(slot_time, timedelta):
+        hours, minutes = str(slot_time).split(':')[:2]
+        slot_time = timedelta(hours=int(hours), minutes=int(minutes))
+    return datetime.combine(row['date'], datetime.min.time()) + slot_time
+
+def enqueue_due_reminders(connection, config, now=None):
+    """Write reminders that are due into the outbox with one passes query, returns how many were new"""
+    now = now or datetime.now()
+    leads = sorted(int(lead) for lead in config['lead_minutes'])
+    if not leads:
+        return 0
+    horizon = now + timedelta(minutes=leads[-1])
+    
+    cursor = connection.cursor()
+    status_placeholders = ', '.join(['%s'] * len(REMINDABLE_STATUSES))
+    
+    # Served by idx_passes_date_time
+    cursor.execute(f"""
+        SELECT p.id, p.visitor_name, p.visitor_phone, p.date, p.time,
+               a.name as attendant_name, a.phone as attendant_phone
+        FROM passes p
+        LEFT JOIN users a ON p.assigned_attendant_id = a.id
+        WHERE p.date BETWEEN %s AND %s
+          AND p.status IN ({status_placeholders})
+          AND TIMESTAMP(p.date, p.time) > %s
+          AND TIMESTAMP(p.date, p.time) <= %s
+    """, (now.date(), horizon.date(), *REMINDABLE_STATUSES, now, horizon))
+    
+    rows = []
+    for pass_row in cursor.fetchall():
+        minutes_left = (_slot_datetime(pass_row) - now).total_seconds() / 60
+        # Only the closest due reminder, earlier ones that were missed are pointless now
+        lead = next(lead for lead in leads if minutes_left <= lead)
+        try:
+            message, status, error = render_message(config['template'], pass_row), 'PENDING', None
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError) as e:
+            # Recorded as FAILED once, instead of raising again on every tick
+            logger.warning("Reminder template does not render for pass %s: %r", pass_row['id'], e)
+            message, status, error = '', 'FAILED', f'Invalid template: {e!r}'[:255]
+        for channel in config['channels']:
+            rows.append((pass_row['id'], channel, lead, pass_row['visitor_phone'], message, status, now, error))
+    
+    inserted = 0
+    if rows:
+        cursor.executemany("""
+            INSERT IGNORE INTO reminder_outbox
+                (pass_id, channel, lead_minutes, recipient, message, status, next_attempt_at, last_error)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, rows)
+        inserted = cursor.rowcount
+    
+    connection.commit()
+    cursor.close()
+    return inserted
+
+def claim_batch(connection, now=None, batch_size=None):
+    """Mark a batch of due reminders as SENDING and return them"""
+    now = now or datetime.now()
+    batch_size = batch_size or Config.REMINDER_BATCH_SIZE
+    cursor = connection.cursor()
+    
+    try:
+        # Recover reminders claimed by a worker that died mid-send
+        cursor.execute("""
+            UPDATE reminder_outbox SET status = 'PENDING'
+            WHERE status = 'SENDING' AND updated_at < %s
+        """, (now - timedelta(minutes=STALE_SENDING_MINUTES),))
+        
+        cursor.execute("""
+            SELECT id, pass_id, channel, recipient, message, attempts
+            FROM reminder_outbox
+            WHERE status = 'PENDING' AND next_attempt_at <= %s
+            ORDER BY next_attempt_at
+            LIMIT %s
+            FOR UPDATE
+        """, (now, batch_size))
+        batch = cursor.fetchall()
+        
+        if batch:
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f"""
+                UPDATE reminder_outbox SET status = 'SENDING', updated_at = %s
+                WHERE id IN ({placeholders})
+            """, (now, *[row['id'] for row in batch]))
+        
+        connection.commit()
+        return batch
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def _renew_lease(connection, ids):
+    """Push back the stale SENDING cutoff for reminders this worker is still sending"""
+    placeholders = ', '.join(['%s'] * len(ids))
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"""
+            UPDATE reminder_outbox SET updated_at = %s
+            WHERE status = 'SENDING' AND id IN ({placeholders})
+        """, (datetime.now(), *ids))
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def _send_one(reminder, rate_limits):
+    channel = reminder['channel']
+    per_minute = rate_limits.get(channel)
+    if per_minute:
+        _rate_limiter(channel, float(per_minute)).acquire()
+    try:
+        _senders.get(channel, _default_sender).send(channel, reminder['recipient'], reminder['message'])
+        return reminder, None
+    except Exception as e:
+        return reminder, str(e)[:255] or type(e).__name__
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=Config.REMINDER_WORKERS, thread_name_prefix='reminder-sender')
+    return _executor
+
+def dispatch(connection, batch, rate_limits, now=None):
+    """Send a claimed batch on the worker pool and record the outcomes in two batched writes"""
+    results = []
+    renewed_at = time.monotonic()
+    for result in _get_executor().map(lambda reminder: _send_one(reminder, rate_limits), batch):
+        results.append(result)
+        # Outcomes are only written at the end, so the whole batch keeps its lease until then
+        if len(results) < len(batch) and time.monotonic() - renewed_at >= LEASE_RENEW_SECONDS:
+            _renew_lease(connection, [reminder['id'] for reminder in batch])
+            renewed_at = time.monotonic()
+    now = now or datetime.now()
+    
+    sent_ids = [reminder['id'] for reminder, error in results if error is None]
+    failures = []
+    for reminder, error in results:
+        if error is None:
+            continue
+        attempts = reminder['attempts'] + 1
+        if attempts >= Config.REMINDER_MAX_ATTEMPTS:
+            failures.append(('FAILED', attempts, None, error, reminder['id']))
+        else:
+            # Exponential backoff: base, 2 x base, 4 x base, ...
+            retry_at = now + timedelta(seconds=Config.REMINDER_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+            failures.append(('PENDING', attempts, retry_at, error, reminder['id']))
+    
+    cursor = connection.cursor()
+    try:
+        if sent_ids:
+            placeholders = ', '.join(['%s'] * len(sent_ids))
+            cursor.execute(f"""
+                UPDATE reminder_outbox
+                SET status = 'SENT', sent_at = %s, attempts = attempts + 1, last_error = NULL
+                WHERE id IN ({placeholders})
+            """, (now, *sent_ids))
+        if failures:
+            cursor.executemany("""
+                UPDATE reminder_outbox
+                SET status = %s, attempts = %s, next_attempt_at = %s, last_error = %s
+                WHERE id = %s
+            """, failures)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    
+    return len(sent_ids), len(failures)
+
+def run_reminder_tick():
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        config = load_reminder_config(cursor)
+        cursor.close()
+        
+        if not config.get('enabled'):
+            return
+        
+        enqueued = enqueue_due_reminders(conn, config)
+        sent = failed = 0
+        while True:
+            batch = claim_batch(conn)
+            if not batch:
+                break
+            batch_sent, batch_failed = dispatch(conn, batch, config.get('rate_limits') or {})
+            sent += batch_sent
+            failed += batch_failed
+        
+        if enqueued or sent or failed:
+            logger.info("Reminders: %d queued, %d sent, %d failed", enqueued, sent, failed)
+    finally:
+        conn.close()
+
+def start_reminder_dispatcher():
+    """Start the background reminder thread, sending happens on its own worker pool"""
+    return run_periodically('reminder-dispatcher', Config.REMINDER_TICK_SECONDS, run_reminder_tick)
@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict
+from flask import current_app, request, Response
+from app.config import Config
+from app.database import register_commit_listener, use_primary
+from app.utils.coherence import register_change_listener
+from app.utils.compression import choose_encoding, compress
+
+# Bumped whenever a commit writes to the table, cached entries remember the versions they were built at
+_table_versions = {}
+# Bumped when every entry must go, e.g. after the change_log poller lost track of other workers' writes
+_generation = 0
+_entries = OrderedDict()
+_lock = threading.Lock()
+
+class CachedPayload:
+    """Serialized JSON body plus its compressed variants, compressed lazily once each"""
+    
+    def __init__(self, body):
+        self.body = body
+        self.encoded = {}
+        self._lock = threading.Lock()
+    
+    def encoded_body(self, encoding):
+        body = self.encoded.get(encoding)
+        if body is None:
+            with self._lock:
+                body = self.encoded.get(encoding)
+                if body is None:
+                    body = self.encoded[encoding] = compress(self.body, encoding)
+        return body
+
+def invalidate_tables(tables):
+    with _lock:
+        for table in tables:
+            _table_versions[table] = _table_versions.get(table, 0) + 1
+
+def invalidate_all():
+    global _generation
+    with _lock:
+        _generation += 1
+        _entries.clear()
+
+def _versions(tables):
+    return (_generation,) + tuple(_table_versions.get(table, 0) for table in tables)
+
+def lookup(key, tables):
+    """(payload, versions), payload is None on a miss and versions go to store()"""
+    with _lock:
+        versions = _versions(tables)
+        entry = _entries.get(key)
+        if entry is not None and entry[0] == versions:
+            _entries.move_to_end(key)
+            return entry[1], versions
+    return None, versions
+
+def store(key, versions, body):
+    """Cache a serialized body under the table versions read by lookup(), returns its payload"""
+    # Versions were read before building, so a write that lands meanwhile invalidates this entry
+    payload = CachedPayload(body)
+    
+    with _lock:
+        _entries[key] = (versions, payload)
+        _entries.move_to_end(key)
+        while len(_entries) > Config.RESPONSE_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return payload
+
+def get_payload(key, tables, build):
+    """Cached payload for key, rebuilt with build() once any of tables has been written to"""
+    payload, versions = lookup(key, tables)
+    if payload is None:
+        # A lagging replica could miss the write that invalidated the entry and have it cached under the new version
+        use_primary()
+        payload = store(key, versions, current_app.json.dumps(build()).encode('utf-8') + b'\n')
+    return payload
+
+def encode_payload(payload, accept_encoding):
+    """(body, content encoding or None) of a payload for a client's Accept-Encoding"""
+    encoding = None
+    if len(payload.body) >= Config.COMPRESSION_MIN_BYTES:
+        encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return payload.body, None
+    return payload.encoded_body(encoding), encoding
+
+def cached_json_response(key, tables, build, status=200):
+    """JSON response for a view shared by many users, skipping both the query and compression on repeats"""
+    payload = get_payload(key, tables, build)
+    body, encoding = encode_payload(payload, request.headers.get('Accept-Encoding'))
+    
+    response = Response(body, status=status, mimetype='application/json')
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+def _on_remote_changes(changes):
+    if changes is None:
+        invalidate_all()
+    else:
+        invalidate_tables(changes)
+
+register_commit_listener(invalidate_tables)
+# Other workers' writes, arriving through the change_log poller
+register_change_listener(_on_remote_changes)
@@ -0,0 +1,19 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+def run_periodically(name, interval_seconds, job):
+    """Run job every interval_seconds on a daemon thread, returns an Event that stops it"""
+    stop_event = threading.Event()
+    
+    def loop():
+        while not stop_event.wait(interval_seconds):
+            try:
+                job()
+            except Exception:
+                logger.exception("Background job %s failed", name)
+    
+    thread = threading.Thread(target=loop, name=name, daemon=True)
+    thread.start()
+    return stop_event
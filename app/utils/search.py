@@ -0,0 +1,196 @@
+import re
+from app.config import Config
+
+# Gram size of the full-text index, shorter words can't be looked up and fall back to a prefix LIKE
+GRAM_SIZE = {
+    'mysql': 2,   # ngram_token_size
+    'sqlite': 3,  # FTS5 trigram tokenizer
+}
+# Typo-tolerant stage: queries with this many trigrams must share two of them, capped for the pairing
+FUZZY_PAIR_MIN_TRIGRAMS = 6
+FUZZY_MAX_TRIGRAMS = 12
+
+_WHITESPACE = re.compile(r'\s+')
+_NON_DIGITS = re.compile(r'\D')
+_BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*@"]')
+
+def normalize_query(query):
+    return _WHITESPACE.sub(' ', query or '').strip().lower()[:100]
+
+def _backend():
+    return Config.DB_BACKEND if Config.DB_BACKEND in GRAM_SIZE else 'mysql'
+
+def _indexed_words(query, backend):
+    words = (_BOOLEAN_OPERATORS.sub('', word) for word in query.split(' '))
+    return [word for word in words if len(word) >= GRAM_SIZE[backend]]
+
+def _quoted(text):
+    return '"' + text + '"'
+
+def _fuzzy_groups(words):
+    """Trigram groups a typo-tolerant match needs any one of, enough shared trigrams to survive one typo"""
+    trigrams = []
+    for word in words:
+        for i in range(len(word) - 2):
+            if word[i:i + 3] not in trigrams:
+                trigrams.append(word[i:i + 3])
+    trigrams = trigrams[:FUZZY_MAX_TRIGRAMS]
+    
+    # A typo or swap touches at most four trigrams, shorter queries may share just one
+    if len(trigrams) < FUZZY_PAIR_MIN_TRIGRAMS:
+        return [(trigram,) for trigram in trigrams]
+    return [(first, second) for i, first in enumerate(trigrams) for second in trigrams[i + 1:]]
+
+def _match_expression(words, fuzzy, backend):
+    """Every word as a substring, or when fuzzy any of the trigram groups, in the backend's full-text syntax"""
+    if backend == 'sqlite':
+        if not fuzzy:
+            return ' AND '.join(_quoted(word) for word in words)
+        return ' OR '.join('(' + ' AND '.join(map(_quoted, group)) + ')' for group in _fuzzy_groups(words))
+    
+    # MySQL boolean mode, a quoted ngram phrase is a substring search
+    if not fuzzy:
+        return ' '.join('+' + _quoted(word) for word in words)
+    return ' '.join('(' + ' '.join('+' + _quoted(trigram) for trigram in group) + ')' for group in _fuzzy_groups(words))
+
+def candidate_query(table, columns, where, where_args, query, fuzzy=False):
+    """(sql, args) selecting up to SEARCH_CANDIDATE_LIMIT candidate rows of table, None if the stage doesn't apply
+    
+    The exact stage finds passes containing every word. The fuzzy stage, run when that found too few, also
+    takes passes sharing only some trigrams with the query so misspellings still match. Both take the newest
+    candidates rather than scoring every match in the index, rank_matches() does the final ordering.
+    """
+    backend = _backend()
+    limit = Config.SEARCH_CANDIDATE_LIMIT
+    words = _indexed_words(query, backend)
+    
+    if fuzzy:
+        words = [word for word in words if len(word) >= 3]
+    
+    if not words:
+        if fuzzy:
+            return None
+        sql = f"""
+            SELECT {columns} FROM {table} p
+            WHERE (p.visitor_name LIKE %s OR p.qr_code_string LIKE %s) AND {where}
+            ORDER BY p.date DESC, p.id DESC
+            LIMIT %s
+        """
+        pattern = query.replace('%', '').replace('_', '') + '%'
+        return sql, (pattern, pattern, *where_args, limit)
+    
+    match = _match_expression(words, fuzzy, backend)
+    
+    if backend == 'sqlite':
+        from app.backends.sqlite_backend import SEARCH_INDEXES
+        index = SEARCH_INDEXES[table]
+        # Ordering by rowid streams straight off the index, bm25 would score every match first
+        sql = f"""
+            SELECT {columns} FROM {index} s
+            JOIN {table} p ON p.id = s.rowid
+            WHERE {index} MATCH %s AND {where}
+            ORDER BY s.rowid DESC
+            LIMIT %s
+        """
+    else:
+        sql = f"""
+            SELECT {columns} FROM {table} p
+            WHERE MATCH(p.visitor_name, p.visitor_phone, p.qr_code_string) AGAINST (%s IN BOOLEAN MODE)
+              AND {where}
+            ORDER BY p.id DESC
+            LIMIT %s
+        """
+    return sql, (match, *where_args, limit)
+
+def edit_distance(a, b):
+    """Optimal string alignment distance, insertions, deletions, substitutions and adjacent swaps cost 1"""
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[len(b)]
+
+def word_similarity(word, name_word):
+    """1 for a prefix, else 1 - edit distance / length against the whole word or (slightly less) its start"""
+    if name_word.startswith(word):
+        return 1.0
+    best = 1 - edit_distance(word, name_word) / max(len(word), len(name_word))
+    if len(name_word) > len(word):
+        best = max(best, 0.9 * (1 - edit_distance(word, name_word[:len(word)]) / len(word)))
+    return best
+
+class QueryMatcher:
+    """Scores passes against one query, 0..1, caching word scores since names share most of their words"""
+    
+    def __init__(self, query, phone_e164=None):
+        self.query = query
+        self.phone_e164 = phone_e164
+        self.digits = _NON_DIGITS.sub('', query)
+        self.words = query.split(' ')
+        self._total_length = sum(len(word) for word in self.words)
+        self._word_scores = [{} for _ in self.words]
+        self._name_scores = {}
+    
+    def _word_score(self, index, name_words):
+        word, cache = self.words[index], self._word_scores[index]
+        best = 0.0
+        for name_word in name_words:
+            score = cache.get(name_word)
+            if score is None:
+                score = cache[name_word] = word_similarity(word, name_word)
+            best = max(best, score)
+        return best
+    
+    def name_score(self, name):
+        """Prefix of the whole name is a full match, otherwise each query word against its closest name word"""
+        name = (name or '').lower()
+        score = self._name_scores.get(name)
+        if score is None:
+            if name.startswith(self.query):
+                score = 1.0
+            else:
+                name_words = name.split()
+                score = sum(
+                    len(word) * self._word_score(index, name_words)
+                    for index, word in enumerate(self.words)
+                ) / self._total_length
+            self._name_scores[name] = score
+        return score
+    
+    def score(self, row):
+        if self.phone_e164 and row.get('visitor_phone_e164') == self.phone_e164:
+            return 1.0
+        
+        qr_code = (row.get('qr_code_string') or '').lower()
+        if qr_code.startswith(self.query):
+            return 1.0
+        
+        best = self.name_score(row.get('visitor_name'))
+        
+        if len(self.digits) >= 4:
+            phone = _NON_DIGITS.sub('', row.get('visitor_phone') or '')
+            if phone.endswith(self.digits):
+                best = 1.0
+            elif self.digits in phone:
+                best = max(best, 0.9)
+        
+        if self.query in qr_code:
+            best = max(best, 0.8)
+        
+        return round(best, 4)
+
+def rank_matches(query, rows, limit, phone_e164=None):
+    """Score, drop weak matches and order best first, newest first among equals"""
+    matcher = QueryMatcher(query, phone_e164)
+    scored = []
+    for row in rows:
+        row['score'] = matcher.score(row)
+        if row['score'] >= Config.SEARCH_MIN_SCORE:
+            scored.append(row)
+    scored.sort(key=lambda row: (-row['score'], -row['date'].toordinal(), -row['id']))
+    return scored[:limit]
@@ -0,0 +1,162 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from datetime import datetime, timedelta
+from app.config import Config
+from app.database import get_db_connection
+from app.utils.coherence import apply_changes
+from app.utils.helpers import json_serializer
+from app.utils.scheduler import run_periodically
+
+logger = logging.getLogger(__name__)
+
+# File layout: magic, format version, header length, JSON header, then one compact JSON blob per section.
+# The header maps each section name to its (offset, length) after the header, so sections load straight
+# from the memory-mapped file.
+MAGIC = b'SVSNAP1'
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct('>7sHI')
+
+# Rows updated within this margin before the watermark are replayed too (second-resolution timestamps)
+REPLAY_MARGIN_SECONDS = 2
+
+# Dates changed since the watermark, per cache topic, applied like another worker's changes
+REPLAY_QUERIES = {
+    'occupancy': "SELECT DISTINCT date FROM passes WHERE updated_at >= %s AND date >= %s",
+    'aarti': "SELECT DISTINCT date FROM aarti WHERE updated_at >= %s AND date >= %s",
+}
+
+# Attendant loads are not snapshotted: there is no in-memory copy of them to warm, assign_attendant_round_robin
+# counts each attendant's passes for the day with one indexed query per booking.
+_sections = {}
+
+def register_snapshot_section(name, dump, load):
+    """Register dump() -> JSON-able state (None to skip) and load(state) for one in-memory structure"""
+    _sections[name] = (dump, load)
+
+def _db_now(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT NOW() as now")
+    now = cursor.fetchone()['now']
+    connection.commit()
+    cursor.close()
+    return now if isinstance(now, datetime) else datetime.fromisoformat(str(now))
+
+def write_snapshot(path=None):
+    """Serialize every registered section to path atomically, returns the number of bytes written"""
+    path = path or Config.SNAPSHOT_PATH
+    
+    # Taken before the state, so anything changed while dumping is replayed on load
+    conn = get_db_connection(readonly=False)
+    try:
+        watermark = _db_now(conn)
+    finally:
+        conn.close()
+    
+    blobs = []
+    offsets = {}
+    position = 0
+    for name, (dump, _) in _sections.items():
+        state = dump()
+        if state is None:
+            continue
+        blob = json.dumps(state, default=json_serializer, separators=(',', ':')).encode('utf-8')
+        offsets[name] = (position, len(blob))
+        position += len(blob)
+        blobs.append(blob)
+    
+    header = json.dumps({
+        'created_at': datetime.now().isoformat(),
+        'watermark': watermark.isoformat(),
+        'sections': offsets
+    }).encode('utf-8')
+    
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as snapshot:
+        snapshot.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        snapshot.write(header)
+        for blob in blobs:
+            snapshot.write(blob)
+    os.replace(tmp_path, path)
+    return PREAMBLE.size + len(header) + position
+
+def _read_snapshot(path):
+    """(header, {section: state}) from a snapshot file, None if it is missing or unusable"""
+    try:
+        with open(path, 'rb') as snapshot, mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, version, header_length = PREAMBLE.unpack_from(data, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                logger.warning("Ignoring snapshot %s with unknown format", path)
+                return None
+            header = json.loads(data[PREAMBLE.size:PREAMBLE.size + header_length])
+            base = PREAMBLE.size + header_length
+            states = {
+                name: json.loads(data[base + offset:base + offset + length])
+                for name, (offset, length) in header['sections'].items()
+                if name in _sections
+            }
+            return header, states
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError, struct.error) as e:
+        logger.warning("Ignoring unreadable snapshot %s: %s", path, e)
+        return None
+
+def replay_changes(connection, since):
+    """Apply changes committed since the watermark to the restored structures"""
+    cursor = connection.cursor()
+    changes = {}
+    try:
+        for topic, query in REPLAY_QUERIES.items():
+            cursor.execute(query, (since - timedelta(seconds=REPLAY_MARGIN_SECONDS), datetime.now().date()))
+            days = {str(row['date']) for row in cursor.fetchall()}
+            if days:
+                changes[topic] = days
+        connection.commit()
+    finally:
+        cursor.close()
+    
+    if changes:
+        apply_changes(changes)
+    return changes
+
+def load_snapshot(path=None):
+    """Restore the registered structures from the last snapshot and replay what changed since, returns True if used"""
+    path = path or Config.SNAPSHOT_PATH
+    start = time.perf_counter()
+    
+    snapshot = _read_snapshot(path)
+    if snapshot is None:
+        return False
+    header, states = snapshot
+    
+    watermark = datetime.fromisoformat(header['watermark'])
+    if datetime.fromisoformat(header['created_at']) < datetime.now() - timedelta(seconds=Config.SNAPSHOT_MAX_AGE_SECONDS):
+        logger.info("Snapshot %s is too old, rebuilding from the database", path)
+        return False
+    
+    for name, state in states.items():
+        _sections[name][1](state)
+    
+    conn = get_db_connection(readonly=False)
+    try:
+        changes = replay_changes(conn, watermark)
+    finally:
+        conn.close()
+    
+    logger.info("Loaded snapshot %s (%s) in %.1f ms, replayed %s", path, ', '.join(states) or 'empty',
+                (time.perf_counter() - start) * 1000, {topic: len(days) for topic, days in changes.items()})
+    return True
+
+def run_snapshot():
+    write_snapshot()
+
+def start_snapshot_writer():
+    """Start the background thread that rewrites the warm-start snapshot"""
+    return run_periodically('snapshot-writer', Config.SNAPSHOT_INTERVAL_SECONDS, run_snapshot)
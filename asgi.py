@@ -0,0 +1,11 @@
+"""Async serving mode: uvicorn asgi:app
+
+Needs the packages in requirements-async.txt. Scanner scan-qr, attendant/assigned,
+passes/today and aarti are served natively on an aiomysql pool, the rest of the
+API is the regular Flask app. Request profiling (X-Profile) only covers the
+Flask routes, see app/async_views.py.
+"""
+from main import app as flask_app
+from app.async_views import create_asgi_app
+
+app = create_asgi_app(flask_app)
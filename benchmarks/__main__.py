@@ -0,0 +1,85 @@
+"""Festival-day load benchmark
+
+In-process against a fresh embedded SQLite database:
+
+    python -m benchmarks --passes 20000 --clients 32 --duration 60 --output after.json --compare before.json
+
+Against a running server, with DB_* pointing at the same (empty) database the server uses:
+
+    python -m benchmarks --base-url http://localhost:5000 --output run.json
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Festival-day load benchmark')
+    parser.add_argument('--trustees', type=int, default=20)
+    parser.add_argument('--attendants', type=int, default=30)
+    parser.add_argument('--scanners', type=int, default=10)
+    parser.add_argument('--passes', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=3)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to run the workload')
+    parser.add_argument('--requests', type=int, default=None, help='stop after this many operations')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--base-url', help='benchmark a running server instead of the in-process app')
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--compare', help='baseline JSON report to compare against')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    
+    if not args.base_url:
+        # Fresh embedded database for every in-process run
+        workdir = tempfile.mkdtemp(prefix='sv-bench-')
+        os.environ.setdefault('DB_BACKEND', 'sqlite')
+        os.environ.setdefault('SQLITE_PATH', os.path.join(workdir, 'bench.db'))
+        os.environ.setdefault('JWT_SECRET', 'bench-secret')
+        os.environ.setdefault('EXPIRY_SWEEP_ENABLED', 'false')
+    
+    from app.database import get_db_connection
+    from benchmarks import datagen, report, workload
+    
+    connection = get_db_connection()
+    try:
+        context = datagen.generate(
+            connection,
+            trustees=args.trustees,
+            attendants=args.attendants,
+            scanners=args.scanners,
+            passes=args.passes,
+            days=args.days,
+            seed=args.seed
+        )
+    finally:
+        connection.close()
+    
+    if args.base_url:
+        client_factory = lambda: workload.HttpClient(args.base_url)
+    else:
+        from main import app
+        client_factory = lambda: workload.InProcessClient(app)
+    
+    samples, elapsed = workload.run_workload(
+        client_factory,
+        context,
+        clients=args.clients,
+        duration=args.duration,
+        max_requests=args.requests,
+        seed=args.seed
+    )
+    
+    config = {key: value for key, value in vars(args).items() if key not in ('output', 'compare')}
+    result = report.summarize(samples, elapsed, config)
+    baseline = report.load(args.compare) if args.compare else None
+    print(report.format_report(result, baseline))
+    
+    if args.output:
+        report.save(result, args.output)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""Concurrent-connection capacity of the sync (WSGI) and async (asgi.py) servers
+
+    python -m benchmarks.capacity --phone 9000000001 --levels 50,200,1000 --duration 10 \
+        --target sync=http://127.0.0.1:5000 --target async=http://127.0.0.1:8000
+
+Every level opens that many keep-alive connections at once. Each one sends GET
+requests back to back for the duration. The report shows, per target and level,
+how many connections could be opened, the completed requests and their latency.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from urllib.parse import urlsplit
+from benchmarks import report, workload
+from benchmarks.datagen import BENCH_PASSWORD
+
+CONNECT_TIMEOUT = 10
+
+class _Stats:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.connect_errors = 0
+        self.connected = 0
+    
+    def record(self, status, seconds):
+        self.latencies.append(seconds * 1000)
+        self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+
+async def _read_response(reader):
+    """Status code and whether the server keeps the connection open, the body is read and dropped"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+    
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        return status, False
+    
+    keep_alive = headers.get('connection', '').lower() != 'close' and not status_line.startswith(b'HTTP/1.0')
+    return status, keep_alive
+
+async def _open(host, port):
+    return await asyncio.wait_for(asyncio.open_connection(host, port), CONNECT_TIMEOUT)
+
+async def _connection(host, port, request, start_at, deadline, stats):
+    try:
+        reader, writer = await _open(host, port)
+    except (OSError, asyncio.TimeoutError):
+        stats.connect_errors += 1
+        return
+    stats.connected += 1
+    
+    # All connections are held open before any request is sent
+    await asyncio.sleep(max(start_at - time.monotonic(), 0))
+    
+    try:
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                writer.write(request)
+                await writer.drain()
+                status, keep_alive = await asyncio.wait_for(_read_response(reader), max(deadline - time.monotonic(), 0.001) + 30)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError, IndexError) as e:
+                stats.record(type(e).__name__, time.perf_counter() - started)
+                keep_alive = False
+            else:
+                stats.record(status, time.perf_counter() - started)
+            
+            if not keep_alive:
+                writer.close()
+                try:
+                    reader, writer = await _open(host, port)
+                except (OSError, asyncio.TimeoutError):
+                    stats.connect_errors += 1
+                    return
+    finally:
+        writer.close()
+
+async def run_level(base_url, path, headers, connections, duration):
+    """Hold `connections` connections open and hammer path for duration seconds"""
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    header_lines = ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+    request = f'GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\n{header_lines}\r\n'.encode('latin-1')
+    
+    stats = _Stats()
+    start_at = time.monotonic() + min(5.0, 0.005 * connections + 0.5)
+    deadline = start_at + duration
+    await asyncio.gather(*(_connection(host, port, request, start_at, deadline, stats) for _ in range(connections)))
+    
+    latencies = sorted(stats.latencies)
+    errors = sum(count for status, count in stats.statuses.items() if not status.isdigit() or int(status) >= 500)
+    return {
+        'connections': connections,
+        'connected': stats.connected,
+        'connect_errors': stats.connect_errors,
+        'requests': len(latencies),
+        'errors': errors,
+        'statuses': stats.statuses,
+        'throughput_rps': round(len(latencies) / duration, 2),
+        'p50_ms': round(report.percentile(latencies, 50), 3),
+        'p99_ms': round(report.percentile(latencies, 99), 3),
+        'max_ms': round(latencies[-1], 3) if latencies else 0.0,
+    }
+
+def format_capacity(results):
+    lines = [f"{'target':<10} {'conns':>6} {'open':>6} {'reqs':>8} {'rps':>9} {'errors':>7} {'p50 ms':>9} {'p99 ms':>9}"]
+    for target, levels in results.items():
+        for level in levels:
+            lines.append(
+                f"{target:<10} {level['connections']:>6} {level['connected']:>6} {level['requests']:>8} "
+                f"{level['throughput_rps']:>9.1f} {level['errors'] + level['connect_errors']:>7} "
+                f"{level['p50_ms']:>9.1f} {level['p99_ms']:>9.1f}"
+            )
+    return '\n'.join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.capacity', description=__doc__.splitlines()[0])
+    parser.add_argument('--target', action='append', required=True, help='name=base_url, repeat to compare servers')
+    parser.add_argument('--phone', required=True, help='user to log in as (a scanner, attendant or admin)')
+    parser.add_argument('--password', default=BENCH_PASSWORD)
+    parser.add_argument('--path', default='/api/passes/today')
+    parser.add_argument('--levels', default='50,200,1000', help='comma separated connection counts')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per level')
+    parser.add_argument('--output', help='write the JSON report here')
+    args = parser.parse_args(argv)
+    
+    targets = dict(target.split('=', 1) for target in args.target)
+    levels = [int(level) for level in args.levels.split(',')]
+    
+    results = {}
+    for name, base_url in targets.items():
+        headers = workload.login(workload.HttpClient(base_url), args.phone, args.password)
+        results[name] = []
+        for connections in levels:
+            level = asyncio.run(run_level(base_url, args.path, headers, connections, args.duration))
+            results[name].append(level)
+            print(f'{name}: {connections} connections, {level["requests"]} requests', file=sys.stderr)
+    
+    print(format_capacity(results))
+    
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'config': vars(args), 'results': results}, output, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import random
+from datetime import date, timedelta
+import bcrypt
+from app.utils.qr_generator import generate_qr_string
+
+BENCH_PASSWORD = 'bench-password'
+DARSHAN_TYPES = ['VIP', 'VASTRA', 'ESCORT', 'NORMAL']
+AARTI_NAMES = ['KAKAD', 'MADHYAN', 'DHOOP', 'SHEJ']
+PENDING_STATUSES = ['NOT_CONTACTED', 'CONTACTED', 'CONFIRMED']
+
+def slot_times(start_hour=6, end_hour=21, step_minutes=30):
+    """Darshan slot start times as HH:MM:SS strings"""
+    times = []
+    minutes = start_hour * 60
+    while minutes < end_hour * 60:
+        times.append(f'{minutes // 60:02d}:{minutes % 60:02d}:00')
+        minutes += step_minutes
+    return times
+
+def _insert_users(cursor, role, count, phone_prefix, password_hash):
+    rows = [
+        (f'{role.title()} {i}', f'{phone_prefix}{i:06d}', password_hash, role)
+        for i in range(count)
+    ]
+    cursor.executemany("""
+        INSERT INTO users (name, phone, password, role, is_active)
+        VALUES (%s, %s, %s, %s, TRUE)
+    """, rows)
+    cursor.execute(
+        "SELECT id, phone FROM users WHERE role = %s AND phone LIKE %s ORDER BY id",
+        (role, f'{phone_prefix}%')
+    )
+    return cursor.fetchall()
+
+def generate(connection, trustees=20, attendants=30, scanners=10, passes=5000, days=3, seed=42, batch_size=1000):
+    """Create users, aarti slots and passes spread over slots from today for `days` days"""
+    rng = random.Random(seed)
+    cursor = connection.cursor()
+    
+    # Low bcrypt cost keeps generation fast, logins still go through the real check
+    password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=4)).decode('utf-8')
+    
+    users = {
+        'ADMIN': _insert_users(cursor, 'ADMIN', 1, '90', password_hash),
+        'TRUSTEE': _insert_users(cursor, 'TRUSTEE', trustees, '91', password_hash),
+        'ATTENDANT': _insert_users(cursor, 'ATTENDANT', attendants, '92', password_hash),
+        'SCANNER': _insert_users(cursor, 'SCANNER', scanners, '93', password_hash),
+    }
+    
+    today = date.today()
+    dates = [today + timedelta(days=offset) for offset in range(days)]
+    
+    # Attendants are checked in for today
+    cursor.executemany("""
+        INSERT INTO attendant_attendance (attendant_id, date, time_in)
+        VALUES (%s, %s, NOW())
+    """, [(user['id'], today) for user in users['ATTENDANT']])
+    
+    cursor.executemany("""
+        INSERT INTO aarti (name, date, total_capacity, booked_capacity, status)
+        VALUES (%s, %s, %s, 0, 'OPEN')
+    """, [(name, day, 100000) for day in dates for name in AARTI_NAMES])
+    
+    times = slot_times()
+    trustee_ids = [user['id'] for user in users['TRUSTEE']]
+    attendant_ids = [user['id'] for user in users['ATTENDANT']]
+    
+    batch = []
+    for i in range(passes):
+        batch.append((
+            rng.choice(trustee_ids),
+            f'Visitor {i}',
+            f'98{rng.randrange(10 ** 8):08d}',
+            rng.randint(1, 6),
+            rng.choice(DARSHAN_TYPES),
+            dates[i % len(dates)],
+            rng.choice(times),
+            30,
+            attendant_ids[i % len(attendant_ids)],
+            generate_qr_string(),
+            rng.choice(PENDING_STATUSES)
+        ))
+        if len(batch) >= batch_size:
+            _insert_passes(cursor, batch)
+            batch = []
+    if batch:
+        _insert_passes(cursor, batch)
+    
+    connection.commit()
+    
+    # Gate traffic scans today's passes
+    cursor.execute("SELECT id, qr_code_string FROM passes WHERE date = %s", (today,))
+    todays_passes = cursor.fetchall()
+    cursor.execute("SELECT id FROM aarti WHERE date = %s", (today,))
+    aarti_ids = [row['id'] for row in cursor.fetchall()]
+    cursor.close()
+    
+    return {
+        'users': {role: [user['phone'] for user in rows] for role, rows in users.items()},
+        'dates': [day.isoformat() for day in dates],
+        'todays_passes': [(row['id'], row['qr_code_string']) for row in todays_passes],
+        'aarti_ids': aarti_ids,
+        'password': BENCH_PASSWORD
+    }
+
+def _insert_passes(cursor, rows):
+    cursor.executemany("""
+        INSERT INTO passes (
+            trustee_id, visitor_name, visitor_phone, total_people, darshan_type,
+            date, time, grace_minutes, assigned_attendant_id, qr_code_string, status
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, rows)
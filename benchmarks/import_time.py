@@ -0,0 +1,65 @@
+"""Cold-start budget for `import main`
+
+    python -m benchmarks.import_time --budget-ms 400
+
+Imports main in fresh interpreters and exits non-zero if the fastest run is
+over budget or if a rendering library got imported eagerly. The test suite
+checks the same budget in tests/test_import_time.py.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Must only be imported when a ticket or QR image is actually rendered
+LAZY_MODULES = ('reportlab', 'qrcode', 'PIL')
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+loaded = sorted({name.split('.')[0] for name in sys.modules} & set(%r))
+print(json.dumps({'seconds': elapsed, 'loaded': loaded}))
+""" % (LAZY_MODULES,)
+
+def measure(runs=5):
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, EXPIRY_SWEEP_ENABLED='false', PRELOAD_RENDERERS='false')
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE],
+            cwd=project_root,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.import_time')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('IMPORT_BUDGET_MS', 500)))
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args(argv)
+    
+    results = measure(args.runs)
+    best_ms = min(result['seconds'] for result in results) * 1000
+    eager = sorted({name for result in results for name in result['loaded']})
+    
+    print(f'cold import main: best {best_ms:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)')
+    
+    failed = False
+    if best_ms > args.budget_ms:
+        print('FAIL: import time over budget')
+        failed = True
+    if eager:
+        print(f'FAIL: imported eagerly: {", ".join(eager)}')
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
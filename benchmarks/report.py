@@ -0,0 +1,78 @@
+import json
+import math
+import platform
+from datetime import datetime
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(samples, elapsed, config=None):
+    """Per-endpoint p50/p95/p99 latency and throughput"""
+    by_endpoint = {}
+    for name, status, seconds in samples:
+        by_endpoint.setdefault(name, []).append((status, seconds))
+    
+    endpoints = {}
+    for name, rows in sorted(by_endpoint.items()):
+        latencies = sorted(seconds * 1000 for _, seconds in rows)
+        statuses = {}
+        for status, _ in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        errors = sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 500)
+        endpoints[name] = {
+            'count': len(rows),
+            'errors': errors,
+            'statuses': statuses,
+            'throughput_rps': round(len(rows) / elapsed, 2) if elapsed else 0,
+            'mean_ms': round(sum(latencies) / len(latencies), 3),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'max_ms': round(latencies[-1], 3),
+        }
+    
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'config': config or {},
+        'elapsed_s': round(elapsed, 3),
+        'total_requests': len(samples),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0,
+        'endpoints': endpoints,
+    }
+
+def save(report, path):
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+
+def load(path):
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)
+
+def format_report(report, baseline=None):
+    """Plain-text table, with the change against a baseline report when given"""
+    header = f"{'endpoint':<32} {'count':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    if baseline:
+        header += f" {'p95 vs base':>12}"
+    lines = [header, '-' * len(header)]
+    
+    for name, stats in report['endpoints'].items():
+        line = (
+            f"{name:<32} {stats['count']:>7} {stats['throughput_rps']:>8} {stats['p50_ms']:>9} "
+            f"{stats['p95_ms']:>9} {stats['p99_ms']:>9} {stats['errors']:>7}"
+        )
+        base = baseline['endpoints'].get(name) if baseline else None
+        if base and base['p95_ms']:
+            change = (stats['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100
+            line += f" {change:>+11.1f}%"
+        lines.append(line)
+    
+    lines.append('-' * len(header))
+    lines.append(f"total {report['total_requests']} requests in {report['elapsed_s']}s = {report['throughput_rps']} req/s")
+    if baseline:
+        lines.append(f"baseline {baseline['throughput_rps']} req/s")
+    return '\n'.join(lines)
@@ -0,0 +1,188 @@
+"""Help-desk search latency, GET /api/visitors/search
+
+In-process against a fresh embedded SQLite database:
+
+    python -m benchmarks.search --passes 50000 --days 120 --clients 8 --duration 30 --output search.json
+
+Against a running server, with DB_* pointing at the same (empty) database the server uses:
+
+    python -m benchmarks.search --base-url http://localhost:5000 --output search.json
+
+Passes are spread over --days before today, the ones older than PASS_RETENTION_DAYS are moved
+to the archive. Each search path is reported on its own line so its p99 can be compared between
+runs: exact names, misspelled names (the fuzzy stage), phone numbers typed in another format and
+windows reaching back into the archive.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import date, timedelta
+from benchmarks import report, workload
+
+FIRST_NAMES = [
+    'Aarti', 'Anil', 'Deepak', 'Ganesh', 'Kavita', 'Mahesh', 'Meera', 'Nitin', 'Pooja', 'Prakash',
+    'Rahul', 'Ramesh', 'Savita', 'Sneha', 'Sunil', 'Sunita', 'Suresh', 'Swati', 'Vijay', 'Vaishali'
+]
+LAST_NAMES = [
+    'Bhosale', 'Chavan', 'Deshmukh', 'Gaikwad', 'Jadhav', 'Joshi', 'Kadam', 'Kulkarni', 'More', 'Patil',
+    'Pawar', 'Shah', 'Shinde', 'Salunkhe', 'Thakur', 'Wagh'
+]
+
+def generate(connection, passes=20000, days=90, seed=42, batch_size=1000):
+    """Users from datagen plus searchable passes over the last `days` days, archived past retention"""
+    from app.config import Config
+    from app.utils.archiver import archive_passes
+    from app.utils.phone import normalize_phone
+    from app.utils.qr_generator import generate_qr_string
+    from benchmarks import datagen
+    
+    context = datagen.generate(connection, passes=0, days=1, seed=seed)
+    rng = random.Random(seed)
+    cursor = connection.cursor()
+    
+    cursor.execute("SELECT id, role FROM users WHERE role IN ('TRUSTEE', 'ATTENDANT') ORDER BY id")
+    ids = {'TRUSTEE': [], 'ATTENDANT': []}
+    for row in cursor.fetchall():
+        ids[row['role']].append(row['id'])
+    
+    today = date.today()
+    times = datagen.slot_times()
+    visitors = []
+    batch = []
+    for i in range(passes):
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        phone = f'98{rng.randrange(10 ** 8):08d}'
+        day = today - timedelta(days=rng.randrange(days))
+        batch.append((
+            rng.choice(ids['TRUSTEE']),
+            name,
+            phone,
+            normalize_phone(phone),
+            rng.randint(1, 6),
+            rng.choice(datagen.DARSHAN_TYPES),
+            day,
+            rng.choice(times),
+            30,
+            ids['ATTENDANT'][i % len(ids['ATTENDANT'])],
+            generate_qr_string(),
+            rng.choice(datagen.PENDING_STATUSES)
+        ))
+        if i % 50 == 0:
+            visitors.append((name, phone))
+        if len(batch) >= batch_size:
+            _insert_passes(cursor, batch)
+            batch = []
+    if batch:
+        _insert_passes(cursor, batch)
+    connection.commit()
+    cursor.close()
+    
+    archived = archive_passes(connection, today - timedelta(days=Config.PASS_RETENTION_DAYS))
+    print(f'{passes - archived} live passes, {archived} archived', file=sys.stderr)
+    
+    context['visitors'] = visitors
+    context['archive_from'] = (today - timedelta(days=min(days, Config.SEARCH_MAX_WINDOW_DAYS))).isoformat()
+    context['today'] = today.isoformat()
+    return context
+
+def _insert_passes(cursor, rows):
+    cursor.executemany("""
+        INSERT INTO passes (
+            trustee_id, visitor_name, visitor_phone, visitor_phone_e164, total_people, darshan_type,
+            date, time, grace_minutes, assigned_attendant_id, qr_code_string, status
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, rows)
+
+def _misspell(name, rng):
+    """Swap two neighbouring letters of the surname"""
+    first, last = name.split(' ')
+    i = rng.randrange(1, len(last) - 1)
+    return f'{first} {last[:i]}{last[i + 1]}{last[i]}{last[i + 2:]}'
+
+def _search(record, name, client, headers, **params):
+    query = '&'.join(f'{key}={value}' for key, value in params.items())
+    workload._timed(record, name, client, 'GET', f'/api/visitors/search?{query}', headers=headers)
+
+def op_search_exact(client, headers, context, rng, record):
+    name, _ = rng.choice(context['visitors'])
+    _search(record, 'GET /visitors/search exact', client, headers, q=name.replace(' ', '+'))
+
+def op_search_fuzzy(client, headers, context, rng, record):
+    name, _ = rng.choice(context['visitors'])
+    _search(record, 'GET /visitors/search fuzzy', client, headers, q=_misspell(name, rng).replace(' ', '+'))
+
+def op_search_phone(client, headers, context, rng, record):
+    _, phone = rng.choice(context['visitors'])
+    _search(record, 'GET /visitors/search phone', client, headers, q=f'%2B91+{phone[:5]}+{phone[5:]}')
+
+def op_search_archive(client, headers, context, rng, record):
+    name, _ = rng.choice(context['visitors'])
+    _search(record, 'GET /visitors/search archive', client, headers,
+            q=name.split(' ')[1], **{'from': context['archive_from'], 'to': context['today']})
+
+# (operation, role, weight) — help desk lookups, admins search every pass
+SEARCH_MIX = [
+    (op_search_exact, 'ADMIN', 40),
+    (op_search_fuzzy, 'ADMIN', 20),
+    (op_search_phone, 'ADMIN', 25),
+    (op_search_archive, 'ADMIN', 15),
+]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.search', description=__doc__.splitlines()[0])
+    parser.add_argument('--passes', type=int, default=20000)
+    parser.add_argument('--days', type=int, default=90, help='passes are spread over this many days before today')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to run the workload')
+    parser.add_argument('--requests', type=int, default=None, help='stop after this many searches')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--base-url', help='benchmark a running server instead of the in-process app')
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--compare', help='baseline JSON report to compare against')
+    args = parser.parse_args(argv)
+    
+    if not args.base_url:
+        # Fresh embedded database for every in-process run
+        workdir = tempfile.mkdtemp(prefix='sv-bench-search-')
+        os.environ.setdefault('DB_BACKEND', 'sqlite')
+        os.environ.setdefault('SQLITE_PATH', os.path.join(workdir, 'bench.db'))
+        os.environ.setdefault('JWT_SECRET', 'bench-secret')
+        os.environ.setdefault('EXPIRY_SWEEP_ENABLED', 'false')
+    
+    from app.database import get_db_connection
+    
+    connection = get_db_connection()
+    try:
+        context = generate(connection, passes=args.passes, days=args.days, seed=args.seed)
+    finally:
+        connection.close()
+    
+    if args.base_url:
+        client_factory = lambda: workload.HttpClient(args.base_url)
+    else:
+        from main import app
+        client_factory = lambda: workload.InProcessClient(app)
+    
+    samples, elapsed = workload.run_workload(
+        client_factory,
+        context,
+        clients=args.clients,
+        duration=args.duration,
+        max_requests=args.requests,
+        mix=SEARCH_MIX,
+        seed=args.seed
+    )
+    
+    config = {key: value for key, value in vars(args).items() if key not in ('output', 'compare')}
+    result = report.summarize(samples, elapsed, config)
+    baseline = report.load(args.compare) if args.compare else None
+    print(report.format_report(result, baseline))
+    
+    if args.output:
+        report.save(result, args.output)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+class InProcessClient:
+    """Drives the Flask app directly through its test client"""
+    
+    def __init__(self, app):
+        self._client = app.test_client()
+    
+    def request(self, method, path, body=None, headers=None):
+        response = self._client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.get_data()
+
+class HttpClient:
+    """Drives a running server over HTTP"""
+    
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+    
+    def request(self, method, path, body=None, headers=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        request.add_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            request.add_header(name, value)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+def login(client, phone, password):
+    status, body = client.request('POST', '/api/login', {'phone': phone, 'password': password})
+    if status != 200:
+        raise RuntimeError(f'Login failed for {phone}: {status} {body[:200]!r}')
+    return {'Authorization': 'Bearer ' + json.loads(body)['token']}
+
+# Operations: each records one or more (endpoint, status, seconds) samples
+
+def _timed(record, name, client, method, path, body=None, headers=None):
+    start = time.perf_counter()
+    status, response_body = client.request(method, path, body, headers)
+    record(name, status, time.perf_counter() - start)
+    return status, response_body
+
+def op_create_pass(client, headers, context, rng, record):
+    _timed(record, 'POST /passes', client, 'POST', '/api/passes', {
+        'visitor_name': f'Bench Visitor {rng.randrange(10 ** 6)}',
+        'visitor_phone': f'97{rng.randrange(10 ** 8):08d}',
+        'total_people': rng.randint(1, 6),
+        'darshan_type': rng.choice(['VIP', 'VASTRA', 'ESCORT', 'NORMAL']),
+        'date': rng.choice(context['dates']),
+        'time': f'{rng.randint(6, 20):02d}:{rng.choice(["00", "30"])}:00'
+    }, headers)
+
+def op_book_aarti(client, headers, context, rng, record):
+    _timed(record, 'POST /aarti/book', client, 'POST', '/api/aarti/book', {
+        'aarti_id': rng.choice(context['aarti_ids']),
+        'visitor_name': f'Aarti Visitor {rng.randrange(10 ** 6)}',
+        'visitor_phone': f'96{rng.randrange(10 ** 8):08d}',
+        'count': rng.randint(1, 4)
+    }, headers)
+
+def op_gate_scan(client, headers, context, rng, record):
+    pass_id, qr_code = rng.choice(context['todays_passes'])
+    _timed(record, 'POST /scanner/scan-qr', client, 'POST', '/api/scanner/scan-qr', {'qr_code_string': qr_code}, headers)
+    _timed(record, 'POST /scanner/update-status', client, 'POST', '/api/scanner/update-status', {
+        'pass_id': pass_id,
+        'stage': rng.choice(['ARRIVED', 'AT_GATE'])
+    }, headers)
+
+def op_attendant_poll(client, headers, context, rng, record):
+    _timed(record, 'GET /attendant/assigned', client, 'GET', '/api/attendant/assigned', headers=headers)
+
+def op_admin_today(client, headers, context, rng, record):
+    _timed(record, 'GET /passes/today', client, 'GET', '/api/passes/today', headers=headers)
+
+def op_admin_performance(client, headers, context, rng, record):
+    _timed(record, 'GET /admin/performance', client, 'GET', '/api/admin/performance', headers=headers)
+
+def op_admin_attendance(client, headers, context, rng, record):
+    _timed(record, 'GET /admin/attendance', client, 'GET', '/api/admin/attendance', headers=headers)
+
+# (operation, role, weight) — roughly a festival morning at the gate
+DEFAULT_MIX = [
+    (op_create_pass, 'TRUSTEE', 10),
+    (op_book_aarti, 'TRUSTEE', 5),
+    (op_gate_scan, 'SCANNER', 30),
+    (op_attendant_poll, 'ATTENDANT', 45),
+    (op_admin_today, 'ADMIN', 6),
+    (op_admin_performance, 'ADMIN', 2),
+    (op_admin_attendance, 'ADMIN', 2),
+]
+
+def run_workload(client_factory, context, clients=16, duration=30.0, max_requests=None, mix=None, seed=7, logins_per_role=5):
+    """Replay the mix from `clients` threads, returns (samples, elapsed seconds)"""
+    mix = mix or DEFAULT_MIX
+    setup_client = client_factory()
+    
+    tokens = {}
+    for role in {role for _, role, _ in mix}:
+        phones = context['users'][role][:logins_per_role]
+        tokens[role] = [login(setup_client, phone, context['password']) for phone in phones]
+    
+    operations = [op for op, _, _ in mix]
+    roles = [role for _, role, _ in mix]
+    weights = [weight for _, _, weight in mix]
+    
+    samples = []
+    samples_lock = threading.Lock()
+    issued = [0]
+    deadline = time.monotonic() + duration
+    
+    def record(name, status, seconds):
+        with samples_lock:
+            samples.append((name, status, seconds))
+    
+    def worker(index):
+        rng = random.Random(seed + index)
+        client = client_factory()
+        while time.monotonic() < deadline:
+            with samples_lock:
+                if max_requests is not None and issued[0] >= max_requests:
+                    return
+                issued[0] += 1
+            choice = rng.choices(range(len(operations)), weights)[0]
+            headers = rng.choice(tokens[roles[choice]])
+            try:
+                operations[choice](client, headers, context, rng, record)
+            except Exception as e:
+                record(operations[choice].__name__, f'error:{type(e).__name__}', 0.0)
+    
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    
+    return samples, elapsed
@@ -6,9 +6,31 @@ from app.controllers.attendant_controller import attendant_bp
 from app.controllers.scanner_controller import scanner_bp
 from app.controllers.aarti_controller import aarti_bp
 from app.controllers.admin_controller import admin_bp
+from app.controllers.visitor_controller import visitor_bp
+from app.config import Config
+from app.middleware.metrics_middleware import init_metrics
+from app.middleware.compression_middleware import init_compression
+from app.middleware.admission_control import init_admission_control
+from app.middleware.profiling_middleware import init_profiling
+from app.utils.query_log import init_query_log
+from app.utils.helpers import json_serializer
+from app.utils.expiry_sweeper import start_expiry_sweeper
+from app.utils.archiver import start_archiver
+from app.utils.reminders import start_reminder_dispatcher
+from app.utils.phone import start_phone_backfill
+from app.utils.coherence import start_coherence_poller
+from app.utils.snapshots import load_snapshot, start_snapshot_writer
 
 app = Flask(__name__)
+app.json.default = json_serializer
 CORS(app)
+init_metrics(app)
+if Config.PROFILE_ENABLED:
+    init_profiling(app)
+init_compression(app)
+if Config.ADMISSION_CONTROL_ENABLED:
+    init_admission_control(app)
+init_query_log()
 
 # Register all blueprints
 app.register_blueprint(auth_bp, url_prefix='/api')
@@ -17,6 +39,7 @@ app.register_blueprint(attendant_bp, url_prefix='/api')
 app.register_blueprint(scanner_bp, url_prefix='/api')
 app.register_blueprint(aarti_bp, url_prefix='/api')
 app.register_blueprint(admin_bp, url_prefix='/api')
+app.register_blueprint(visitor_bp, url_prefix='/api')
 
 @app.route('/')
 def home():
@@ -26,5 +49,32 @@ def home():
 def health():
     return {'status': 'healthy'}, 200
 
+if Config.PRELOAD_RENDERERS:
+    from app.utils.pdf_generator import preload_renderers
+    preload_renderers()
+
+# Warm start: restore in-memory indexes before serving instead of rebuilding them
+if Config.SNAPSHOT_ENABLED:
+    load_snapshot()
+
+# Background jobs
+if Config.EXPIRY_SWEEP_ENABLED:
+    start_expiry_sweeper()
+
+if Config.ARCHIVE_ENABLED:
+    start_archiver()
+
+if Config.REMINDERS_ENABLED:
+    start_reminder_dispatcher()
+
+if Config.PHONE_BACKFILL_ENABLED:
+    start_phone_backfill()
+
+if Config.COHERENCE_ENABLED:
+    start_coherence_poller()
+
+if Config.SNAPSHOT_ENABLED:
+    start_snapshot_writer()
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,7 @@
+USE siddhivinayak_pro;
+
+-- Lets the expiry sweeper find overdue passes without scanning the table
+CREATE INDEX idx_passes_status_date ON passes (status, date);
+
+-- Issues raised by background jobs (e.g. NO_SHOW from the expiry sweeper) have no reporting user
+ALTER TABLE issues MODIFY reported_by_user_id INT NULL;
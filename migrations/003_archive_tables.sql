@@ -0,0 +1,58 @@
+USE siddhivinayak_pro;
+
+-- Hot tables only keep recent rows, older ones move to the *_archive tables below.
+-- (MySQL cannot partition tables that have foreign keys, so archive tables are used instead.)
+
+-- Sargable date lookups for the today/upcoming lists
+CREATE INDEX idx_passes_date_time ON passes (date, time);
+CREATE INDEX idx_passes_trustee_date ON passes (trustee_id, date, time);
+CREATE INDEX idx_passes_attendant_date ON passes (assigned_attendant_id, date, time);
+CREATE INDEX idx_logs_created_at ON logs (created_at);
+
+CREATE TABLE passes_archive (
+    id INT PRIMARY KEY,
+    trustee_id INT NOT NULL,
+    assistant_id INT NULL,
+    visitor_name VARCHAR(255) NOT NULL,
+    visitor_phone VARCHAR(20) NOT NULL,
+    visitor_email VARCHAR(255),
+    total_people INT NOT NULL,
+    darshan_type ENUM('VIP', 'VASTRA', 'ESCORT', 'NORMAL') NOT NULL,
+    vastra_count INT NULL,
+    vastra_names JSON NULL,
+    date DATE NOT NULL,
+    time TIME NOT NULL,
+    grace_minutes INT NOT NULL,
+    assigned_attendant_id INT NULL,
+    trustee_note VARCHAR(100),
+    attendant_notes JSON NULL,
+    qr_code_string VARCHAR(255) NOT NULL,
+    status ENUM('NOT_CONTACTED', 'CONTACTED', 'CONFIRMED', 'REACHED', 'AT_GATE', 'COMPLETED', 'CANCELLED', 'EXPIRED', 'ISSUE'),
+    created_at TIMESTAMP NULL,
+    updated_at TIMESTAMP NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_passes_archive_date (date),
+    KEY idx_passes_archive_qr (qr_code_string)
+);
+
+CREATE TABLE scans_archive (
+    id INT PRIMARY KEY,
+    pass_id INT NOT NULL,
+    stage ENUM('ARRIVED', 'AT_GATE', 'COMPLETED') NOT NULL,
+    source ENUM('SCANNER', 'ATTENDANT') NOT NULL,
+    created_at TIMESTAMP NULL,
+    KEY idx_scans_archive_pass (pass_id, created_at)
+);
+
+CREATE TABLE issues_archive (
+    id INT PRIMARY KEY,
+    pass_id INT NOT NULL,
+    reported_by_user_id INT NULL,
+    issue_type ENUM('LATE', 'DUPLICATE_QR', 'NO_SHOW', 'OTHER') NOT NULL,
+    description VARCHAR(255),
+    status ENUM('OPEN', 'RESOLVED'),
+    resolved_by_user_id INT NULL,
+    created_at TIMESTAMP NULL,
+    updated_at TIMESTAMP NULL,
+    KEY idx_issues_archive_pass (pass_id)
+);
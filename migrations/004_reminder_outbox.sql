@@ -0,0 +1,21 @@
+USE siddhivinayak_pro;
+
+-- Reminders waiting to be sent by the background dispatcher (see settings.reminder_config)
+CREATE TABLE reminder_outbox (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    pass_id INT NOT NULL,
+    channel VARCHAR(20) NOT NULL,
+    lead_minutes INT NOT NULL,
+    recipient VARCHAR(20) NOT NULL,
+    message VARCHAR(500) NOT NULL,
+    status ENUM('PENDING', 'SENDING', 'SENT', 'FAILED') DEFAULT 'PENDING',
+    attempts INT DEFAULT 0,
+    next_attempt_at TIMESTAMP NULL,
+    last_error VARCHAR(255) NULL,
+    sent_at TIMESTAMP NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (pass_id) REFERENCES passes(id) ON DELETE CASCADE,
+    UNIQUE KEY unique_reminder (pass_id, channel, lead_minutes),
+    KEY idx_outbox_status_next (status, next_attempt_at)
+);
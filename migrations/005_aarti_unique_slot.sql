@@ -0,0 +1,5 @@
+USE siddhivinayak_pro;
+
+-- One row per aarti per date, lets schedules be written with INSERT ... ON DUPLICATE KEY UPDATE.
+-- Merge any duplicate (name, date) rows before running this.
+ALTER TABLE aarti ADD UNIQUE KEY unique_aarti_slot (name, date);
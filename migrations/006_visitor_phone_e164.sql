@@ -0,0 +1,9 @@
+USE siddhivinayak_pro;
+
+-- visitor_phone as entered is kept for display, lookups go through the E.164 form.
+-- Existing rows are filled in by the phone backfill job.
+ALTER TABLE passes ADD COLUMN visitor_phone_e164 VARCHAR(16) NULL AFTER visitor_phone;
+CREATE INDEX idx_passes_phone_e164 ON passes (visitor_phone_e164, date, id);
+
+ALTER TABLE passes_archive ADD COLUMN visitor_phone_e164 VARCHAR(16) NULL AFTER visitor_phone;
+CREATE INDEX idx_passes_archive_phone_e164 ON passes_archive (visitor_phone_e164, date, id);
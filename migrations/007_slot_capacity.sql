@@ -0,0 +1,5 @@
+USE siddhivinayak_pro;
+
+-- Per-slot people limits enforced by create_pass, e.g.
+-- {"default": 200, "slots": {"09:00": 80, "09:30": 80}}
+ALTER TABLE settings ADD COLUMN slot_capacity_config JSON NULL AFTER reminder_config;
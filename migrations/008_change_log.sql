@@ -0,0 +1,12 @@
+USE siddhivinayak_pro;
+
+-- Written in the same transaction as the data change, polled by every worker to invalidate in-process caches.
+-- topic is a table name or a cache topic such as 'aarti' or 'occupancy', entity_key narrows it (usually a date).
+CREATE TABLE change_log (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    topic VARCHAR(64) NOT NULL,
+    entity_key VARCHAR(64) NULL,
+    origin VARCHAR(64) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_change_log_created_at (created_at)
+);
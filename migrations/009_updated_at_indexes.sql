@@ -0,0 +1,5 @@
+USE siddhivinayak_pro;
+
+-- Warm-start snapshots replay rows changed since the snapshot's updated_at watermark
+CREATE INDEX idx_passes_updated_at ON passes (updated_at);
+CREATE INDEX idx_aarti_updated_at ON aarti (updated_at);
@@ -0,0 +1,6 @@
+USE siddhivinayak_pro;
+
+-- Audit log queries filter on one of these and page by (created_at, id)
+CREATE INDEX idx_logs_user_created ON logs (user_id, created_at, id);
+CREATE INDEX idx_logs_action_created ON logs (action, created_at, id);
+CREATE INDEX idx_logs_entity_created ON logs (entity_type, entity_id, created_at, id);
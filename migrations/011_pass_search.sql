@@ -0,0 +1,10 @@
+USE siddhivinayak_pro;
+
+-- Help-desk search over visitor name, phone and QR code. The ngram parser indexes every
+-- bigram, so quoted words and trigrams work as substring lookups (see app/utils/search.py).
+-- SQLite builds FTS5 trigram tables for the same columns instead, see
+-- sqlite_backend.ensure_search_indexes.
+-- mysql-only
+ALTER TABLE passes ADD FULLTEXT INDEX ft_passes_search (visitor_name, visitor_phone, qr_code_string) WITH PARSER ngram;
+-- mysql-only
+ALTER TABLE passes_archive ADD FULLTEXT INDEX ft_passes_archive_search (visitor_name, visitor_phone, qr_code_string) WITH PARSER ngram;
@@ -0,0 +1,11 @@
+USE siddhivinayak_pro;
+
+-- Status a pass had before its first open issue, restored when its issues are resolved
+ALTER TABLE issues ADD COLUMN previous_pass_status ENUM('NOT_CONTACTED', 'CONTACTED', 'CONFIRMED', 'REACHED', 'AT_GATE', 'COMPLETED', 'CANCELLED', 'EXPIRED') NULL AFTER status;
+ALTER TABLE issues_archive ADD COLUMN previous_pass_status ENUM('NOT_CONTACTED', 'CONTACTED', 'CONFIRMED', 'REACHED', 'AT_GATE', 'COMPLETED', 'CANCELLED', 'EXPIRED') NULL AFTER status;
+
+-- Open-issue queue, oldest first with (created_at, id) keyset pagination
+CREATE INDEX idx_issues_status_created ON issues (status, created_at, id);
+
+-- Duplicate check for an open issue of the same type on a pass
+CREATE INDEX idx_issues_pass_type_status ON issues (pass_id, issue_type, status);
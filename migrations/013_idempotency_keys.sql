@@ -0,0 +1,18 @@
+USE siddhivinayak_pro;
+
+-- Idempotency-Key claims shared by every worker. A row is claimed before the view runs and holds its
+-- response once it finishes, so a retry landing on another worker is replayed instead of run again.
+CREATE TABLE idempotency_keys (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    endpoint VARCHAR(100) NOT NULL,
+    idempotency_key VARCHAR(255) NOT NULL,
+    fingerprint CHAR(64) NOT NULL,
+    status_code INT NULL,
+    mimetype VARCHAR(100) NULL,
+    response_body MEDIUMBLOB NULL,
+    expires_at DATETIME NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY unique_idempotency_key (user_id, endpoint, idempotency_key),
+    INDEX idx_idempotency_expires_at (expires_at)
+);
@@ -0,0 +1,9 @@
+USE siddhivinayak_pro;
+
+-- One row per date and slot, locked by create_pass while it checks the slot's capacity against committed
+-- passes so that workers can't overbook a slot between them. Rows hold no data, past dates can be deleted.
+CREATE TABLE slot_locks (
+    date DATE NOT NULL,
+    slot_start INT NOT NULL,
+    PRIMARY KEY (date, slot_start)
+);
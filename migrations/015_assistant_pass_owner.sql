@@ -0,0 +1,9 @@
+USE siddhivinayak_pro;
+
+-- Passes created by an assistant were only stamped with the assistant in trustee_id, while history and
+-- search scope assistants by assistant_id. Backfill it for the passes created so far.
+UPDATE passes SET assistant_id = trustee_id
+WHERE assistant_id IS NULL AND trustee_id IN (SELECT id FROM users WHERE role = 'ASSISTANT');
+
+UPDATE passes_archive SET assistant_id = trustee_id
+WHERE assistant_id IS NULL AND trustee_id IN (SELECT id FROM users WHERE role = 'ASSISTANT');
@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+
+# Config reads the environment on import, run against a throwaway SQLite database without background jobs
+os.environ.update({
+    'DB_BACKEND': 'sqlite',
+    'SQLITE_PATH': os.path.join(tempfile.mkdtemp(prefix='siddhivinayak-tests-'), 'test.db'),
+    'JWT_SECRET': 'test-secret',
+    'EXPIRY_SWEEP_ENABLED': 'false',
+    'PHONE_BACKFILL_ENABLED': 'false',
+    'PROFILE_ENABLED': 'false',
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt
+import pytest
+from app.config import Config
+from app.database import get_db_connection
+from app.middleware import idempotency
+from app.utils import aarti_cache, occupancy, response_cache
+
+USERS = {
+    'ADMIN': ('Admin', '9000000001'),
+    'TRUSTEE': ('Trustee', '9000000002'),
+    'SCANNER': ('Scanner', '9000000003'),
+    'ATTENDANT': ('Attendant', '9000000004'),
+    'ASSISTANT': ('Assistant', '9000000005'),
+}
+PASSWORD = 'password'
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The Flask app on a fresh database, with every in-memory index and cache emptied"""
+    monkeypatch.setattr(Config, 'SQLITE_PATH', str(tmp_path / 'test.db'))
+    occupancy.invalidate()
+    aarti_cache.invalidate()
+    response_cache.clear()
+    idempotency.store.clear()
+    
+    import main
+    return main.app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def db(app):
+    conn = get_db_connection()
+    yield conn
+    conn.close()
+
+@pytest.fixture
+def users(db):
+    """user id per role"""
+    cursor = db.cursor()
+    password = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode()
+    ids = {}
+    for role, (name, phone) in USERS.items():
+        cursor.execute(
+            "INSERT INTO users (name, phone, password, role) VALUES (%s, %s, %s, %s)",
+            (name, phone, password, role)
+        )
+        ids[role] = cursor.lastrowid
+    db.commit()
+    cursor.close()
+    return ids
+
+@pytest.fixture
+def auth(client, users):
+    """Authorization headers per role"""
+    headers = {}
+    for role, (_, phone) in USERS.items():
+        response = client.post('/api/login', json={'phone': phone, 'password': PASSWORD})
+        headers[role] = {'Authorization': 'Bearer ' + response.json['token']}
+    return headers
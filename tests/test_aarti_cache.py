@@ -0,0 +1,50 @@
+from datetime import datetime
+from app.config import Config
+from app.utils import aarti_cache
+
+def slot_rows(booked=0, updated_at=None):
+    return [
+        {'id': 1, 'name': 'KAKAD', 'date': '2026-01-01', 'total_capacity': 10, 'booked_capacity': booked,
+         'status': 'OPEN', 'updated_at': updated_at or datetime(2026, 1, 1, 5, 0)},
+        {'id': 2, 'name': 'SHEJ', 'date': '2026-01-01', 'total_capacity': 10, 'booked_capacity': 0,
+         'status': 'OPEN', 'updated_at': updated_at or datetime(2026, 1, 1, 5, 0)},
+    ]
+
+def load(day, rows):
+    version, generation = aarti_cache.lookup(day)
+    assert version is None
+    return aarti_cache.store(day, generation, rows)[0]
+
+def test_workers_holding_the_same_slots_agree_on_the_version(app):
+    first = load('2026-01-01', slot_rows())
+    
+    # Another worker loads the same rows, a later updated_at alone doesn't count as a change
+    aarti_cache.invalidate('2026-01-01')
+    assert load('2026-01-01', slot_rows(updated_at=datetime(2026, 1, 1, 6, 0))) == first
+
+def test_version_follows_the_data(app):
+    before = load('2026-01-01', slot_rows())
+    
+    aarti_cache.apply_booking('2026-01-01', 1, 2)
+    booked, _ = aarti_cache.lookup('2026-01-01')
+    assert booked != before
+    
+    # Same as a worker loading the booked slots from the database
+    aarti_cache.invalidate('2026-01-01')
+    assert load('2026-01-01', slot_rows(booked=2)) == booked
+
+def test_cached_dates_are_capped(app, monkeypatch):
+    monkeypatch.setattr(Config, 'AARTI_CACHE_MAX_DATES', 2)
+    for day in ('2026-01-01', '2026-01-02', '2026-01-03'):
+        load(day, slot_rows())
+    
+    assert aarti_cache.lookup('2026-01-01')[0] is None
+    assert aarti_cache.lookup('2026-01-03')[0] is not None
+
+def test_invalid_date_is_rejected(client, auth):
+    response = client.get('/api/aarti?date=not-a-date', headers=auth['TRUSTEE'])
+    assert response.status_code == 400
+    
+    response = client.get('/api/aarti?date=2026-01-01', headers=auth['TRUSTEE'])
+    assert response.status_code == 200
+    assert client.get(f"/api/aarti?date=2026-01-01&version={response.json['version']}", headers=auth['TRUSTEE']).json['unchanged']
@@ -0,0 +1,90 @@
+import pytest
+from app.controllers import aarti_controller
+
+def schedule(client, auth, **overrides):
+    data = {
+        'start_date': '2030-01-07',
+        'end_date': '2030-01-13',
+        'capacities': {'KAKAD': 100, 'SHEJ': 50}
+    }
+    data.update(overrides)
+    return client.post('/api/aarti/schedule', json=data, headers=auth['ADMIN'])
+
+def aarti_rows(db):
+    cursor = db.cursor()
+    cursor.execute("SELECT name, date, total_capacity, booked_capacity, status FROM aarti ORDER BY date, name")
+    rows = [(row['name'], str(row['date']), row['total_capacity'], row['booked_capacity'], row['status'])
+            for row in cursor.fetchall()]
+    cursor.close()
+    return rows
+
+def test_schedule_expands_template_and_overrides(client, auth, db):
+    response = schedule(client, auth,
+                        weekday_overrides={'sunday': {'KAKAD': 200}},
+                        date_overrides={'2030-01-09': {'SHEJ': 0, 'DHOOP': 30}})
+    assert response.status_code == 200
+    assert response.json['days'] == 7
+    assert response.json['slots'] == 15
+    
+    rows = {(name, day): capacity for name, day, capacity, _, _ in aarti_rows(db)}
+    assert rows[('KAKAD', '2030-01-07')] == 100
+    # 2030-01-13 is a Sunday
+    assert rows[('KAKAD', '2030-01-13')] == 200
+    assert rows[('SHEJ', '2030-01-09')] == 0
+    assert rows[('DHOOP', '2030-01-09')] == 30
+    assert ('DHOOP', '2030-01-08') not in rows
+
+def test_rescheduling_updates_slots_in_place(client, auth, db, monkeypatch):
+    # Several chunks per request
+    monkeypatch.setattr(aarti_controller, 'SCHEDULE_CHUNK_SIZE', 3)
+    assert schedule(client, auth).status_code == 200
+    
+    cursor = db.cursor()
+    cursor.execute("UPDATE aarti SET booked_capacity = 7 WHERE name = 'KAKAD' AND date = '2030-01-08'")
+    db.commit()
+    cursor.close()
+    
+    response = schedule(client, auth, capacities={'KAKAD': 120, 'SHEJ': 60}, status='CLOSED')
+    assert response.status_code == 200
+    
+    rows = aarti_rows(db)
+    assert len(rows) == 14
+    assert len({(name, day) for name, day, _, _, _ in rows}) == 14
+    assert all(status == 'CLOSED' for _, _, _, _, status in rows)
+    assert {capacity for name, _, capacity, _, _ in rows if name == 'KAKAD'} == {120}
+    assert {capacity for name, _, capacity, _, _ in rows if name == 'SHEJ'} == {60}
+    # Bookings already taken are kept
+    assert ('KAKAD', '2030-01-08', 120, 7, 'CLOSED') in rows
+
+@pytest.mark.parametrize('overrides, message', [
+    ({'start_date': '07-01-2030'}, 'YYYY-MM-DD'),
+    ({'end_date': '2030-01-06'}, 'before start_date'),
+    ({'end_date': '2031-12-31'}, 'days can be scheduled'),
+    ({'status': 'FULL'}, 'OPEN or CLOSED'),
+    ({'capacities': [100]}, 'must be an object'),
+    ({'capacities': {'MIDNIGHT': 10}}, 'unknown aarti'),
+    ({'capacities': {'KAKAD': -1}}, 'non-negative integer'),
+    ({'capacities': {'KAKAD': True}}, 'non-negative integer'),
+    ({'capacities': {'KAKAD': '10'}}, 'non-negative integer'),
+    ({'weekday_overrides': {'FUNDAY': {'KAKAD': 1}}}, 'unknown weekday'),
+    ({'date_overrides': {'tomorrow': {'KAKAD': 1}}}, 'not a YYYY-MM-DD date'),
+])
+def test_invalid_schedules_are_rejected(client, auth, db, overrides, message):
+    response = schedule(client, auth, **overrides)
+    assert response.status_code == 400
+    assert message in response.json['error']
+    assert aarti_rows(db) == []
+
+def test_required_fields_and_roles(client, auth, db):
+    response = client.post('/api/aarti/schedule', json={'start_date': '2030-01-07'}, headers=auth['ADMIN'])
+    assert response.status_code == 400
+    assert 'end_date' in response.json['error']
+    
+    response = client.post('/api/aarti/schedule', data='not json', headers=auth['ADMIN'])
+    assert response.status_code == 400
+    
+    assert schedule(client, auth).status_code == 200
+    response = client.post('/api/aarti/schedule', json={
+        'start_date': '2030-01-07', 'end_date': '2030-01-07', 'capacities': {'KAKAD': 1}
+    }, headers=auth['SCANNER'])
+    assert response.status_code == 403
@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta, timezone
+from app.utils.helpers import log_action
+
+def test_activity_accepts_mixed_naive_and_aware_times(client, auth, users, db):
+    log_action(db, users['ADMIN'], 'UPDATE_SETTINGS', 'SETTINGS')
+    start = (datetime.now() - timedelta(minutes=30)).isoformat()
+    end = (datetime.now(timezone.utc) + timedelta(minutes=10)).isoformat()
+    
+    response = client.get('/api/admin/logs/activity', query_string={'from': start, 'to': end}, headers=auth['ADMIN'])
+    
+    assert response.status_code == 200, response.json
+    assert sum(bucket['count'] for bucket in response.json['buckets']) >= 1
+
+def test_aware_times_filter_in_server_time(client, auth, users, db):
+    log_action(db, users['ADMIN'], 'UPDATE_SETTINGS', 'SETTINGS')
+    now = datetime.now(timezone.utc)
+    
+    def logs(**window):
+        window = {key: value.astimezone(timezone(timedelta(hours=5, minutes=30))).isoformat() for key, value in window.items()}
+        response = client.get('/api/admin/logs', query_string=window, headers=auth['ADMIN'])
+        assert response.status_code == 200, response.json
+        return response.json['logs']
+    
+    assert logs(**{'from': now - timedelta(minutes=5), 'to': now + timedelta(minutes=5)})
+    assert logs(**{'from': now + timedelta(minutes=5)}) == []
+
+def test_invalid_time_is_rejected(client, auth):
+    response = client.get('/api/admin/logs/activity', query_string={'to': 'yesterday'}, headers=auth['ADMIN'])
+    assert response.status_code == 400
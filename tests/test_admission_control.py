@@ -0,0 +1,93 @@
+import threading
+import time
+import pytest
+from flask import Blueprint, Flask
+from app.config import Config
+from app.middleware.admission_control import init_admission_control
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()
+
+def make_app(monkeypatch, release, **config):
+    """An app with one blocking gate endpoint, one report endpoint and the exempt health check"""
+    for key, value in config.items():
+        monkeypatch.setattr(Config, key, value)
+    app = Flask(__name__)
+    scanner = Blueprint('scanner', __name__)
+    admin = Blueprint('admin', __name__)
+    
+    @scanner.route('/scan')
+    def scan():
+        release.wait(5)
+        return 'scanned'
+    
+    @admin.route('/report')
+    def report():
+        return 'report'
+    
+    @app.route('/health')
+    def health():
+        return 'ok'
+    
+    app.register_blueprint(scanner)
+    app.register_blueprint(admin)
+    init_admission_control(app)
+    return app
+
+def hold_slot(app):
+    """Start a gate request that keeps its slot until release is set"""
+    responses = []
+    thread = threading.Thread(target=lambda: responses.append(app.test_client().get('/scan')))
+    thread.start()
+    time.sleep(0.2)
+    return thread, responses
+
+def test_saturated_class_is_shed_with_retry_after(monkeypatch, release):
+    app = make_app(monkeypatch, release, ADMISSION_GATE_CONCURRENCY=1, ADMISSION_GATE_QUEUE=0)
+    thread, responses = hold_slot(app)
+    
+    response = app.test_client().get('/scan')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(Config.ADMISSION_RETRY_AFTER_SECONDS)
+    
+    # Other classes and exempt endpoints keep working
+    assert app.test_client().get('/report').status_code == 200
+    assert app.test_client().get('/health').status_code == 200
+    
+    release.set()
+    thread.join()
+    assert responses[0].status_code == 200
+    assert app.test_client().get('/scan').status_code == 200
+
+def test_exempt_endpoints_are_never_shed(monkeypatch, release):
+    app = make_app(monkeypatch, release, ADMISSION_DEFAULT_CONCURRENCY=0, ADMISSION_DEFAULT_QUEUE=0)
+    assert app.test_client().get('/health').status_code == 200
+
+def test_no_thread_waits_without_a_queue_budget(monkeypatch, release):
+    app = make_app(monkeypatch, release, ADMISSION_GATE_CONCURRENCY=1, ADMISSION_GATE_QUEUE=10,
+                   ADMISSION_GATE_TIMEOUT=5, ADMISSION_MAX_QUEUED_THREADS=0)
+    thread, _ = hold_slot(app)
+    
+    start = time.perf_counter()
+    assert app.test_client().get('/scan').status_code == 503
+    assert time.perf_counter() - start < 1
+    
+    release.set()
+    thread.join()
+
+def test_queued_request_is_admitted_within_the_budget(monkeypatch, release):
+    app = make_app(monkeypatch, release, ADMISSION_GATE_CONCURRENCY=1, ADMISSION_GATE_QUEUE=10,
+                   ADMISSION_GATE_TIMEOUT=5, ADMISSION_MAX_QUEUED_THREADS=1)
+    first, _ = hold_slot(app)
+    second, queued = hold_slot(app)
+    
+    # The budget is used up by the queued request
+    assert app.test_client().get('/scan').status_code == 503
+    
+    release.set()
+    first.join()
+    second.join()
+    assert queued[0].status_code == 200
@@ -0,0 +1,112 @@
+import gzip
+import json
+from datetime import date, datetime, timedelta
+from app.config import Config
+from app.utils import archiver
+from app.utils.helpers import log_action
+
+OLD_DAY = date.today() - timedelta(days=Config.PASS_RETENTION_DAYS + 5)
+CUTOFF = date.today() - timedelta(days=Config.PASS_RETENTION_DAYS)
+
+def create_pass(client, auth, day, name='Vijay More'):
+    response = client.post('/api/passes', json={
+        'visitor_name': name,
+        'visitor_phone': '9876543210',
+        'total_people': 2,
+        'darshan_type': 'VIP',
+        'date': day.isoformat(),
+        'time': '10:00'
+    }, headers=auth['TRUSTEE'])
+    assert response.status_code == 201, response.json
+    return response.json['pass_id']
+
+def count(db, table, pass_id):
+    cursor = db.cursor()
+    column = 'id' if table.startswith('passes') else 'pass_id'
+    cursor.execute(f"SELECT COUNT(*) as total FROM {table} WHERE {column} = %s", (pass_id,))
+    total = cursor.fetchone()['total']
+    cursor.close()
+    db.commit()
+    return total
+
+def test_old_passes_move_with_their_scans_and_issues(client, auth, users, db):
+    old_id = create_pass(client, auth, OLD_DAY)
+    live_id = create_pass(client, auth, date.today())
+    cursor = db.cursor()
+    cursor.execute("INSERT INTO scans (pass_id, stage, source) VALUES (%s, 'ARRIVED', 'SCANNER')", (old_id,))
+    cursor.execute("""
+        INSERT INTO issues (pass_id, reported_by_user_id, issue_type, status) VALUES (%s, %s, 'LATE', 'RESOLVED')
+    """, (old_id, users['SCANNER']))
+    db.commit()
+    cursor.close()
+    
+    assert archiver.archive_passes(db, CUTOFF, batch_size=1) == 1
+    
+    for table, expected in (('passes', 0), ('scans', 0), ('issues', 0), ('passes_archive', 1), ('scans_archive', 1), ('issues_archive', 1)):
+        assert count(db, table, old_id) == expected, table
+    assert count(db, 'passes', live_id) == 1
+    assert archiver.archive_passes(db, CUTOFF) == 0
+
+def test_archived_pass_is_served_by_every_read_endpoint(client, auth, users, db):
+    old_id = create_pass(client, auth, OLD_DAY)
+    live_id = create_pass(client, auth, date.today())
+    cursor = db.cursor()
+    cursor.execute("INSERT INTO scans (pass_id, stage, source) VALUES (%s, 'COMPLETED', 'SCANNER')", (old_id,))
+    db.commit()
+    cursor.close()
+    archiver.archive_passes(db, CUTOFF)
+    
+    details = client.get(f'/api/passes/{old_id}', headers=auth['TRUSTEE'])
+    assert details.status_code == 200
+    assert details.json['archived'] is True
+    assert details.json['pass']['visitor_name'] == 'Vijay More'
+    assert [scan['stage'] for scan in details.json['timeline']] == ['COMPLETED']
+    
+    batch = client.post('/api/passes/batch', json={'pass_ids': [live_id, old_id]}, headers=auth['TRUSTEE'])
+    assert [(row['pass']['id'], row['archived']) for row in batch.json['passes']] == [(live_id, False), (old_id, True)]
+    assert [scan['stage'] for scan in batch.json['passes'][1]['timeline']] == ['COMPLETED']
+    
+    history = client.get('/api/visitors/9876543210/passes', headers=auth['TRUSTEE'])
+    assert [(row['id'], row['archived']) for row in history.json['passes']] == [(live_id, False), (old_id, True)]
+
+def set_created_at(db, log_id, created_at):
+    cursor = db.cursor()
+    cursor.execute("UPDATE logs SET created_at = %s WHERE id = %s", (created_at, log_id))
+    db.commit()
+    cursor.close()
+
+def latest_log_id(db):
+    cursor = db.cursor()
+    cursor.execute("SELECT MAX(id) as id FROM logs")
+    log_id = cursor.fetchone()['id']
+    cursor.close()
+    db.commit()
+    return log_id
+
+def test_old_logs_are_exported_then_deleted(users, db, tmp_path):
+    cutoff = datetime.now() - timedelta(days=Config.LOG_RETENTION_DAYS)
+    for i in range(3):
+        log_action(db, users['ADMIN'], 'UPDATE_SETTINGS', 'SETTINGS', None, {'run': i})
+        set_created_at(db, latest_log_id(db), cutoff - timedelta(days=1, minutes=i))
+    log_action(db, users['ADMIN'], 'UPDATE_SETTINGS', 'SETTINGS', None, {'run': 'recent'})
+    
+    exported, path = archiver.export_logs(db, cutoff, archive_dir=str(tmp_path / 'logs'), batch_size=2)
+    
+    assert exported == 3
+    assert path.endswith('.ndjson.gz')
+    with gzip.open(path, 'rt', encoding='utf-8') as archive:
+        rows = [json.loads(line) for line in archive]
+    assert [row['payload'] for row in rows] == [{'run': 0}, {'run': 1}, {'run': 2}]
+    assert [file.name for file in (tmp_path / 'logs').iterdir()] == [path.rsplit('/', 1)[1]]
+    
+    cursor = db.cursor()
+    cursor.execute("SELECT payload FROM logs")
+    remaining = [json.loads(row['payload']) for row in cursor.fetchall()]
+    cursor.close()
+    assert remaining == [{'run': 'recent'}]
+
+def test_nothing_to_export_writes_no_file(users, db, tmp_path):
+    log_action(db, users['ADMIN'], 'UPDATE_SETTINGS', 'SETTINGS')
+    
+    assert archiver.export_logs(db, datetime.now() - timedelta(days=1), archive_dir=str(tmp_path / 'logs')) == (0, None)
+    assert list((tmp_path / 'logs').iterdir()) == []
@@ -0,0 +1,185 @@
+import asyncio
+from datetime import date
+import pytest
+
+pytest.importorskip('starlette')
+pytest.importorskip('httpx')
+
+from starlette.testclient import TestClient
+from app import async_views
+from app.backends import async_db, mysql_backend
+from app.config import Config
+from app.utils.metrics import render_prometheus
+
+TODAY = date.today().isoformat()
+
+@pytest.fixture
+def async_client(app, monkeypatch):
+    monkeypatch.setattr(async_views, '_traffic_classes', None)
+    with TestClient(async_views.create_asgi_app(app)) as client:
+        yield client
+
+@pytest.fixture
+def passes(client, auth):
+    """QR codes of two passes for today, plus an aarti slot"""
+    qr_codes = []
+    for name, time in (('Ganesh Pawar', '10:00'), ('Meera Shah', '11:30')):
+        response = client.post('/api/passes', json={
+            'visitor_name': name,
+            'visitor_phone': '9876543210',
+            'total_people': 2,
+            'darshan_type': 'VIP',
+            'date': TODAY,
+            'time': time
+        }, headers=auth['TRUSTEE'])
+        qr_codes.append(response.json['qr_code'])
+    client.post('/api/aarti/update-capacity', json={'name': 'KAKAD', 'date': TODAY, 'total_capacity': 10}, headers=auth['ADMIN'])
+    return qr_codes
+
+def assert_same(sync_response, async_response):
+    assert async_response.status_code == sync_response.status_code
+    assert async_response.json() == sync_response.json
+
+@pytest.mark.parametrize('path, role', [
+    ('/api/passes/today', 'ADMIN'),
+    ('/api/passes/today', 'TRUSTEE'),
+    ('/api/passes/today', 'ATTENDANT'),
+    ('/api/attendant/assigned', 'ATTENDANT'),
+    ('/api/attendant/assigned', 'TRUSTEE'),
+    ('/api/aarti', 'TRUSTEE'),
+    (f'/api/aarti?date={TODAY}', 'ADMIN'),
+    ('/api/aarti?date=tomorrow', 'ADMIN'),
+])
+def test_reads_match_the_sync_views(client, async_client, auth, passes, path, role):
+    assert_same(client.get(path, headers=auth[role]), async_client.get(path, headers=auth[role]))
+
+def test_aarti_version_matches_the_sync_view(client, async_client, auth, passes):
+    version = client.get('/api/aarti', headers=auth['TRUSTEE']).json['version']
+    path = f'/api/aarti?version={version}'
+    assert_same(client.get(path, headers=auth['TRUSTEE']), async_client.get(path, headers=auth['TRUSTEE']))
+
+def test_unauthenticated_requests_match_the_sync_views(client, async_client, passes):
+    assert_same(client.get('/api/passes/today'), async_client.get('/api/passes/today'))
+
+@pytest.mark.parametrize('body', [
+    'valid',
+    {'qr_code_string': 'SV-UNKNOWN'},
+    {},
+])
+def test_scan_matches_the_sync_view(client, async_client, auth, passes, body):
+    if body == 'valid':
+        body = {'qr_code_string': passes[0]}
+    assert_same(
+        client.post('/api/scanner/scan-qr', json=body, headers=auth['SCANNER']),
+        async_client.post('/api/scanner/scan-qr', json=body, headers=auth['SCANNER'])
+    )
+
+def test_requests_are_recorded_in_metrics(async_client, auth, passes):
+    async_client.post('/api/scanner/scan-qr', json={'qr_code_string': passes[0]}, headers=auth['SCANNER'])
+    
+    metrics = render_prometheus()
+    assert 'sv_http_request_duration_seconds_count{blueprint="scanner",endpoint="scanner.scan_qr",method="POST",status="200"}' in metrics
+
+def test_gate_requests_are_shed_when_saturated(app, auth, passes, monkeypatch):
+    monkeypatch.setattr(async_views, '_traffic_classes', None)
+    monkeypatch.setattr(Config, 'ADMISSION_CONTROL_ENABLED', True)
+    monkeypatch.setattr(Config, 'ADMISSION_GATE_CONCURRENCY', 0)
+    monkeypatch.setattr(Config, 'ADMISSION_GATE_QUEUE', 0)
+    
+    with TestClient(async_views.create_asgi_app(app)) as async_client:
+        response = async_client.post('/api/scanner/scan-qr', json={'qr_code_string': passes[0]}, headers=auth['SCANNER'])
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == str(Config.ADMISSION_RETRY_AFTER_SECONDS)
+        
+        # Other classes keep their own budget
+        assert async_client.get('/api/aarti', headers=auth['TRUSTEE']).status_code == 200
+
+def test_read_your_writes_header_reads_from_the_primary(app, auth, passes, monkeypatch):
+    monkeypatch.setattr(async_views, '_traffic_classes', None)
+    readonly_flags = []
+    fetch_sync = async_db._fetch_sync
+    
+    def record(query, args, readonly, one):
+        readonly_flags.append(readonly)
+        return fetch_sync(query, args, readonly, one)
+    
+    monkeypatch.setattr(async_db, '_fetch_sync', record)
+    with TestClient(async_views.create_asgi_app(app)) as async_client:
+        async_client.get('/api/attendant/assigned', headers=auth['ATTENDANT'])
+        async_client.get('/api/attendant/assigned', headers={**auth['ATTENDANT'], 'X-Read-Your-Writes': '1'})
+    
+    assert readonly_flags == [True, False]
+
+class FakeCursor:
+    def __init__(self, pool):
+        self.pool = pool
+        self.rowcount = 0
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+    
+    async def execute(self, query, args):
+        self.pool.queries.append(query)
+        if self.pool.down:
+            raise mysql_backend.OperationalError(2013, 'Lost connection to MySQL server during query')
+        self.rowcount = 1
+    
+    async def fetchall(self):
+        return [{'host': self.pool.host}]
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+    
+    def cursor(self):
+        return FakeCursor(self.pool)
+
+class FakePool:
+    def __init__(self, host):
+        self.host = host
+        self.down = False
+        self.closed = False
+        self.queries = []
+    
+    def acquire(self):
+        return FakeConnection(self)
+    
+    def close(self):
+        self.closed = True
+
+def test_replica_outage_falls_back_to_the_primary(monkeypatch):
+    pools = {}
+    
+    async def create_pool(host, user, password, port, **kwargs):
+        pools[host] = FakePool(host)
+        return pools[host]
+    
+    monkeypatch.setattr(Config, 'DB_BACKEND', 'mysql')
+    monkeypatch.setattr(Config, 'DB_HOST', 'primary')
+    monkeypatch.setattr(Config, 'DB_READ_HOST', 'replica')
+    monkeypatch.setattr(async_db, '_create_pool', create_pool)
+    monkeypatch.setattr(async_db, '_pools', {})
+    monkeypatch.setattr(async_db, '_pool_lock', None)
+    monkeypatch.setattr(async_db, '_replica_down_until', 0.0)
+    
+    async def reads():
+        hosts = [(await async_db.fetchall('SELECT 1'))[0]['host']]
+        # The replica goes away after its pool was created
+        pools['replica'].down = True
+        hosts.append((await async_db.fetchall('SELECT 1'))[0]['host'])
+        hosts.append((await async_db.fetchall('SELECT 1'))[0]['host'])
+        return hosts
+    
+    assert asyncio.run(reads()) == ['replica', 'primary', 'primary']
+    assert pools['replica'].closed
+    # Marked down, the next read didn't try the replica first
+    assert len(pools['replica'].queries) == 2
@@ -0,0 +1,125 @@
+from datetime import date, timedelta
+import pytest
+from app import database
+from app.utils import coherence, occupancy, response_cache
+
+DAY = date.today() + timedelta(days=1)
+
+@pytest.fixture
+def poller(app, monkeypatch):
+    """A fresh poller whose changes are collected instead of reaching the caches"""
+    received = []
+    monkeypatch.setattr(coherence, '_last_id', None)
+    monkeypatch.setattr(coherence, '_gaps', {})
+    monkeypatch.setattr(coherence, '_change_listeners', [received.append])
+    return received
+
+def insert_changes(db, rows):
+    """(id or None, topic, entity_key, origin) rows, committed the way another worker would"""
+    cursor = db.cursor()
+    for change_id, topic, key, origin in rows:
+        if change_id is None:
+            cursor.execute("INSERT INTO change_log (topic, entity_key, origin) VALUES (%s, %s, %s)", (topic, key, origin))
+        else:
+            cursor.execute("""
+                INSERT INTO change_log (id, topic, entity_key, origin) VALUES (%s, %s, %s, %s)
+            """, (change_id, topic, key, origin))
+    db.raw.commit()
+    cursor.close()
+
+def last_change_id(db):
+    cursor = db.cursor()
+    cursor.execute("SELECT COALESCE(MAX(id), 0) as last_id FROM change_log")
+    last_id = cursor.fetchone()['last_id']
+    cursor.close()
+    return last_id
+
+def test_commit_writes_tables_and_marked_topics_to_change_log(client, auth, db, monkeypatch):
+    monkeypatch.setattr(database, '_pre_commit_hooks', [coherence.record_changes])
+    
+    response = client.post('/api/passes', json={
+        'visitor_name': 'Swati Kadam',
+        'visitor_phone': '9876543210',
+        'total_people': 2,
+        'darshan_type': 'VIP',
+        'date': DAY.isoformat(),
+        'time': '10:00'
+    }, headers=auth['TRUSTEE'])
+    assert response.status_code == 201
+    
+    cursor = db.cursor()
+    cursor.execute("SELECT topic, entity_key, origin FROM change_log")
+    rows = {(row['topic'], row['entity_key'], row['origin']) for row in cursor.fetchall()}
+    cursor.close()
+    assert ('passes', None, coherence.ORIGIN) in rows
+    assert ('occupancy', DAY.isoformat(), coherence.ORIGIN) in rows
+    # Not recorded twice, nor the write-only tables
+    assert not any(topic in coherence.IGNORED_TABLES for topic, _, _ in rows)
+
+def test_other_workers_changes_are_applied_once(poller, db):
+    assert coherence.poll_changes(db) == 0
+    insert_changes(db, [
+        (None, 'occupancy', '2030-01-01', 'other:1'),
+        (None, 'occupancy', '2030-01-02', 'other:1'),
+        (None, 'aarti', None, 'other:2'),
+        (None, 'passes', None, coherence.ORIGIN),
+    ])
+    
+    assert coherence.poll_changes(db) == 2
+    assert poller == [{'occupancy': {'2030-01-01', '2030-01-02'}, 'aarti': None}]
+    assert coherence.poll_changes(db) == 0
+    assert len(poller) == 1
+
+def test_burst_larger_than_a_batch_is_not_dropped(poller, db, monkeypatch):
+    monkeypatch.setattr(coherence, 'POLL_BATCH_SIZE', 100)
+    coherence.poll_changes(db)
+    insert_changes(db, [(None, 'occupancy', f'key-{i}', 'other:1') for i in range(750)])
+    
+    while coherence.poll_changes(db):
+        pass
+    keys = set().union(*(changes['occupancy'] for changes in poller))
+    assert len(keys) == 750
+    assert not coherence._gaps
+
+def test_late_commit_below_the_high_water_mark_is_applied(poller, db):
+    coherence.poll_changes(db)
+    last_id = last_change_id(db)
+    insert_changes(db, [(last_id + 2, 'occupancy', 'fast', 'other:1')])
+    
+    coherence.poll_changes(db)
+    assert set(coherence._gaps) == {last_id + 1}
+    
+    insert_changes(db, [(last_id + 1, 'occupancy', 'slow', 'other:2')])
+    coherence.poll_changes(db)
+    assert poller == [{'occupancy': {'fast'}}, {'occupancy': {'slow'}}]
+    assert not coherence._gaps
+
+def test_gap_that_never_fills_drops_every_cache(poller, db, monkeypatch):
+    coherence.poll_changes(db)
+    last_id = last_change_id(db)
+    insert_changes(db, [(last_id + 2, 'occupancy', 'fast', 'other:1')])
+    coherence.poll_changes(db)
+    
+    monkeypatch.setattr(coherence, 'GAP_TIMEOUT_SECONDS', -1)
+    assert coherence.poll_changes(db) is None
+    assert poller[-1] is None
+    assert not coherence._gaps
+
+def test_too_many_gaps_drops_every_cache(poller, db, monkeypatch):
+    monkeypatch.setattr(coherence, 'MAX_GAPS', 5)
+    coherence.poll_changes(db)
+    last_id = last_change_id(db)
+    insert_changes(db, [(last_id + 10, 'occupancy', 'far', 'other:1')])
+    
+    assert coherence.poll_changes(db) is None
+    assert poller == [None]
+    assert coherence._last_id == last_id + 10
+
+def test_full_invalidate_reaches_the_caches(client, auth, db):
+    response_cache.store('key', response_cache._versions(['passes']), b'{}\n')
+    occupancy._ensure_seeded(db)
+    assert occupancy._occupancy is not None
+    
+    coherence.apply_changes(None)
+    assert occupancy._occupancy is None
+    assert response_cache.lookup('key', ['passes'])[0] is None
@@ -0,0 +1,90 @@
+import gzip
+import json
+import pytest
+from flask import Flask, Response, jsonify
+from app.config import Config
+from app.middleware.compression_middleware import init_compression
+from app.utils import compression
+from app.utils.compression import choose_encoding
+
+ROWS = [{'id': i, 'visitor_name': f'Visitor {i}', 'status': 'NOT_CONTACTED'} for i in range(200)]
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    
+    @app.route('/large')
+    def large():
+        return jsonify(ROWS)
+    
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+    
+    @app.route('/precompressed')
+    def precompressed():
+        response = Response(gzip.compress(json.dumps(ROWS).encode()), mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
+    
+    @app.route('/image')
+    def image():
+        return Response(b'\x89PNG' + bytes(4096), mimetype='image/png')
+    
+    init_compression(app)
+    return app.test_client()
+
+@pytest.mark.parametrize('accept_encoding, expected', [
+    ('gzip, deflate', 'gzip'),
+    ('deflate', None),
+    ('', None),
+    (None, None),
+    ('gzip;q=0', None),
+    ('identity, *;q=0.5', 'best'),
+])
+def test_choose_encoding(accept_encoding, expected):
+    if expected == 'best':
+        expected = 'br' if compression.brotli is not None else 'gzip'
+    assert choose_encoding(accept_encoding) == expected
+
+def test_brotli_is_preferred_on_ties_and_q_values_win():
+    pytest.importorskip('brotli')
+    assert choose_encoding('gzip, br') == 'br'
+    assert choose_encoding('br;q=0.5, gzip;q=0.8') == 'gzip'
+
+def test_large_response_is_gzipped(client):
+    response = client.get('/large', headers={'Accept-Encoding': 'gzip'})
+    
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.data)) == ROWS
+
+def test_large_response_is_brotli_compressed(client):
+    brotli = pytest.importorskip('brotli')
+    response = client.get('/large', headers={'Accept-Encoding': 'gzip, br'})
+    
+    assert response.headers['Content-Encoding'] == 'br'
+    assert json.loads(brotli.decompress(response.data)) == ROWS
+
+def test_identity_when_no_encoding_is_accepted(client):
+    response = client.get('/large')
+    
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.json == ROWS
+
+def test_small_response_is_not_compressed(client):
+    response = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+    
+    assert len(json.dumps({'ok': True})) < Config.COMPRESSION_MIN_BYTES
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+def test_compressed_responses_are_left_alone(client):
+    response = client.get('/precompressed', headers={'Accept-Encoding': 'br, gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.data)) == ROWS
+    
+    response = client.get('/image', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.data.startswith(b'\x89PNG')
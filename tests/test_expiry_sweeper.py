@@ -0,0 +1,96 @@
+import json
+from datetime import datetime
+import pytest
+from app.utils import expiry_sweeper
+
+NOW = datetime(2030, 1, 1, 12, 0)
+
+@pytest.fixture
+def passes(users, db):
+    """pass id per label, spread around NOW"""
+    cursor = db.cursor()
+    ids = {}
+    for label, day, time, grace, status in (
+        ('overdue', '2030-01-01', '10:00', 30, 'NOT_CONTACTED'),
+        ('overdue_yesterday', '2029-12-31', '23:00', 30, 'CONFIRMED'),
+        ('within_grace', '2030-01-01', '11:45', 30, 'CONTACTED'),
+        ('completed', '2030-01-01', '09:00', 30, 'COMPLETED'),
+        ('tomorrow', '2030-01-02', '06:00', 30, 'NOT_CONTACTED'),
+    ):
+        cursor.execute("""
+            INSERT INTO passes (trustee_id, visitor_name, visitor_phone, total_people, darshan_type, date, time,
+                                grace_minutes, assigned_attendant_id, qr_code_string, status)
+            VALUES (%s, 'Ramesh Pawar', '9876543210', 3, 'VIP', %s, %s, %s, %s, %s, %s)
+        """, (users['TRUSTEE'], day, time, grace, users['ATTENDANT'], f'QR-{label}', status))
+        ids[label] = cursor.lastrowid
+    db.commit()
+    cursor.close()
+    return ids
+
+def statuses(db):
+    cursor = db.cursor()
+    cursor.execute("SELECT id, status FROM passes")
+    rows = {row['id']: row['status'] for row in cursor.fetchall()}
+    cursor.close()
+    db.commit()
+    return rows
+
+def fetch(db, query):
+    cursor = db.cursor()
+    cursor.execute(query)
+    rows = cursor.fetchall()
+    cursor.close()
+    db.commit()
+    return rows
+
+def test_expired_mode_marks_only_overdue_pending_passes(passes, db, monkeypatch):
+    notified = []
+    monkeypatch.setattr(expiry_sweeper, '_expiry_listeners', [lambda rows, status: notified.append((rows, status))])
+    
+    expired = expiry_sweeper.sweep_expired_passes(db, now=NOW, mode='EXPIRED')
+    
+    assert sorted(row['id'] for row in expired) == sorted([passes['overdue'], passes['overdue_yesterday']])
+    assert statuses(db) == {
+        passes['overdue']: 'EXPIRED',
+        passes['overdue_yesterday']: 'EXPIRED',
+        passes['within_grace']: 'CONTACTED',
+        passes['completed']: 'COMPLETED',
+        passes['tomorrow']: 'NOT_CONTACTED',
+    }
+    assert fetch(db, "SELECT COUNT(*) as total FROM issues")[0]['total'] == 0
+    assert [status for _, status in notified] == ['EXPIRED']
+    
+    log = fetch(db, "SELECT user_id, action, payload FROM logs WHERE action = 'EXPIRE_PASSES'")
+    assert len(log) == 1 and log[0]['user_id'] is None
+    assert json.loads(log[0]['payload'])['count'] == 2
+    
+    # Nothing left to do
+    assert expiry_sweeper.sweep_expired_passes(db, now=NOW, mode='EXPIRED') == []
+    assert len(notified) == 1
+
+def test_no_show_mode_opens_an_issue_per_pass(passes, db):
+    expired = expiry_sweeper.sweep_expired_passes(db, now=NOW, mode='NO_SHOW')
+    
+    assert len(expired) == 2
+    current = statuses(db)
+    assert current[passes['overdue']] == current[passes['overdue_yesterday']] == 'ISSUE'
+    assert current[passes['within_grace']] == 'CONTACTED'
+    
+    issues = fetch(db, """
+        SELECT pass_id, reported_by_user_id, issue_type, status, previous_pass_status FROM issues ORDER BY pass_id
+    """)
+    assert [dict(issue) for issue in issues] == [
+        {'pass_id': passes['overdue'], 'reported_by_user_id': None, 'issue_type': 'NO_SHOW', 'status': 'OPEN',
+         'previous_pass_status': 'NOT_CONTACTED'},
+        {'pass_id': passes['overdue_yesterday'], 'reported_by_user_id': None, 'issue_type': 'NO_SHOW', 'status': 'OPEN',
+         'previous_pass_status': 'CONFIRMED'},
+    ]
+
+def test_grace_is_per_pass(passes, db):
+    cursor = db.cursor()
+    cursor.execute("UPDATE passes SET grace_minutes = 180 WHERE id = %s", (passes['overdue'],))
+    db.commit()
+    cursor.close()
+    
+    expired = expiry_sweeper.sweep_expired_passes(db, now=NOW, mode='EXPIRED')
+    assert [row['id'] for row in expired] == [passes['overdue_yesterday']]
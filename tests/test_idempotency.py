@@ -0,0 +1,115 @@
+import hashlib
+import json
+from datetime import date, datetime, timedelta
+from app.controllers import pass_controller
+from app.middleware import idempotency
+
+def pass_body(name='Sunita Joshi'):
+    return {
+        'visitor_name': name,
+        'visitor_phone': '9876543210',
+        'total_people': 2,
+        'darshan_type': 'VIP',
+        'date': (date.today() + timedelta(days=1)).isoformat(),
+        'time': '10:00'
+    }
+
+def count_passes(db):
+    cursor = db.cursor()
+    cursor.execute("SELECT COUNT(*) as total FROM passes")
+    total = cursor.fetchone()['total']
+    cursor.close()
+    db.commit()
+    return total
+
+def test_retry_is_replayed(client, auth, db):
+    headers = {**auth['TRUSTEE'], 'Idempotency-Key': 'retry-1'}
+    
+    first = client.post('/api/passes', json=pass_body(), headers=headers)
+    second = client.post('/api/passes', json=pass_body(), headers=headers)
+    
+    assert first.status_code == second.status_code == 201
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert second.json == first.json
+    assert count_passes(db) == 1
+
+def test_retry_on_another_worker_is_replayed(client, auth, db):
+    headers = {**auth['TRUSTEE'], 'Idempotency-Key': 'retry-2'}
+    first = client.post('/api/passes', json=pass_body(), headers=headers)
+    
+    # Another worker starts with an empty LRU
+    idempotency.store.clear()
+    second = client.post('/api/passes', json=pass_body(), headers=headers)
+    
+    assert second.status_code == 201
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert second.json == first.json
+    assert count_passes(db) == 1
+
+def test_key_reused_with_another_body_on_another_worker(client, auth, db):
+    headers = {**auth['TRUSTEE'], 'Idempotency-Key': 'retry-3'}
+    client.post('/api/passes', json=pass_body(), headers=headers)
+    
+    idempotency.store.clear()
+    response = client.post('/api/passes', json=pass_body('Someone Else'), headers=headers)
+    
+    assert response.status_code == 422
+    assert count_passes(db) == 1
+
+def test_claim_in_progress_on_another_worker(client, auth, users, db):
+    body = json.dumps(pass_body())
+    fingerprint = hashlib.sha256(body.encode()).hexdigest()
+    cursor = db.cursor()
+    cursor.execute("""
+        INSERT INTO idempotency_keys (user_id, endpoint, idempotency_key, fingerprint, expires_at)
+        VALUES (%s, %s, %s, %s, %s)
+    """, (users['TRUSTEE'], 'pass.create_pass', 'retry-4', fingerprint, datetime.now() + timedelta(minutes=5)))
+    db.commit()
+    cursor.close()
+    
+    response = client.post('/api/passes', data=body, content_type='application/json',
+                           headers={**auth['TRUSTEE'], 'Idempotency-Key': 'retry-4'})
+    
+    assert response.status_code == 409
+    assert count_passes(db) == 0
+
+def test_expired_claim_is_taken_over(client, auth, users, db):
+    cursor = db.cursor()
+    cursor.execute("""
+        INSERT INTO idempotency_keys (user_id, endpoint, idempotency_key, fingerprint, expires_at)
+        VALUES (%s, %s, %s, %s, %s)
+    """, (users['TRUSTEE'], 'pass.create_pass', 'retry-5', 'stale', datetime.now() - timedelta(minutes=1)))
+    db.commit()
+    cursor.close()
+    
+    response = client.post('/api/passes', json=pass_body(), headers={**auth['TRUSTEE'], 'Idempotency-Key': 'retry-5'})
+    
+    assert response.status_code == 201
+    assert count_passes(db) == 1
+
+def test_client_error_is_replayed_on_another_worker(client, auth, db):
+    body = {**pass_body(), 'time': 'soon'}
+    
+    response = client.post('/api/passes', json=body, headers={**auth['TRUSTEE'], 'Idempotency-Key': 'retry-6'})
+    assert response.status_code == 400
+    
+    # Client errors are saved like any other response
+    idempotency.store.clear()
+    response = client.post('/api/passes', json=body, headers={**auth['TRUSTEE'], 'Idempotency-Key': 'retry-6'})
+    assert response.headers['Idempotent-Replayed'] == 'true'
+
+def test_server_error_releases_its_claim(client, auth, db, monkeypatch):
+    generate_qr_string = pass_controller.generate_qr_string
+    def broken_qr_string():
+        raise RuntimeError('QR service down')
+    monkeypatch.setattr(pass_controller, 'generate_qr_string', broken_qr_string)
+    headers = {**auth['TRUSTEE'], 'Idempotency-Key': 'retry-7'}
+    
+    assert client.post('/api/passes', json=pass_body(), headers=headers).status_code == 500
+    
+    monkeypatch.setattr(pass_controller, 'generate_qr_string', generate_qr_string)
+    idempotency.store.clear()
+    response = client.post('/api/passes', json=pass_body(), headers=headers)
+    assert response.status_code == 201
+    assert 'Idempotent-Replayed' not in response.headers
+    assert count_passes(db) == 1
@@ -0,0 +1,38 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from benchmarks.import_time import LAZY_MODULES
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', 500))
+_MAIN_CUMULATIVE = re.compile(r'^import time:\s+\d+ \|\s+(\d+) \| main$', re.MULTILINE)
+
+PROBE = """
+import json, sys
+import main
+print(json.dumps(sorted({name.split('.')[0] for name in sys.modules})))
+"""
+
+def import_main(tmp_path):
+    """(cumulative microseconds of `import main` under -X importtime, top-level modules loaded)"""
+    env = dict(os.environ, SQLITE_PATH=str(tmp_path / 'import.db'), PRELOAD_RENDERERS='false')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return int(_MAIN_CUMULATIVE.search(result.stderr).group(1)), json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_import_main_is_within_budget(tmp_path):
+    # Best of three, the first run also pays for cold disk caches
+    best_ms = min(import_main(tmp_path)[0] for _ in range(3)) / 1000
+    assert best_ms <= BUDGET_MS, f'import main took {best_ms:.0f} ms, budget {BUDGET_MS:.0f} ms'
+
+def test_renderers_are_not_imported_eagerly(tmp_path):
+    _, loaded = import_main(tmp_path)
+    assert not set(LAZY_MODULES) & set(loaded)
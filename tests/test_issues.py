@@ -0,0 +1,81 @@
+from datetime import date, datetime, timedelta
+from app.utils.expiry_sweeper import sweep_expired_passes
+
+def create_pass(client, auth, day, time='10:00'):
+    response = client.post('/api/passes', json={
+        'visitor_name': 'Ramesh Patil',
+        'visitor_phone': '9876543210',
+        'total_people': 2,
+        'darshan_type': 'VIP',
+        'date': day.isoformat(),
+        'time': time
+    }, headers=auth['TRUSTEE'])
+    assert response.status_code == 201, response.json
+    return response.json['pass_id']
+
+def pass_status(db, pass_id):
+    cursor = db.cursor()
+    cursor.execute("SELECT status FROM passes WHERE id = %s", (pass_id,))
+    status = cursor.fetchone()['status']
+    cursor.close()
+    db.commit()
+    return status
+
+def open_issues(db, pass_id):
+    cursor = db.cursor()
+    cursor.execute("SELECT id FROM issues WHERE pass_id = %s AND status = 'OPEN'", (pass_id,))
+    ids = [row['id'] for row in cursor.fetchall()]
+    cursor.close()
+    db.commit()
+    return ids
+
+def test_resolving_an_overdue_no_show_expires_the_pass(client, auth, db):
+    pass_id = create_pass(client, auth, date.today() - timedelta(days=1))
+    
+    swept = sweep_expired_passes(db, mode='NO_SHOW')
+    assert [row['id'] for row in swept] == [pass_id]
+    issue_ids = open_issues(db, pass_id)
+    assert len(issue_ids) == 1
+    
+    response = client.post('/api/scanner/issues/resolve', json={'issue_ids': issue_ids}, headers=auth['SCANNER'])
+    assert response.status_code == 200
+    assert response.json['restored_passes'] == [{'pass_id': pass_id, 'status': 'EXPIRED'}]
+    
+    # The next sweep must not reopen what was just resolved
+    assert sweep_expired_passes(db, mode='NO_SHOW') == []
+    assert open_issues(db, pass_id) == []
+    assert pass_status(db, pass_id) == 'EXPIRED'
+
+def test_explicit_pending_status_on_an_overdue_pass_expires_it(client, auth, db):
+    pass_id = create_pass(client, auth, date.today() - timedelta(days=1))
+    sweep_expired_passes(db, mode='NO_SHOW')
+    
+    response = client.post('/api/scanner/issues/resolve', json={
+        'issue_ids': open_issues(db, pass_id),
+        'pass_status': 'CONFIRMED'
+    }, headers=auth['SCANNER'])
+    assert response.json['restored_passes'] == [{'pass_id': pass_id, 'status': 'EXPIRED'}]
+    assert sweep_expired_passes(db, mode='NO_SHOW') == []
+
+def test_resolving_an_upcoming_pass_restores_its_previous_status(client, auth, db):
+    pass_id = create_pass(client, auth, date.today() + timedelta(days=1))
+    
+    response = client.post('/api/scanner/issue', json={'pass_id': pass_id, 'issue_type': 'LATE'}, headers=auth['SCANNER'])
+    assert response.status_code == 201
+    assert pass_status(db, pass_id) == 'ISSUE'
+    
+    response = client.post('/api/scanner/issues/resolve', json={'issue_ids': open_issues(db, pass_id)}, headers=auth['SCANNER'])
+    assert response.json['restored_passes'] == [{'pass_id': pass_id, 'status': 'NOT_CONTACTED'}]
+    
+    assert sweep_expired_passes(db, now=datetime.now(), mode='NO_SHOW') == []
+    assert pass_status(db, pass_id) == 'NOT_CONTACTED'
+
+def test_duplicate_report_is_suppressed(client, auth, db):
+    pass_id = create_pass(client, auth, date.today() + timedelta(days=1))
+    
+    first = client.post('/api/scanner/issue', json={'pass_id': pass_id, 'issue_type': 'LATE'}, headers=auth['SCANNER'])
+    second = client.post('/api/scanner/issue', json={'pass_id': pass_id, 'issue_type': 'LATE'}, headers=auth['SCANNER'])
+    
+    assert first.status_code == 201
+    assert second.status_code == 200 and second.json['duplicate']
+    assert len(open_issues(db, pass_id)) == 1
@@ -0,0 +1,22 @@
+import pytest
+from app.config import Config
+
+def test_cursor_is_a_context_manager(db):
+    with db.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) as total FROM users")
+        assert cursor.fetchone()['total'] == 0
+    
+    with pytest.raises(Exception):
+        cursor.execute("SELECT 1")
+
+def test_metrics_are_open_without_a_token(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert b'sv_http_request_duration_seconds' in response.data
+
+def test_metrics_token_is_required_when_set(client, monkeypatch):
+    monkeypatch.setattr(Config, 'METRICS_TOKEN', 'scrape-secret')
+    
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
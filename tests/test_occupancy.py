@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+from app.utils import occupancy
+
+DAY = (date.today() + timedelta(days=1)).isoformat()
+UNLIMITED = {'default': None, 'slots': {}}
+
+def booked(time='09:00'):
+    return occupancy.find_open_slots(DAY, time, 1, UNLIMITED, limit=1)[0]['booked']
+
+def commit_pass(db, users, people, time='09:00'):
+    cursor = db.cursor()
+    cursor.execute("""
+        INSERT INTO passes (trustee_id, visitor_name, visitor_phone, total_people, darshan_type, date, time,
+                            grace_minutes, assigned_attendant_id, qr_code_string, status)
+        VALUES (%s, 'Visitor', '9000000000', %s, 'VIP', %s, %s, 30, %s, %s, 'NOT_CONTACTED')
+    """, (users['TRUSTEE'], people, DAY, time, users['ATTENDANT'], f'QR-{people}-{time}'))
+    db.commit()
+    cursor.close()
+
+def test_refresh_keeps_pending_reservations(db, users):
+    assert occupancy.reserve(DAY, '09:00', 4, UNLIMITED, db)[0]
+    
+    # Another worker commits a pass for the same date
+    commit_pass(db, users, 2)
+    occupancy.refresh(DAY)
+    assert booked() == 6
+    
+    # Once committed the reservation is counted from the database, not twice
+    commit_pass(db, users, 4, '09:05')
+    occupancy.confirm(DAY, '09:00', 4)
+    occupancy.refresh(DAY)
+    assert booked() == 6
+
+def test_cancelled_reservation_is_not_restored_by_refresh(db, users):
+    assert occupancy.reserve(DAY, '09:00', 3, UNLIMITED, db)[0]
+    occupancy.cancel(DAY, '09:00', 3)
+    assert booked() == 0
+    
+    occupancy.refresh(DAY)
+    assert booked() == 0
+
+def test_reseed_keeps_pending_reservations(db, users):
+    assert occupancy.reserve(DAY, '09:00', 3, UNLIMITED, db)[0]
+    commit_pass(db, users, 1)
+    
+    occupancy.invalidate()
+    assert booked() == 4
+    occupancy.cancel(DAY, '09:00', 3)
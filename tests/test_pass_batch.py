@@ -0,0 +1,116 @@
+from datetime import date, timedelta
+import bcrypt
+import pytest
+from app.config import Config
+from app.utils import archiver
+
+OLD_DAY = date.today() - timedelta(days=Config.PASS_RETENTION_DAYS + 5)
+
+def create_pass(client, auth, day=None, role='TRUSTEE'):
+    response = client.post('/api/passes', json={
+        'visitor_name': 'Sunita Jadhav',
+        'visitor_phone': '9876543210',
+        'total_people': 2,
+        'darshan_type': 'VIP',
+        'date': (day or date.today()).isoformat(),
+        'time': '10:00'
+    }, headers=auth[role])
+    assert response.status_code == 201, response.json
+    return response.json['pass_id']
+
+def add_user(client, db, role, phone):
+    """(user id, Authorization header) of one more user"""
+    cursor = db.cursor()
+    cursor.execute("INSERT INTO users (name, phone, password, role) VALUES (%s, %s, %s, %s)", (
+        f'Second {role.title()}', phone, bcrypt.hashpw(b'password', bcrypt.gensalt(4)).decode(), role
+    ))
+    user_id = cursor.lastrowid
+    db.commit()
+    cursor.close()
+    response = client.post('/api/login', json={'phone': phone, 'password': 'password'})
+    return user_id, {'Authorization': 'Bearer ' + response.json['token']}
+
+def batch(client, headers, pass_ids):
+    return client.post('/api/passes/batch', json={'pass_ids': pass_ids}, headers=headers)
+
+@pytest.mark.parametrize('pass_ids, message', [
+    (None, 'non-empty list'),
+    (5, 'non-empty list'),
+    ([], 'non-empty list'),
+    (['1'], 'integers'),
+    ([1, True], 'integers'),
+    ([1.0], 'integers'),
+    (list(range(1, Config.PASS_BATCH_MAX_IDS + 2)), f'At most {Config.PASS_BATCH_MAX_IDS}'),
+])
+def test_invalid_ids_are_rejected(client, auth, pass_ids, message):
+    response = batch(client, auth['ADMIN'], pass_ids)
+    assert response.status_code == 400
+    assert message in response.json['error']
+
+def test_non_json_body_is_rejected(client, auth):
+    response = client.post('/api/passes/batch', data='1,2', headers=auth['ADMIN'])
+    assert response.status_code == 400
+
+def test_passes_come_back_in_request_order_with_timelines(client, auth, db):
+    first = create_pass(client, auth)
+    second = create_pass(client, auth)
+    cursor = db.cursor()
+    cursor.execute("INSERT INTO scans (pass_id, stage, source) VALUES (%s, 'ARRIVED', 'SCANNER')", (second,))
+    db.commit()
+    cursor.close()
+    
+    # Duplicates within the limit are fine, answered once
+    response = batch(client, auth['ADMIN'], [second, first, second, 999999])
+    assert response.status_code == 200
+    assert [entry['pass']['id'] for entry in response.json['passes']] == [second, first]
+    assert [scan['stage'] for scan in response.json['passes'][0]['timeline']] == ['ARRIVED']
+    assert response.json['passes'][1]['timeline'] == []
+    assert response.json['not_found'] == [999999]
+
+def test_trustee_sees_only_own_passes(client, auth, db):
+    own = create_pass(client, auth)
+    _, other_trustee = add_user(client, db, 'TRUSTEE', '9000000011')
+    other = create_pass(client, {'TRUSTEE': other_trustee})
+    
+    response = batch(client, auth['TRUSTEE'], [own, other])
+    assert [entry['pass']['id'] for entry in response.json['passes']] == [own]
+    assert response.json['not_found'] == [other]
+
+def test_attendant_sees_only_assigned_passes(client, auth, users, db):
+    assigned = create_pass(client, auth)
+    other = create_pass(client, auth)
+    other_attendant, _ = add_user(client, db, 'ATTENDANT', '9000000012')
+    cursor = db.cursor()
+    cursor.execute("UPDATE passes SET assigned_attendant_id = %s WHERE id = %s", (other_attendant, other))
+    cursor.execute("UPDATE passes SET assigned_attendant_id = %s WHERE id = %s", (users['ATTENDANT'], assigned))
+    db.commit()
+    cursor.close()
+    
+    response = batch(client, auth['ATTENDANT'], [assigned, other])
+    assert [entry['pass']['id'] for entry in response.json['passes']] == [assigned]
+    assert response.json['not_found'] == [other]
+    
+    response = batch(client, auth['ADMIN'], [assigned, other])
+    assert response.json['not_found'] == []
+
+def test_archived_passes_are_served_from_the_archive(client, auth, db):
+    old_id = create_pass(client, auth, OLD_DAY)
+    live_id = create_pass(client, auth)
+    cursor = db.cursor()
+    cursor.execute("INSERT INTO scans (pass_id, stage, source) VALUES (%s, 'COMPLETED', 'SCANNER')", (old_id,))
+    db.commit()
+    cursor.close()
+    archiver.archive_passes(db, date.today() - timedelta(days=Config.PASS_RETENTION_DAYS))
+    
+    response = batch(client, auth['TRUSTEE'], [old_id, live_id])
+    assert response.status_code == 200
+    entries = {entry['pass']['id']: entry for entry in response.json['passes']}
+    assert entries[old_id]['archived'] is True
+    assert [scan['stage'] for scan in entries[old_id]['timeline']] == ['COMPLETED']
+    assert entries[live_id]['archived'] is False
+    assert response.json['not_found'] == []
+    
+    # Scoping applies to the archive as well
+    _, other_trustee = add_user(client, db, 'TRUSTEE', '9000000013')
+    response = batch(client, other_trustee, [old_id])
+    assert response.json == {'passes': [], 'not_found': [old_id]}
@@ -0,0 +1,126 @@
+import time
+from collections import Counter
+import pytest
+from flask import Flask
+from app.config import Config
+from app.middleware.profiling_middleware import init_profiling
+from app.utils import profiler
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    directory = tmp_path / 'profiles'
+    monkeypatch.setattr(Config, 'PROFILE_DIR', str(directory))
+    monkeypatch.setattr(Config, 'PROFILE_INTERVAL_MS', 1)
+    monkeypatch.setattr(Config, 'PROFILE_SAMPLE_RATE', 0)
+    return directory
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+@pytest.fixture
+def profiled_app(profile_dir):
+    """A small app with profiling on, the main app only has it when PROFILE_ENABLED is set at import"""
+    app = Flask(__name__)
+    
+    @app.route('/work')
+    def work():
+        busy_loop(0.05)
+        return 'done'
+    
+    @app.route('/health')
+    def health():
+        busy_loop(0.05)
+        return 'ok'
+    
+    init_profiling(app)
+    return app.test_client()
+
+def read_profile(profile_dir, name):
+    lines = (profile_dir / name).read_text().splitlines()
+    return {line.rsplit(' ', 1)[0]: int(line.rsplit(' ', 1)[1]) for line in lines}
+
+def test_admin_header_profiles_the_request(profiled_app, profile_dir, auth):
+    response = profiled_app.get('/work', headers={'X-Profile': '1', **auth['ADMIN']})
+    assert response.status_code == 200
+    
+    name = response.headers['X-Profile-Id']
+    assert profiler.is_profile_name(name)
+    assert name.split('_')[1] == 'work'
+    
+    stacks = read_profile(profile_dir, name)
+    assert sum(stacks.values()) == int(name.split('_')[-1][:-len('samples.collapsed')])
+    # Outermost frame first, the view and the loop it spends its time in at the end
+    assert any(stack.split(';')[-1].startswith('busy_loop (tests/test_profiling.py:') for stack in stacks)
+    assert any('work (tests/test_profiling.py:' in stack for stack in stacks)
+
+def test_header_is_ignored_for_other_roles(profiled_app, profile_dir, auth):
+    for headers in ({'X-Profile': '1', **auth['TRUSTEE']}, {'X-Profile': '1'}, auth['ADMIN']):
+        response = profiled_app.get('/work', headers=headers)
+        assert response.status_code == 200
+        assert 'X-Profile-Id' not in response.headers
+    assert not profile_dir.exists()
+
+def test_sample_rate_profiles_without_the_header(profiled_app, profile_dir, monkeypatch):
+    monkeypatch.setattr(Config, 'PROFILE_SAMPLE_RATE', 1.0)
+    
+    response = profiled_app.get('/work')
+    assert profiler.is_profile_name(response.headers['X-Profile-Id'])
+    
+    # Exempt endpoints never are
+    assert 'X-Profile-Id' not in profiled_app.get('/health').headers
+
+def test_collapsed_output_and_pruning(profile_dir, monkeypatch):
+    assert profiler.render_collapsed(Counter({'main;view;query': 2, 'main;view': 5})) == 'main;view 5\nmain;view;query 2\n'
+    
+    monkeypatch.setattr(Config, 'PROFILE_MAX_FILES', 2)
+    sampler = profiler.SamplingProfiler(None)
+    sampler.stacks = Counter({'main;view': 3})
+    sampler.samples = 3
+    names = [profiler.save_profile(sampler, 'pass.get/pass') for _ in range(3)]
+    
+    assert sorted(path.name for path in profile_dir.iterdir()) == names[1:]
+    assert '_pass.get-pass_' in names[0]
+    assert (profile_dir / names[2]).read_text() == 'main;view 3\n'
+    
+    # Nothing sampled, nothing written
+    assert profiler.save_profile(profiler.SamplingProfiler(None), 'work') is None
+
+def write_profile(profile_dir, stamp, endpoint):
+    profile_dir.mkdir(exist_ok=True)
+    name = f'{stamp}_{endpoint}_12ms_3samples.collapsed'
+    (profile_dir / name).write_text('main;view 3\n')
+    return name
+
+def test_profiles_endpoints(client, auth, profile_dir):
+    older = write_profile(profile_dir, '20300101T100000000000', 'pass.get_pass')
+    newer = write_profile(profile_dir, '20300101T110000000000', 'scanner.scan')
+    (profile_dir / 'notes.txt').write_text('not a profile')
+    
+    response = client.get('/api/admin/profiles', headers=auth['ADMIN'])
+    assert response.status_code == 200
+    assert [profile['name'] for profile in response.json['profiles']] == [newer, older]
+    assert response.json['profiles'][0] == {
+        'name': newer,
+        'endpoint': 'scanner.scan',
+        'captured_at': '2030-01-01T11:00:00',
+        'duration_ms': 12,
+        'samples': 3,
+        'size_bytes': 12
+    }
+    
+    response = client.get('/api/admin/profiles?endpoint=pass.get_pass', headers=auth['ADMIN'])
+    assert [profile['name'] for profile in response.json['profiles']] == [older]
+    for limit in (0, -5, 1):
+        response = client.get(f'/api/admin/profiles?limit={limit}', headers=auth['ADMIN'])
+        assert [profile['name'] for profile in response.json['profiles']] == [newer]
+    
+    response = client.get(f'/api/admin/profiles/{older}', headers=auth['ADMIN'])
+    assert response.status_code == 200
+    assert response.data == b'main;view 3\n'
+    
+    # Not a profile name, or a well-formed one that doesn't exist
+    for name in ('notes.txt', '..%2Fsecret', '20300102T100000000000_x_1ms_1samples.collapsed'):
+        assert client.get(f'/api/admin/profiles/{name}', headers=auth['ADMIN']).status_code == 404
+    assert client.get('/api/admin/profiles', headers=auth['TRUSTEE']).status_code == 403
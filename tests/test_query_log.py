@@ -0,0 +1,52 @@
+import logging
+import pytest
+from app.config import Config
+from app.utils import query_log
+
+@pytest.fixture
+def stats(monkeypatch):
+    monkeypatch.setattr(query_log, '_stats', {})
+    monkeypatch.setattr(Config, 'SLOW_QUERY_MAX_STATEMENTS', 2)
+    monkeypatch.setattr(Config, 'SLOW_QUERY_THRESHOLD_MS', 100)
+    return query_log._stats
+
+def test_statements_aggregate_by_shape(stats):
+    query_log._record_query(None, 'SELECT * FROM passes WHERE id = %s', (1,), 0.002, 1)
+    query_log._record_query(None, 'SELECT  *  FROM passes WHERE id = %s', (2,), 0.004, 1)
+    
+    [row] = query_log.get_top_queries()
+    assert row['query'] == 'SELECT * FROM passes WHERE id = ?'
+    assert row['calls'] == 2 and row['avg_ms'] == 3
+
+def test_new_shapes_past_the_cap_are_still_logged(stats, caplog):
+    query_log._record_query(None, 'SELECT 1 FROM passes', (), 0.001, 1)
+    query_log._record_query(None, 'SELECT 1 FROM users', (), 0.001, 1)
+    
+    with caplog.at_level(logging.WARNING, logger=query_log.__name__):
+        query_log._record_query(None, 'SELECT * FROM logs WHERE action = %s', ('LOGIN',), 0.5, 7)
+        query_log._record_query(None, 'SELECT * FROM issues', (), 0.001, 3)
+    
+    assert 'SELECT * FROM logs WHERE action = ?' in caplog.text
+    assert len(stats) == 3
+    other = stats[query_log.OTHER_STATEMENTS]
+    assert other['calls'] == 2 and other['slow_calls'] == 1
+    assert other['last_slow']['query'] == 'SELECT * FROM logs WHERE action = ?'
+
+def test_parameter_values_are_not_kept(stats, caplog):
+    with caplog.at_level(logging.WARNING, logger=query_log.__name__):
+        query_log._record_query(None, 'INSERT INTO users (name, phone, password) VALUES (%s, %s, %s)',
+                                ('Kiran Patil', '9876543210', '$2b$04$secret-hash'), 0.5, 1)
+    
+    [row] = query_log.get_top_queries()
+    assert row['last_slow']['params'] == '[str, str, str]'
+    for value in ('Kiran Patil', '9876543210', 'secret-hash'):
+        assert value not in caplog.text
+        assert value not in repr(row)
+
+def test_slow_queries_limit_is_clamped(client, auth, stats):
+    for i in range(3):
+        query_log._record_query(None, f'SELECT * FROM table_{"abc"[i]}', (), 0.001, 1)
+    
+    response = client.get('/api/admin/slow-queries?limit=-1', headers=auth['ADMIN'])
+    assert response.status_code == 200
+    assert len(response.json['queries']) == 1
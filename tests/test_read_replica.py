@@ -0,0 +1,104 @@
+import pytest
+from app import database
+from app.backends import mysql_backend
+from app.config import Config
+from app.utils import response_cache
+
+class FakeConnection:
+    def __init__(self, host):
+        self.host = host
+    
+    def close(self):
+        pass
+
+class Hosts(list):
+    """Hosts connected to, in order, connecting to the ones in down fails"""
+    
+    def __init__(self):
+        super().__init__()
+        self.down = set()
+    
+    def connect(self, host, user, password, port, **kwargs):
+        self.append(host)
+        if host in self.down:
+            raise mysql_backend.OperationalError(2003, f"Can't connect to MySQL server on '{host}'")
+        return FakeConnection(host)
+
+@pytest.fixture
+def hosts(monkeypatch):
+    """MySQL with a replica configured, no server behind either"""
+    monkeypatch.setattr(Config, 'DB_BACKEND', 'mysql')
+    monkeypatch.setattr(Config, 'DB_HOST', 'primary')
+    monkeypatch.setattr(Config, 'DB_READ_HOST', 'replica')
+    monkeypatch.setattr(database, '_replica_down_until', 0.0)
+    
+    hosts = Hosts()
+    monkeypatch.setattr(database, '_connect', hosts.connect)
+    return hosts
+
+def connect_in(app, method='GET', headers=None, readonly=None):
+    with app.test_request_context('/api/passes/today', method=method, headers=headers):
+        return database.get_db_connection(readonly=readonly)
+
+def test_get_reads_from_the_replica(app, hosts):
+    conn = connect_in(app)
+    assert conn.raw.host == 'replica' and conn.is_replica
+
+def test_writes_go_to_the_primary(app, hosts):
+    for method in ('POST', 'PATCH', 'DELETE'):
+        assert connect_in(app, method).raw.host == 'primary'
+
+def test_read_your_writes_header_reads_from_the_primary(app, hosts):
+    assert connect_in(app, headers={'X-Read-Your-Writes': '1'}).raw.host == 'primary'
+    assert connect_in(app, headers={'X-Read-Your-Writes': 'true'}).raw.host == 'primary'
+    assert connect_in(app, headers={'X-Read-Your-Writes': '0'}).raw.host == 'replica'
+
+def test_use_primary_covers_the_rest_of_the_request(app, hosts):
+    with app.test_request_context('/api/passes/today'):
+        database.use_primary()
+        assert database.get_db_connection().raw.host == 'primary'
+
+def test_explicit_readonly_wins(app, hosts):
+    assert connect_in(app, readonly=False).raw.host == 'primary'
+    assert connect_in(app, 'POST', readonly=True).raw.host == 'replica'
+
+def test_falls_back_to_the_primary_while_the_replica_is_down(app, hosts):
+    hosts.down.add('replica')
+    
+    conn = connect_in(app)
+    assert conn.raw.host == 'primary' and not conn.is_replica
+    assert hosts == ['replica', 'primary']
+    
+    # No connect attempt, and its timeout, on every request while it is marked down
+    assert connect_in(app).raw.host == 'primary'
+    assert hosts == ['replica', 'primary', 'primary']
+
+def test_replica_is_retried_after_the_retry_interval(app, hosts, monkeypatch):
+    hosts.down.add('replica')
+    connect_in(app)
+    
+    hosts.down.clear()
+    monkeypatch.setattr(database, '_replica_down_until', 0.0)
+    assert connect_in(app).raw.host == 'replica'
+
+def test_cache_rebuilds_read_from_the_primary(app, hosts):
+    response_cache.clear()
+    built_from = []
+    
+    def build():
+        built_from.append(database.get_db_connection().raw.host)
+        return {'passes': []}
+    
+    with app.test_request_context('/api/passes/today'):
+        response_cache.get_payload(('replica-test',), ('passes',), build)
+    with app.test_request_context('/api/passes/today'):
+        # A hit, nothing is built
+        response_cache.get_payload(('replica-test',), ('passes',), build)
+    
+    response_cache.invalidate_tables(['passes'])
+    with app.test_request_context('/api/passes/today'):
+        response_cache.get_payload(('replica-test',), ('passes',), build)
+        # Other reads of the request keep using the primary too, like after use_primary()
+        assert database.get_db_connection().raw.host == 'primary'
+    
+    assert built_from == ['primary', 'primary']
@@ -0,0 +1,109 @@
+from datetime import date, datetime
+import pytest
+
+TODAY = date.today()
+
+@pytest.fixture
+def attendants(users, db):
+    """The fixture attendant (leaving) plus two more checked in for today, by name"""
+    cursor = db.cursor()
+    ids = {'leaving': users['ATTENDANT']}
+    for name, phone in (('busy', '9000000011'), ('free', '9000000012')):
+        cursor.execute("INSERT INTO users (name, phone, password, role) VALUES (%s, %s, 'x', 'ATTENDANT')", (name, phone))
+        ids[name] = cursor.lastrowid
+    for attendant_id in ids.values():
+        cursor.execute(
+            "INSERT INTO attendant_attendance (attendant_id, date, time_in) VALUES (%s, %s, %s)",
+            (attendant_id, TODAY, datetime.now())
+        )
+    db.commit()
+    cursor.close()
+    return ids
+
+def add_passes(db, users, attendant_id, times, status='NOT_CONTACTED'):
+    cursor = db.cursor()
+    pass_ids = []
+    for time in times:
+        cursor.execute("""
+            INSERT INTO passes (trustee_id, visitor_name, visitor_phone, total_people, darshan_type, date, time,
+                                grace_minutes, assigned_attendant_id, qr_code_string, status)
+            VALUES (%s, 'Visitor', '9876543210', 1, 'VIP', %s, %s, 30, %s, %s, %s)
+        """, (users['TRUSTEE'], TODAY, time, attendant_id, f'QR-{attendant_id}-{time}', status))
+        pass_ids.append(cursor.lastrowid)
+    db.commit()
+    cursor.close()
+    return pass_ids
+
+def assigned(db, pass_ids):
+    cursor = db.cursor()
+    placeholders = ', '.join(['%s'] * len(pass_ids))
+    cursor.execute(f"SELECT id, assigned_attendant_id FROM passes WHERE id IN ({placeholders}) ORDER BY id", pass_ids)
+    rows = [row['assigned_attendant_id'] for row in cursor.fetchall()]
+    cursor.close()
+    db.commit()
+    return rows
+
+def test_earliest_passes_go_to_the_least_loaded(client, auth, users, db, attendants):
+    add_passes(db, users, attendants['busy'], ['08:00'])
+    leaving = add_passes(db, users, attendants['leaving'], ['11:00', '09:00', '10:00', '12:00'])
+    done = add_passes(db, users, attendants['leaving'], ['07:00'], status='COMPLETED')
+    
+    response = client.post('/api/admin/rebalance', json={'attendant_ids': [attendants['leaving']]}, headers=auth['ADMIN'])
+    assert response.status_code == 200, response.json
+    
+    # 09:00 to the free attendant, then ties go to the lower id
+    moves = {move['pass_id']: move['to_attendant_id'] for move in response.json['moves']}
+    free, busy = attendants['free'], attendants['busy']
+    assert [moves[pass_id] for pass_id in (leaving[1], leaving[2], leaving[0], leaving[3])] == [free, busy, free, busy]
+    assert assigned(db, leaving) == [moves[pass_id] for pass_id in leaving]
+    assert assigned(db, done) == [attendants['leaving']]
+
+def test_dry_run_changes_nothing(client, auth, users, db, attendants):
+    leaving = add_passes(db, users, attendants['leaving'], ['09:00', '10:00'])
+    
+    response = client.post('/api/admin/rebalance', json={'attendant_ids': [attendants['leaving']], 'dry_run': True}, headers=auth['ADMIN'])
+    
+    assert response.status_code == 200
+    assert response.json['dry_run'] and len(response.json['moves']) == 2
+    assert assigned(db, leaving) == [attendants['leaving']] * 2
+
+def test_passes_stay_unassigned_without_anyone_on_duty(client, auth, users, db):
+    leaving = add_passes(db, users, users['ATTENDANT'], ['09:00'])
+    
+    response = client.post('/api/admin/rebalance', json={'attendant_ids': [users['ATTENDANT']]}, headers=auth['ADMIN'])
+    
+    assert response.json['moves'] == []
+    assert response.json['unassigned_pass_ids'] == leaving
+
+@pytest.mark.parametrize('body', [
+    {'attendant_ids': ['x']},
+    {'attendant_ids': [[1]]},
+    {'attendant_ids': [True]},
+    {'attendant_ids': [0]},
+    {'attendant_ids': []},
+    {'attendant_ids': 3},
+    {'attendant_ids': [1], 'date': 'today'},
+])
+def test_invalid_requests_are_rejected(client, auth, body):
+    assert client.post('/api/admin/rebalance', json=body, headers=auth['ADMIN']).status_code == 400
+
+def test_non_json_body_is_rejected(client, auth):
+    response = client.post('/api/admin/rebalance', data='attendant_ids=1', headers=auth['ADMIN'])
+    assert response.status_code == 400
+
+def test_deactivating_an_attendant_hands_over_their_passes(client, auth, users, db, attendants):
+    leaving = add_passes(db, users, attendants['leaving'], ['09:00', '10:00'])
+    
+    response = client.patch(f"/api/admin/users/{attendants['leaving']}", json={'is_active': False}, headers=auth['ADMIN'])
+    
+    assert response.status_code == 200
+    assert sorted(assigned(db, leaving)) == sorted([attendants['busy'], attendants['free']])
+
+def test_marking_out_hands_over_the_passes(client, auth, users, db, attendants):
+    leaving = add_passes(db, users, attendants['leaving'], ['09:00', '10:00', '11:00'])
+    
+    response = client.post('/api/attendant/attendance/out', headers=auth['ATTENDANT'])
+    
+    assert response.status_code == 200, response.json
+    assert response.json['reassigned_passes'] == 3
+    assert attendants['leaving'] not in assigned(db, leaving)
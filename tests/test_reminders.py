@@ -0,0 +1,105 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from app.config import Config
+from app.database import get_db_connection
+from app.utils import reminders
+
+CONFIG = {**reminders.DEFAULT_REMINDER_CONFIG, 'lead_minutes': [120], 'channels': ['SMS', 'WHATSAPP', 'EMAIL']}
+
+@pytest.fixture
+def upcoming_pass(client, auth):
+    slot = datetime.now() + timedelta(hours=1)
+    if slot.date() != datetime.now().date():
+        pytest.skip('slot falls on the next day')
+    response = client.post('/api/passes', json={
+        'visitor_name': 'Savita Deshmukh',
+        'visitor_phone': '9876543210',
+        'total_people': 2,
+        'darshan_type': 'VIP',
+        'date': slot.date().isoformat(),
+        'time': slot.strftime('%H:%M')
+    }, headers=auth['TRUSTEE'])
+    return response.json['pass_id']
+
+def outbox(db):
+    cursor = db.cursor()
+    cursor.execute("SELECT channel, status, message, last_error FROM reminder_outbox ORDER BY id")
+    rows = cursor.fetchall()
+    cursor.close()
+    db.commit()
+    return rows
+
+def test_unknown_placeholder_fails_the_reminder_once(db, upcoming_pass):
+    config = {**CONFIG, 'template': 'Darshan for {visitor_name} at gate {gate}'}
+    
+    assert reminders.enqueue_due_reminders(db, config) == 3
+    assert {row['status'] for row in outbox(db)} == {'FAILED'}
+    assert "'gate'" in outbox(db)[0]['last_error']
+    
+    # Nothing left to retry on the next tick
+    assert reminders.enqueue_due_reminders(db, config) == 0
+    assert reminders.claim_batch(db) == []
+
+def test_invalid_template_is_rejected_on_save(client, auth):
+    for template in ('Gate {gate}', 'Slot {}', 'Date {date', 42):
+        response = client.patch('/api/admin/settings', json={'reminder_config': {**CONFIG, 'template': template}}, headers=auth['ADMIN'])
+        assert response.status_code == 400, template
+    
+    response = client.patch('/api/admin/settings', json={'reminder_config': CONFIG}, headers=auth['ADMIN'])
+    assert response.status_code == 200
+
+@pytest.mark.parametrize('field, value', [
+    ('enabled', 'yes'),
+    ('lead_minutes', 120),
+    ('lead_minutes', ['120']),
+    ('lead_minutes', [0]),
+    ('lead_minutes', [True]),
+    ('channels', 'SMS'),
+    ('channels', [None]),
+    ('channels', ['X' * 21]),
+    ('rate_limits', ['SMS']),
+    ('rate_limits', {'SMS': 'fast'}),
+    ('rate_limits', {'SMS': -5}),
+])
+def test_invalid_fields_are_rejected_on_save(client, auth, field, value):
+    response = client.patch('/api/admin/settings', json={'reminder_config': {**CONFIG, field: value}}, headers=auth['ADMIN'])
+    assert response.status_code == 400
+    assert field in response.json['error']
+
+def test_partial_config_is_accepted(client, auth):
+    response = client.patch('/api/admin/settings', json={'reminder_config': {'enabled': True, 'rate_limits': {'SMS': 30}}}, headers=auth['ADMIN'])
+    assert response.status_code == 200
+
+def test_lease_is_renewed_while_a_batch_is_sending(db, upcoming_pass, monkeypatch):
+    monkeypatch.setattr(reminders, 'LEASE_RENEW_SECONDS', 0)
+    monkeypatch.setattr(reminders, '_executor', None)
+    monkeypatch.setattr(Config, 'REMINDER_WORKERS', 1)
+    # Claimed long enough ago that the lease would have run out
+    claimed_at = datetime.now() - timedelta(minutes=reminders.STALE_SENDING_MINUTES + 1)
+    reminders.enqueue_due_reminders(db, CONFIG, now=claimed_at)
+    batch = reminders.claim_batch(db, now=claimed_at)
+    assert len(batch) == 3
+    
+    renewed = threading.Event()
+    renew_lease = reminders._renew_lease
+    def record_renewal(connection, ids):
+        renew_lease(connection, ids)
+        renewed.set()
+    monkeypatch.setattr(reminders, '_renew_lease', record_renewal)
+    
+    reclaimed = []
+    class SlowSender:
+        def send(self, channel, recipient, message):
+            if channel == 'WHATSAPP':
+                assert renewed.wait(5)
+                # Another worker looking for stale claims mid-batch
+                other = get_db_connection()
+                reclaimed.extend(reminders.claim_batch(other))
+                other.close()
+    for channel in CONFIG['channels']:
+        monkeypatch.setitem(reminders._senders, channel, SlowSender())
+    
+    assert reminders.dispatch(db, batch, {}) == (3, 0)
+    assert reclaimed == []
+    assert {row['status'] for row in outbox(db)} == {'SENT'}
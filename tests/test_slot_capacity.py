@@ -0,0 +1,92 @@
+import json
+from datetime import date, timedelta
+from app import database
+from app.database import InstrumentedConnection
+from app.utils import occupancy
+
+DAY = (date.today() + timedelta(days=1)).isoformat()
+
+def pass_body(total_people, time='09:10'):
+    return {
+        'visitor_name': 'Anil Kulkarni',
+        'visitor_phone': '9876543210',
+        'total_people': total_people,
+        'darshan_type': 'VIP',
+        'date': DAY,
+        'time': time
+    }
+
+def set_capacity(db, config):
+    cursor = db.cursor()
+    cursor.execute("UPDATE settings SET slot_capacity_config = %s WHERE id = 1", (json.dumps(config),))
+    db.commit()
+    cursor.close()
+
+def test_slot_capacity_is_enforced(client, auth, db):
+    set_capacity(db, {'default': None, 'slots': {'09:00': 5}})
+    
+    assert client.post('/api/passes', json=pass_body(3), headers=auth['TRUSTEE']).status_code == 201
+    
+    response = client.post('/api/passes', json=pass_body(3), headers=auth['TRUSTEE'])
+    assert response.status_code == 400
+    assert response.json['error'] == 'Slot is full, 2 places left'
+
+def test_bookings_committed_by_other_workers_count(client, auth, users, db):
+    set_capacity(db, {'default': None, 'slots': {'09:00': 5}})
+    # Seed this worker's index, then commit a booking it never hears about
+    assert client.post('/api/passes', json=pass_body(1), headers=auth['TRUSTEE']).status_code == 201
+    cursor = db.cursor()
+    cursor.execute("""
+        INSERT INTO passes (trustee_id, visitor_name, visitor_phone, total_people, darshan_type, date, time,
+                            grace_minutes, assigned_attendant_id, qr_code_string, status)
+        VALUES (%s, 'Other Worker', '9000000000', 3, 'VIP', %s, '09:20', 30, %s, 'QR-OTHER', 'NOT_CONTACTED')
+    """, (users['TRUSTEE'], DAY, users['ATTENDANT']))
+    db.commit()
+    cursor.close()
+    
+    response = client.post('/api/passes', json=pass_body(2), headers=auth['TRUSTEE'])
+    assert response.status_code == 400
+    assert response.json['error'] == 'Slot is full, 1 places left'
+    
+    # The rejected booking is not left in the index
+    assert occupancy.find_open_slots(DAY, '09:00', 1, occupancy.parse_capacity_config({'slots': {'09:00': 5}}))[0]['booked'] == 1
+
+def test_unlimited_slots_are_not_limited(client, auth, db):
+    assert client.post('/api/passes', json=pass_body(50), headers=auth['TRUSTEE']).status_code == 201
+
+def test_total_people_as_string_is_accepted(client, auth, db):
+    response = client.post('/api/passes', json=pass_body('2'), headers=auth['TRUSTEE'])
+    assert response.status_code == 201
+
+def test_invalid_total_people_is_rejected(client, auth, db):
+    for total_people in ('two', 2.5, 0, -1, None, True):
+        response = client.post('/api/passes', json=pass_body(total_people), headers=auth['TRUSTEE'])
+        assert response.status_code == 400, total_people
+
+def test_slot_is_locked_first_and_committed_once(client, auth, db, monkeypatch):
+    set_capacity(db, {'default': None, 'slots': {'09:00': 5}})
+    events = {}
+    def record_statement(connection, query, args, elapsed, rowcount):
+        if connection is not None:
+            events.setdefault(id(connection), []).append(' '.join(query.split())[:30])
+    commit = InstrumentedConnection.commit
+    def record_commit(connection):
+        events.setdefault(id(connection), []).append('COMMIT')
+        commit(connection)
+    monkeypatch.setattr(database, '_query_observers', [*database._query_observers, record_statement])
+    monkeypatch.setattr(InstrumentedConnection, 'commit', record_commit)
+    
+    assert client.post('/api/passes', json=pass_body(3), headers=auth['TRUSTEE']).status_code == 201
+    
+    [statements] = [events for events in events.values() if any('slot_locks' in event for event in events)]
+    assert statements[0].startswith('INSERT INTO slot_locks')
+    first_commit = statements.index('COMMIT')
+    assert any(event.startswith('INSERT INTO passes') for event in statements[:first_commit])
+
+def test_invalid_capacity_values_are_rejected(client, auth, db):
+    for config in ({'slots': {'09:00': '80'}}, {'slots': {'09:00': -1}}, {'default': True}, {'default': 2.5}, {'slots': ['09:00']}):
+        response = client.patch('/api/admin/settings', json={'slot_capacity_config': config}, headers=auth['ADMIN'])
+        assert response.status_code == 400, config
+    
+    response = client.patch('/api/admin/settings', json={'slot_capacity_config': {'default': None, 'slots': {'09:00': 0}}}, headers=auth['ADMIN'])
+    assert response.status_code == 200
@@ -0,0 +1,71 @@
+import os
+from datetime import date, datetime, timedelta
+from app.config import Config
+from app.utils import occupancy, snapshots
+
+DAY = date.today() + timedelta(days=1)
+
+def create_pass(client, auth, total_people, time='10:00'):
+    response = client.post('/api/passes', json={
+        'visitor_name': 'Swati Kadam',
+        'visitor_phone': '9876543210',
+        'total_people': total_people,
+        'darshan_type': 'VIP',
+        'date': DAY.isoformat(),
+        'time': time
+    }, headers=auth['TRUSTEE'])
+    assert response.status_code == 201, response.json
+
+def booked(time='10:00'):
+    with occupancy._lock:
+        return (occupancy._occupancy or {}).get(DAY.isoformat(), {}).get(occupancy.slot_bucket(time), 0)
+
+def test_snapshot_is_restored_and_changes_since_are_replayed(client, auth, users, db, tmp_path):
+    path = str(tmp_path / 'warm.snap')
+    create_pass(client, auth, 3)
+    
+    assert snapshots.write_snapshot(path) > 0
+    header, states = snapshots._read_snapshot(path)
+    assert set(header['sections']) >= {'occupancy'}
+    assert states['occupancy']['dates'][DAY.isoformat()][str(occupancy.slot_bucket('10:00'))] == 3
+    
+    # Committed by another worker after the watermark, the snapshot doesn't know about it
+    cursor = db.cursor()
+    cursor.execute("""
+        INSERT INTO passes (trustee_id, visitor_name, visitor_phone, total_people, darshan_type, date, time,
+                            grace_minutes, assigned_attendant_id, qr_code_string, status, updated_at)
+        VALUES (%s, 'Other Worker', '9000000000', 4, 'VIP', %s, '10:00', 30, %s, 'QR-AFTER', 'NOT_CONTACTED', %s)
+    """, (users['TRUSTEE'], DAY, users['ATTENDANT'], datetime.now() + timedelta(seconds=1)))
+    db.commit()
+    cursor.close()
+    
+    # A fresh worker
+    occupancy.invalidate()
+    assert snapshots.load_snapshot(path) is True
+    assert booked() == 7
+
+def test_restored_state_is_used_without_the_replay(client, auth, db, tmp_path):
+    path = str(tmp_path / 'warm.snap')
+    create_pass(client, auth, 2)
+    snapshots.write_snapshot(path)
+    occupancy.invalidate()
+    
+    assert snapshots.load_snapshot(path) is True
+    assert booked() == 2
+
+def test_old_or_unreadable_snapshots_are_ignored(client, auth, db, tmp_path, monkeypatch):
+    path = str(tmp_path / 'warm.snap')
+    create_pass(client, auth, 2)
+    snapshots.write_snapshot(path)
+    occupancy.invalidate()
+    
+    monkeypatch.setattr(Config, 'SNAPSHOT_MAX_AGE_SECONDS', -1)
+    assert snapshots.load_snapshot(path) is False
+    assert occupancy._occupancy is None
+    
+    with open(path, 'r+b') as snapshot:
+        snapshot.write(b'GARBAGE')
+    monkeypatch.setattr(Config, 'SNAPSHOT_MAX_AGE_SECONDS', 3600)
+    assert snapshots.load_snapshot(path) is False
+    assert snapshots.load_snapshot(str(tmp_path / 'missing.snap')) is False
+    assert not os.path.exists(tmp_path / 'missing.snap')
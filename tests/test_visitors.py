@@ -0,0 +1,86 @@
+from datetime import date, timedelta
+from app.config import Config
+from app.utils.archiver import archive_passes
+
+DAY = (date.today() + timedelta(days=1)).isoformat()
+
+def create_pass(client, headers, name='Prakash Jadhav', phone='9876543210', day=DAY):
+    response = client.post('/api/passes', json={
+        'visitor_name': name,
+        'visitor_phone': phone,
+        'total_people': 2,
+        'darshan_type': 'VIP',
+        'date': day,
+        'time': '10:00'
+    }, headers=headers)
+    assert response.status_code == 201, response.json
+    return response.json['pass_id']
+
+def test_assistant_sees_the_passes_they_created(client, auth):
+    pass_id = create_pass(client, auth['ASSISTANT'])
+    create_pass(client, auth['TRUSTEE'])
+    
+    history = client.get('/api/visitors/9876543210/passes', headers=auth['ASSISTANT'])
+    assert [row['id'] for row in history.json['passes']] == [pass_id]
+    
+    search = client.get('/api/visitors/search?q=prakash', headers=auth['ASSISTANT'])
+    assert [row['id'] for row in search.json['passes']] == [pass_id]
+
+def test_assistant_aarti_booking_is_in_their_history(client, auth, db):
+    client.post('/api/aarti/update-capacity', json={'name': 'KAKAD', 'date': DAY, 'total_capacity': 10}, headers=auth['ADMIN'])
+    cursor = db.cursor()
+    cursor.execute("SELECT id FROM aarti WHERE date = %s", (DAY,))
+    aarti_id = cursor.fetchone()['id']
+    cursor.close()
+    db.commit()
+    
+    response = client.post('/api/aarti/book', json={
+        'aarti_id': aarti_id,
+        'visitor_name': 'Prakash Jadhav',
+        'visitor_phone': '9876543210',
+        'count': 2
+    }, headers=auth['ASSISTANT'])
+    assert response.status_code == 201, response.json
+    
+    history = client.get('/api/visitors/9876543210/passes', headers=auth['ASSISTANT'])
+    assert len(history.json['passes']) == 1
+
+def search(client, headers, **params):
+    response = client.get('/api/visitors/search', query_string=params, headers=headers)
+    assert response.status_code == 200, response.json
+    return [(row['visitor_name'], row['archived']) for row in response.json['passes']]
+
+def test_search_by_exact_name(client, auth):
+    create_pass(client, auth['TRUSTEE'], 'Prakash Jadhav')
+    create_pass(client, auth['TRUSTEE'], 'Meera Shah')
+    
+    assert search(client, auth['ADMIN'], q='Jadhav') == [('Prakash Jadhav', False)]
+    assert search(client, auth['ADMIN'], q='  MEERA   shah ') == [('Meera Shah', False)]
+
+def test_search_tolerates_a_typo(client, auth):
+    create_pass(client, auth['TRUSTEE'], 'Prakash Jadhav')
+    create_pass(client, auth['TRUSTEE'], 'Meera Shah')
+    
+    assert search(client, auth['ADMIN'], q='prakash jahdav') == [('Prakash Jadhav', False)]
+
+def test_search_by_phone_in_another_format(client, auth):
+    create_pass(client, auth['TRUSTEE'], 'Prakash Jadhav', phone='9876543210')
+    create_pass(client, auth['TRUSTEE'], 'Meera Shah', phone='9123456780')
+    
+    assert search(client, auth['ADMIN'], q='+91 98765-43210') == [('Prakash Jadhav', False)]
+
+def test_search_reaches_the_archive_only_for_old_windows(client, auth, db):
+    old_day = date.today() - timedelta(days=Config.PASS_RETENTION_DAYS + 10)
+    create_pass(client, auth['TRUSTEE'], 'Prakash Jadhav', day=old_day.isoformat())
+    create_pass(client, auth['TRUSTEE'], 'Prakash Jadhav')
+    assert archive_passes(db, date.today() - timedelta(days=Config.PASS_RETENTION_DAYS)) == 1
+    
+    assert search(client, auth['ADMIN'], q='jadhav') == [('Prakash Jadhav', False)]
+    
+    window = {'from': (old_day - timedelta(days=1)).isoformat(), 'to': date.today().isoformat()}
+    assert search(client, auth['ADMIN'], q='jadhav', **window) == [('Prakash Jadhav', True)]
+
+def test_search_window_is_validated(client, auth):
+    assert client.get('/api/visitors/search?q=jadhav&from=2024-02-01&to=2024-01-01', headers=auth['ADMIN']).status_code == 400
+    assert client.get('/api/visitors/search?q=jadhav&from=2020-01-01&to=2024-01-01', headers=auth['ADMIN']).status_code == 400
+    assert client.get('/api/visitors/search', headers=auth['ADMIN']).status_code == 400